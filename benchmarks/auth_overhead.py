@@ -0,0 +1,73 @@
+"""
+Стоимость авторизации одного запроса: прежняя проверка в каждом обработчике
+(jwt_service.decode_token + проверки type/sub) против зависимости current_user
+с кэшем проверенных токенов.
+
+Замер на уровне функций (без HTTP), нужен только .env с настройками JWT:
+    python -m benchmarks.auth_overhead --requests 100000 --users 100
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from fastapi import HTTPException
+
+from src.core.config import JWT_KEY, JWT_ACCESS_EXPIRATION, JWT_REFRESH_EXPIRATION, JWT_ALGORITHM
+from src.modules.jwt.services import JWTService
+from src.modules.jwt.token_cache import VerifiedTokenCache
+from src.modules.jwt.util import TokenType
+
+
+def _legacy_check(jwt_service: JWTService, token: str) -> int:
+    # как было в каждом защищённом обработчике до current_user
+    payload = jwt_service.decode_token(token=token)
+    if not payload:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not payload.get("type"):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if payload.get("type") != "access":
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    user_id = payload.get("sub")
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return int(user_id)
+
+
+async def _cached_check(token_cache: VerifiedTokenCache, token: str) -> int:
+    # то же, что src.core.dependencies.current_user
+    claims = token_cache.verify(token)
+    if claims is None or claims.type != TokenType.ACCESS.value:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return claims.user_id
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=100, help="число разных токенов в потоке запросов")
+    parser.add_argument("--cache-size", type=int, default=10_000)
+    args = parser.parse_args()
+
+    jwt_service = JWTService(JWT_KEY, JWT_ACCESS_EXPIRATION, JWT_REFRESH_EXPIRATION, JWT_ALGORITHM)
+    tokens = [jwt_service.create_token(user_id, "user", TokenType.ACCESS) for user_id in range(1, args.users + 1)]
+    stream = [random.choice(tokens) for _ in range(args.requests)]
+
+    started = time.perf_counter()
+    for token in stream:
+        _legacy_check(jwt_service, token)
+    legacy = (time.perf_counter() - started) / args.requests
+
+    token_cache = VerifiedTokenCache(jwt_service, args.cache_size)
+    started = time.perf_counter()
+    for token in stream:
+        await _cached_check(token_cache, token)
+    cached = (time.perf_counter() - started) / args.requests
+
+    print(f"decode per request : {legacy * 1e6:8.2f} us/request")
+    print(f"current_user cache : {cached * 1e6:8.2f} us/request ({token_cache.stats()})")
+    print(f"speedup            : {legacy / cached:8.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,104 @@
+"""
+Авто-теги по содержимому: ContentTagger (автомат Ахо-Корасик) при разном числе тегов
+в справочнике против поиска каждого тега отдельным регулярным выражением.
+
+Сначала проверяется, что оба варианта автомата (pyahocorasick, если установлен,
+и чистый Python) находят те же теги, что и построчный поиск регулярками.
+    python -m benchmarks.content_tagging --tags 1 100 1000 5000 --size 1
+"""
+import argparse
+import random
+import re
+import time
+
+from src.modules.analysis.content_tagger import ContentTagger, normalize_for_matching
+
+MB = 1024 * 1024
+
+_WORDS = ("настоящий договор заключен между сторонами исполнитель обязуется оказать услуги а заказчик "
+          "принять и оплатить их стоимость в порядке и сроки предусмотренные настоящим договором "
+          "акт сверки счет-фактура поставка аренда Ёлка конфиденциально срочный").split()
+_LETTERS = "абвгдежзиклмнопрстуфхцчшщэюя"
+
+
+def _tag_names(rnd: random.Random, count: int) -> list[str]:
+    names = ["договор", "акт сверки", "аренда", "елка", "счет-фактура", "конфиденциально"][:count]
+    while len(names) < count:
+        word = "".join(rnd.choice(_LETTERS) for _ in range(rnd.randint(4, 12)))
+        names.append(word if rnd.random() < 0.8 else f"{word} {rnd.choice(_WORDS)}")
+    return names
+
+
+def _text(rnd: random.Random, size: int, names: list[str]) -> str:
+    parts = []
+    length = 0
+    while length < size:
+        word = rnd.choice(names) if rnd.random() < 0.01 else rnd.choice(_WORDS)
+        word = word.upper() if rnd.random() < 0.05 else word
+        parts.append(word)
+        parts.append(rnd.choice([" ", " ", "\n", ", ", "  "]))
+        length += len(word) + 1
+    return "".join(parts)
+
+
+def _regex_tags(text: str, names: list[str]) -> set[str]:
+    normalized = normalize_for_matching(text)
+    return {
+        name for name in names
+        if len(name) >= 3 and re.search(rf"(?<![^\W_]){re.escape(normalize_for_matching(name))}(?![^\W_])",
+                                        normalized)
+    }
+
+
+def _timed(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tags", type=int, nargs="+", default=[1, 100, 1000, 5000])
+    parser.add_argument("--size", type=float, default=1, help="размер текста, МБ")
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    variants = [("python", False)] + ([("native", True)] if ContentTagger(use_native=True).native else [])
+
+    for _ in range(200):
+        names = _tag_names(rnd, rnd.randint(1, 300))
+        text = _text(rnd, rnd.randint(10, 5000), names)
+        expected = _regex_tags(text, names)
+        for variant, native in variants:
+            tagger = ContentTagger(use_native=native)
+            tagger.sync(names)
+            found = {tag.name for tag in tagger.match(text)}
+            if found != expected:
+                raise AssertionError(f"{variant}: {sorted(found ^ expected)}")
+    print(f"identical tags on 200 texts ({', '.join(variant for variant, _ in variants)})")
+
+    names = _tag_names(rnd, max(args.tags))
+    text = _text(rnd, int(args.size * MB), names[:max(args.tags) // 10 + 1])
+    for count in args.tags:
+        line = f"{count:6d} tags  {len(text) / MB:4.1f} MB"
+        for variant, native in variants:
+            tagger = ContentTagger(use_native=native)
+            tagger.sync(names[:count])
+            tagger.match("")
+            line += f"   {variant} {_timed(tagger.match, text) * 1000:8.1f} ms"
+        if count <= 1000:
+            line += f"   regex per tag {_timed(_regex_tags, text, names[:count]) * 1000:9.1f} ms"
+        print(line)
+
+    tagger = ContentTagger(use_native=False)
+    tagger.sync(names)
+    tagger.match("")
+    started = time.perf_counter()
+    tagger.add("новый тег")
+    tagger.match("")
+    print(f"add one tag to {len(names)} and rebuild suffix links: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Пропускная способность list/upload при конкурентных запросах: синхронный репозиторий
+(как раньше - блокирующие вызовы PyMySQL прямо в корутине) против асинхронного.
+
+Нужна живая БД из .env (init.sql с тестовыми данными), запуск из корня репозитория:
+    python -m benchmarks.db_concurrency --concurrency 50 --requests 500
+"""
+import argparse
+import asyncio
+import time
+
+from src.core.database import session_maker, async_session_maker
+from src.modules.storage.repository import StorageRepository, AsyncStorageRepository
+
+
+async def _sync_list(user_id: int) -> None:
+    with session_maker() as session:
+        StorageRepository(session).get_files_by_filters(user_id)
+
+
+async def _async_list(user_id: int) -> None:
+    async with async_session_maker() as session:
+        await AsyncStorageRepository(session).get_files_by_filters(user_id)
+
+
+async def _sync_upload(user_id: int) -> None:
+    with session_maker() as session:
+        repository = StorageRepository(session)
+        file = repository.create_file("bench.txt", "/dev/null", 0, "text/plain", None, user_id, 1, 1)
+        repository.delete_file(file.id)
+
+
+async def _async_upload(user_id: int) -> None:
+    async with async_session_maker() as session:
+        repository = AsyncStorageRepository(session)
+        file = await repository.create_file("bench.txt", "/dev/null", 0, "text/plain", None, user_id, 1, 1)
+        await repository.delete_file(file.id)
+
+
+async def _run(operation, user_id: int, concurrency: int, total: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await operation(user_id)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    scenarios = [
+        ("list   sync ", _sync_list),
+        ("list   async", _async_list),
+        ("upload sync ", _sync_upload),
+        ("upload async", _async_upload),
+    ]
+    for name, operation in scenarios:
+        rps = await _run(operation, args.user_id, args.concurrency, args.requests)
+        print(f"{name}: {rps:8.1f} req/s (concurrency={args.concurrency}, requests={args.requests})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
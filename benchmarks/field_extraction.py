@@ -0,0 +1,138 @@
+"""
+Извлечение полей договора (content_rules): один проход extract_fields_from_text
+против прежних четырёх проходов extract_fields_legacy.
+
+Сначала сверяются результаты на корпусе договоров: сгенерированные тексты с датами,
+номерами, суммами (пробелы и неразрывные пробелы в разрядах, переводы строк внутри чисел,
+слитные цифры), организациями в кавычках и без, плюс .txt файлы из --corpus.
+Любое расхождение - ошибка. Затем замеряется время на текстах в несколько мегабайт трёх видов:
+  - prose - обычный текст договора, число примерно на каждые 30 слов;
+  - undated - такой же текст без даты: прежний вариант ищет её по всему тексту;
+  - dense - сгенерированные для сверки тексты, где числом является каждое третье слово.
+    python -m benchmarks.field_extraction --sizes 1 5 20 --corpus ./contracts
+
+Порядок результатов (CPython 3.11): prose и undated в 2.5-3.5 раза быстрее прежнего варианта,
+dense - на уровне прежнего (x0.9-1.4 между запусками): там время уходит на обработку каждого
+числа в Python, а не на проходы по тексту.
+"""
+import argparse
+import random
+import time
+from pathlib import Path
+
+from src.modules.analysis.content_rules import extract_fields_from_text, extract_fields_legacy
+
+MB = 1024 * 1024
+
+_WORDS = ["поставка", "товара", "исполнитель", "заказчик", "обязуется", "оплатить", "в течение", "дней",
+          "настоящий", "сторона", "услуги", "акт", "счёт", "НДС", "включая", "руб.", "коп.", "срок", "a.b",
+          "Договор", "ДОГОВОР", "Номер договора", "№", "сумма", "итого", "итого к оплате", "стоимость",
+          "ООО", "АО", "ПАО", "ЗАО", "ИП", "ПАОА", "xООО", "«", "»", "\"", ",", ".", ":", "-", "/", "_"]
+_ORGS = ["«Ромашка»", "\"Вектор-2\"", "Лютик", "«Альфа Строй»", "Север.", "«Бета»,", "Ёлка", "«»"]
+
+
+def _token(rnd: random.Random) -> str:
+    kind = rnd.random()
+    if kind < 0.15:
+        sep = rnd.choice([".", "-"])
+        return f"{rnd.randint(0, 39)}{sep}{rnd.randint(0, 19):02d}{sep}{rnd.randint(0, 2099)}"
+    if kind < 0.35:
+        group = rnd.choice([" ", " ", "\n", "", "  "])
+        number = group.join(str(rnd.randint(0, 999)).zfill(rnd.choice([1, 3])) for _ in range(rnd.randint(1, 4)))
+        if rnd.random() < 0.3:
+            number += rnd.choice([",", "."]) + str(rnd.randint(0, 99))
+        return number
+    if kind < 0.45:
+        return f"{rnd.choice(['ООО', 'АО', 'ПАО', 'ЗАО', 'ИП'])}{rnd.choice([' ', '', '  '])}{rnd.choice(_ORGS)}"
+    if kind < 0.5:
+        return f"№{rnd.choice(['', ' ', ': '])}{rnd.choice(['12/3-А', 'Д-15', '', ',', '7'])}"
+    if kind < 0.501:
+        # не помещается во float: inf
+        return "9" * rnd.choice([310, 400])
+    return rnd.choice(_WORDS)
+
+
+def _contract(rnd: random.Random, tokens: int) -> str:
+    parts = []
+    for _ in range(tokens):
+        parts.append(_token(rnd))
+        parts.append(rnd.choice([" ", " ", " ", "\n", "", ", "]))
+    return "".join(parts)
+
+
+_PROSE = ("настоящий договор заключен между сторонами исполнитель обязуется оказать услуги а заказчик "
+          "принять и оплатить их стоимость в порядке и сроки предусмотренные настоящим договором "
+          "Директор Общество Арендатор Плательщик НДС итого сумма с учетом").split()
+
+
+# даты внутри чисел и рядом с ними, числа без дат
+_EDGE_CASES = ["0,12.05.2024", "1234.12.05.2024", "1 205.05.2024", "1 2345-05-24", "А12.05.2024 3.12.05.2024",
+               "сумма 1 000,50 без даты", "12.05", "31-12-99x 01.01.2024", "9.9.99"]
+
+
+def _prose(rnd: random.Random, words: int, dated: bool = True) -> str:
+    parts = [f"Договор № {rnd.randint(1, 999)}/{rnd.randint(1, 99)}"]
+    if dated:
+        parts.append(f"от {rnd.randint(1, 28):02d}.05.2024")
+    for _ in range(words):
+        parts.append(rnd.choice(_PROSE))
+        if rnd.random() < 0.03:
+            parts.append(f"{rnd.randint(1, 999)} {rnd.randint(0, 999):03d},{rnd.randint(0, 99):02d}")
+        if rnd.random() < 0.005:
+            parts.append(rnd.choice(["ООО «Ромашка»,", "АО \"Вектор\"", "ИП Иванов."]))
+    return " ".join(parts)
+
+
+def _check(texts) -> int:
+    checked = 0
+    for name, text in texts:
+        expected = extract_fields_legacy(text)
+        actual = extract_fields_from_text(text)
+        if expected != actual:
+            raise AssertionError(f"{name}: {expected!r} != {actual!r}")
+        window = len(text) // 2
+        if extract_fields_legacy(text[:window]) != extract_fields_from_text(text, scan_window=window):
+            raise AssertionError(f"{name}: результат с scan_window={window} расходится")
+        checked += 1
+    return checked
+
+
+def _timed(func, text: str) -> float:
+    started = time.perf_counter()
+    func(text)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 20], help="размеры текстов, МБ")
+    parser.add_argument("--contracts", type=int, default=2000, help="сколько договоров сгенерировать для сверки")
+    parser.add_argument("--corpus", type=Path, default=None, help="папка с .txt договорами для сверки")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rnd = random.Random(args.seed)
+    texts = [(f"edge case {text!r}", text) for text in _EDGE_CASES]
+    texts += [(f"generated #{i}", _contract(rnd, rnd.randint(1, 400))) for i in range(args.contracts)]
+    if args.corpus:
+        texts += [(str(path), path.read_text(encoding="utf-8", errors="ignore"))
+                  for path in sorted(args.corpus.rglob("*.txt"))]
+    print(f"identical results on {_check(texts)} contracts")
+
+    texts = [(f"prose #{i}", _prose(rnd, rnd.randint(10, 3000))) for i in range(args.contracts // 10)]
+    print(f"identical results on {_check(texts)} prose contracts")
+
+    for size_mb in args.sizes:
+        for profile, sample in (("prose", _prose(rnd, 20000)), ("undated", _prose(rnd, 20000, dated=False)),
+                                ("dense", _contract(rnd, 1000))):
+            text = sample * max(1, int(size_mb * MB / len(sample)))
+            if extract_fields_legacy(text) != extract_fields_from_text(text):
+                raise AssertionError(f"{profile} {size_mb} MB: результаты расходятся")
+            legacy = _timed(extract_fields_legacy, text)
+            single = _timed(extract_fields_from_text, text)
+            print(f"{len(text) / MB:6.1f} MB {profile:<7}  legacy {legacy * 1000:8.1f} ms"
+                  f"   single pass {single * 1000:8.1f} ms   x{legacy / single:4.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Пропускная способность хэширования содержимого загрузок, вплоть до лимита 100 МБ.
+
+Для каждого алгоритма и размера меряется:
+  - hash only   - только хэширование блоками CHUNK_SIZE из памяти;
+  - save+hash   - FileSaveService.stage_file с хэшером (одна запись, один проход);
+  - save only   - та же запись без хэша, для сравнения накладных расходов.
+    python -m benchmarks.hash_throughput --sizes 1 10 100
+"""
+import argparse
+import io
+import os
+import tempfile
+import time
+
+from src.modules.file_save_service.file_save_service import FileSaveService
+from src.modules.get_hash import create_hasher, SUPPORTED_ALGORITHMS, CHUNK_SIZE
+
+MB = 1024 * 1024
+
+
+def _hash_only(data: bytes, algorithm: str) -> float:
+    view = memoryview(data)
+    started = time.perf_counter()
+    hasher = create_hasher(algorithm)
+    for offset in range(0, len(view), CHUNK_SIZE):
+        hasher.update(view[offset:offset + CHUNK_SIZE])
+    hasher.hexdigest()
+    return time.perf_counter() - started
+
+
+class _NoHash:
+    def update(self, data: bytes) -> None:
+        pass
+
+    def hexdigest(self) -> str:
+        return ""
+
+
+def _save(service: FileSaveService, data: bytes, algorithm: str | None) -> float:
+    started = time.perf_counter()
+    saved = service.stage_file(io.BytesIO(data), "bench.bin", create_hasher(algorithm) if algorithm else _NoHash())
+    elapsed = time.perf_counter() - started
+    os.unlink(saved.path)
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 100], help="размеры файлов, МБ")
+    parser.add_argument("--algorithms", nargs="+", default=list(SUPPORTED_ALGORITHMS))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        service = FileSaveService(directory)
+        for size_mb in args.sizes:
+            data = os.urandom(size_mb * MB)
+            save_only = _save(service, data, None)
+            print(f"{size_mb:4d} MB  save only          {size_mb / save_only:8.1f} MB/s")
+            for algorithm in args.algorithms:
+                hash_only = _hash_only(data, algorithm)
+                save_hash = _save(service, data, algorithm)
+                print(f"{size_mb:4d} MB  {algorithm:<9} hash only {size_mb / hash_only:8.1f} MB/s"
+                      f"   save+hash {size_mb / save_hash:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Задержка "обычных" запросов во время волны логинов: bcrypt прямо в корутине
+(как раньше) против пула потоков PasswordManager.verify_password_async.
+
+Пробная корутина раз в --probe-interval секунд засыпает и меряет, насколько позже
+её разбудил event loop - это задержка, которую увидел бы любой не связанный с
+авторизацией запрос на том же воркере. БД не нужна:
+    python -m benchmarks.login_latency --logins 40 --workers 2
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.core.exceptions import PasswordHashingOverloadedError
+from src.core.security import PasswordManager
+
+
+async def _probe(stop: asyncio.Event, interval: float, delays: list[float]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        delays.append(time.perf_counter() - started - interval)
+
+
+async def _scenario(manager: PasswordManager, hashed: str, logins: int, use_pool: bool, interval: float):
+    async def login() -> bool:
+        if use_pool:
+            try:
+                return await manager.verify_password_async("Password123", hashed)
+            except PasswordHashingOverloadedError:
+                return False
+        return manager.verify_password("Password123", hashed)
+
+    stop = asyncio.Event()
+    delays: list[float] = []
+    probe = asyncio.create_task(_probe(stop, interval, delays))
+    await asyncio.sleep(interval * 2)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await probe
+    delays.sort()
+    p99 = delays[min(len(delays) - 1, int(len(delays) * 0.99))] if delays else 0.0
+    return sum(results) / elapsed, statistics.median(delays or [0.0]), p99, logins - sum(results)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=40)
+    parser.add_argument("--rounds", type=int, default=12)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-pending", type=int, default=32)
+    parser.add_argument("--probe-interval", type=float, default=0.01)
+    args = parser.parse_args()
+
+    manager = PasswordManager(rounds=args.rounds, max_workers=args.workers, max_pending=args.max_pending)
+    hashed = manager.hash_password("Password123")
+
+    for name, use_pool in (("inline bcrypt", False), ("bcrypt pool  ", True)):
+        rate, p50, p99, rejected = await _scenario(manager, hashed, args.logins, use_pool, args.probe_interval)
+        print(f"{name}: {rate:6.1f} logins/s, other requests delay p50={p50 * 1000:7.1f} ms "
+              f"p99={p99 * 1000:7.1f} ms, rejected(503)={rejected}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
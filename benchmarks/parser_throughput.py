@@ -0,0 +1,66 @@
+"""
+Пропускная способность разбора нескольких документов параллельно в зависимости
+от размера пула процессов ParserRegistry (0 - разбор в потоке текущего процесса).
+
+Без --files генерируются синтетические .docx (python-docx), иначе разбираются
+указанные файлы:
+    python -m benchmarks.parser_throughput --count 16 --paragraphs 3000
+    python -m benchmarks.parser_throughput --files contracts/*.pdf
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from docx import Document
+
+from src.modules.parser import ParserRegistry
+
+
+def _generate_docx(directory: Path, count: int, paragraphs: int) -> list[Path]:
+    paths = []
+    for index in range(count):
+        document = Document()
+        for line in range(paragraphs):
+            document.add_paragraph(f"Пункт {line}. Поставщик обязуется поставить товар на сумму {line * 1000} руб.")
+        path = directory / f"contract_{index}.docx"
+        document.save(str(path))
+        paths.append(path)
+    return paths
+
+
+async def _measure(registry: ParserRegistry, paths: list[Path]) -> float:
+    # прогрев: запуск процессов пула не входит в замер
+    await asyncio.gather(*(registry.parse_async(paths[0]) for _ in range(max(registry.pool_size, 1))))
+    started = time.perf_counter()
+    await asyncio.gather(*(registry.parse_async(path) for path in paths))
+    return len(paths) / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", nargs="*", type=Path)
+    parser.add_argument("--count", type=int, default=16)
+    parser.add_argument("--paragraphs", type=int, default=3000)
+    parser.add_argument("--max-pool", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = args.files or _generate_docx(Path(directory), args.count, args.paragraphs)
+        print(f"{len(paths)} файлов, ядер: {os.cpu_count()}")
+
+        for pool_size in range(0, args.max_pool + 1):
+            registry = ParserRegistry(pool_size=pool_size)
+            registry.start()
+            try:
+                rate = await _measure(registry, paths)
+            finally:
+                registry.shutdown()
+            label = "thread" if pool_size == 0 else f"{pool_size} proc"
+            print(f"{label:>8}: {rate:7.2f} files/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+"""
+Фильтр списка файлов по тегам: прежний вариант (EXISTS на каждый тег) против
+одного запроса GROUP BY file_id HAVING COUNT(DISTINCT tag_id) = n.
+
+Нужна живая БД из .env (init.sql с тестовыми данными). --seed один раз наполняет её
+синтетическими данными (по умолчанию 1M файлов и 10M связей с тегами, это долго),
+дальше замеры можно повторять без него:
+    python -m benchmarks.tag_filter --seed --files 1000000 --links 10000000
+    python -m benchmarks.tag_filter --repeat 20
+"""
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select, func, text
+from sqlalchemy.orm import selectinload
+
+from src.core.database import session_maker
+from src.modules.storage.models import File, FileTag, Tag
+from src.modules.storage.repository import StorageRepository
+
+TAG_PREFIX = "bench-tag-"
+BATCH_SIZE = 10_000
+
+
+def _seed(user_id: int, files: int, links: int, tags: int) -> None:
+    rng = random.Random(42)
+    started_at = datetime(2020, 1, 1)
+    with session_maker() as session:
+        existing = session.execute(select(func.count(Tag.id)).where(Tag.tag_name.like(f"{TAG_PREFIX}%"))).scalar()
+        if existing < tags:
+            session.execute(insert(Tag), [
+                {"tag_name": f"{TAG_PREFIX}{index}", "tag_type": "auto"} for index in range(existing, tags)
+            ])
+        tag_ids = session.execute(select(Tag.id).where(Tag.tag_name.like(f"{TAG_PREFIX}%"))).scalars().all()
+
+        first_id = (session.execute(select(func.max(File.id))).scalar() or 0) + 1
+        file_types = ["application/pdf", "text/plain", "application/msword", "image/png"]
+        for offset in range(0, files, BATCH_SIZE):
+            session.execute(insert(File), [
+                {
+                    "title": f"bench-{offset + index}",
+                    "file_path": "/dev/null",
+                    "file_size": 0,
+                    "file_type": rng.choice(file_types),
+                    "user_id": user_id,
+                    "category_id": 1,
+                    "source_id": 1,
+                    "last_modified": started_at + timedelta(seconds=rng.randrange(5 * 365 * 86400)),
+                }
+                for index in range(min(BATCH_SIZE, files - offset))
+            ])
+            session.commit()
+            print(f"files: {offset + BATCH_SIZE:>10}/{files}", end="\r")
+        print()
+
+        # популярность тегов неравномерная, как в жизни: первые теги встречаются чаще
+        weights = [1 / (rank + 1) for rank in range(len(tag_ids))]
+        for offset in range(0, links, BATCH_SIZE):
+            pairs = {
+                (first_id + rng.randrange(files), tag_id)
+                for tag_id in rng.choices(tag_ids, weights=weights, k=min(BATCH_SIZE, links - offset))
+            }
+            session.execute(insert(FileTag).prefix_with("IGNORE"), [
+                {"file_id": file_id, "tag_id": tag_id} for file_id, tag_id in pairs
+            ])
+            session.commit()
+            print(f"links: {offset + BATCH_SIZE:>10}/{links}", end="\r")
+        print()
+        session.execute(text("ANALYZE TABLE files, file_tags_users, tags"))
+
+
+def _legacy_filter(session, user_id: int, tags: list[str], limit: int) -> list:
+    # как было до перехода на GROUP BY: отдельный коррелированный EXISTS на каждый тег
+    stmt = select(File).where(File.user_id == user_id).options(
+        selectinload(File.category),
+        selectinload(File.source),
+        selectinload(File.tags)
+    )
+    for tag in tags:
+        stmt = stmt.where(File.tags.any(tag_name=tag))
+    stmt = stmt.order_by(File.last_modified.desc(), File.id.desc()).limit(limit)
+    return session.execute(stmt).scalars().all()
+
+
+def _measure(callback, repeat: int) -> tuple[float, float, int]:
+    timings = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = len(callback())
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings), max(timings), rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--seed", action="store_true", help="наполнить БД синтетическими файлами и тегами")
+    parser.add_argument("--files", type=int, default=1_000_000)
+    parser.add_argument("--links", type=int, default=10_000_000)
+    parser.add_argument("--tags", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.seed:
+        _seed(args.user_id, args.files, args.links, args.tags)
+
+    with session_maker() as session:
+        repository = StorageRepository(session)
+        for count in (1, 2, 3, 5):
+            # самые популярные теги - худший случай для EXISTS на каждый тег
+            tags = [f"{TAG_PREFIX}{index}" for index in range(count)]
+            scenarios = [
+                ("exists per tag  ", lambda: _legacy_filter(session, args.user_id, tags, args.limit)),
+                ("group by all    ", lambda: repository.get_files_by_filters(args.user_id, tags=tags,
+                                                                             limit=args.limit)),
+                ("group by any    ", lambda: repository.get_files_by_filters(args.user_id, tags=tags,
+                                                                             limit=args.limit, tag_mode="any")),
+            ]
+            for name, callback in scenarios:
+                median, worst, rows = _measure(callback, args.repeat)
+                print(f"tags={count} {name}: median {median:8.1f} ms, max {worst:8.1f} ms, rows={rows}")
+                session.expunge_all()
+
+
+if __name__ == "__main__":
+    main()
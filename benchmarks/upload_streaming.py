@@ -0,0 +1,96 @@
+"""
+Приём одной загрузки: прежний путь через форму Starlette против потокового разбора.
+
+  - starlette form - File(...): MultiPartParser складывает файл в SpooledTemporaryFile
+                     (выше 1 МБ - на диск), затем FileSaveService.stage_file переписывает его;
+  - streaming      - MultipartUploadReader пишет части сразу во временный файл хранилища.
+
+Для каждого пути печатается время, объём записи на диск (wchar из /proc/self/io, только Linux)
+и пик памяти Python (tracemalloc). Тело подаётся кусками по 64 КБ, как его отдаёт uvicorn:
+    python -m benchmarks.upload_streaming --sizes 10 100
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+from starlette.datastructures import Headers
+from starlette.formparsers import MultiPartParser
+
+from src.modules.file_save_service.file_save_service import FileSaveService
+from src.modules.get_hash import create_hasher
+from src.modules.storage.streaming_upload import MultipartUploadReader
+
+MB = 1024 * 1024
+BOUNDARY = "benchmarkboundary7f3a"
+NETWORK_CHUNK = 64 * 1024
+
+
+def _body(data: bytes) -> bytes:
+    return (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"files\"; filename=\"bench.bin\"\r\n"
+            f"Content-Type: application/octet-stream\r\n\r\n").encode() + data + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+async def _stream(body: bytes):
+    view = memoryview(body)
+    for offset in range(0, len(view), NETWORK_CHUNK):
+        yield bytes(view[offset:offset + NETWORK_CHUNK])
+
+
+def _written_bytes() -> int:
+    try:
+        with open("/proc/self/io") as io_stats:
+            for line in io_stats:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+async def _starlette_form(service: FileSaveService, body: bytes) -> str:
+    headers = Headers({"content-type": f"multipart/form-data; boundary={BOUNDARY}"})
+    form = await MultiPartParser(headers, _stream(body), max_part_size=len(body)).parse()
+    upload = form["files"]
+    saved = await asyncio.to_thread(service.stage_file, upload.file, upload.filename, create_hasher())
+    await form.close()
+    return saved.path
+
+
+async def _streaming(service: FileSaveService, body: bytes) -> str:
+    reader = MultipartUploadReader(service, create_hasher, len(body), len(body))
+    received = await reader.read(f"multipart/form-data; boundary={BOUNDARY}", str(len(body)), _stream(body))
+    return received[0].saved.path
+
+
+async def _measure(name: str, path, service: FileSaveService, body: bytes, size_mb: int) -> None:
+    written = _written_bytes()
+    tracemalloc.start()
+    started = time.perf_counter()
+    staged_path = await path(service, body)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    written = _written_bytes() - written
+    os.unlink(staged_path)
+    print(f"{size_mb:4d} MB  {name:<15} {elapsed * 1000:8.1f} ms   written {written / MB:7.1f} MB"
+          f"   peak memory {peak / MB:6.1f} MB")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 100], help="размеры файлов, МБ")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        service = FileSaveService(directory)
+        for size_mb in args.sizes:
+            body = _body(os.urandom(size_mb * MB))
+            await _measure("starlette form", _starlette_form, service, body, size_mb)
+            await _measure("streaming", _streaming, service, body, size_mb)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
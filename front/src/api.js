@@ -55,7 +55,7 @@ export const storageAPI = {
 
 export const metadataAPI = {
   getTags: () => api.get('/api/tag'),
-  getCounterparties: () => api.get('/api/counterparty')
+  getCounterparties: (q = '', limit = 20) => api.get('/api/counterparty', { params: { q, limit } })
 }
 
 export default api
\ No newline at end of file
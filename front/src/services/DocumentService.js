@@ -2,11 +2,13 @@ import { apiService } from './api';
 
 class DocumentService {
   /**
-   * 📥 Получение списка документов
+   * 📥 Получение страницы документов: { documents, nextCursor }.
+   * Следующая страница - тот же запрос с cursor = nextCursor, null - страница последняя
    */
- async getDocuments(filters = {}) {
+ async getDocuments(filters = {}, cursor = null) {
   console.log('📋 [DocumentService] Запрос списка документов:', {
-    filters
+    filters,
+    cursor
   });
 
   try {
@@ -21,6 +23,9 @@ class DocumentService {
         }
       }
     });
+    if (cursor) {
+      queryParams.append('cursor', cursor);
+    }
 
     const queryString = queryParams.toString();
     const url = queryString ? `/storage?${queryString}` : '/storage';
@@ -30,21 +35,23 @@ class DocumentService {
     const response = await apiService.request(url);
 
     console.log('✅ [DocumentService] Документы получены:', {
-      count: response?.length || 0,
+      count: response?.items?.length || 0,
+      nextCursor: response?.next_cursor,
       response
     });
 
     // ПРЕОБРАЗУЕМ ДАННЫЕ ИЗ БЭКЕНДА В ФОРМАТ ФРОНТЕНДА
-    const documents = this.transformBackendData(response || []);
+    // бэкенд отдаёт страницу { items, next_cursor }, следующая - с параметром cursor
+    const documents = this.transformBackendData(response?.items || []);
 
     console.log('🔄 [DocumentService] Преобразованные документы:', documents);
 
-    return documents;
+    return { documents, nextCursor: response?.next_cursor || null };
   } catch (error) {
     console.error('❌ [DocumentService] Ошибка при получении документов:', error);
 
     console.log('📋 [DocumentService] Endpoint /storage не доступен, используем mock данные');
-    return this.getMockDocuments();
+    return { documents: this.getMockDocuments(), nextCursor: null };
   }
 }
 
@@ -73,6 +80,7 @@ transformBackendData(backendDocuments) {
       status: doc.status || 'processed', // если нет статуса
       size: doc.file_size ? this.formatFileSize(doc.file_size) : 'Unknown',
       tags: doc.tags || [],
+      preview: doc.first_lines || '', // первые строки текста, появляются после фоновой обработки
       file_path: doc.file_path, // сохраняем оригинальные поля если нужны
       file_type: doc.file_type,
       file_hash: doc.file_hash
@@ -0,0 +1,37 @@
+# асинхронные варианты синхронных репозиториев
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class AsyncRepository:
+    """
+    Асинхронный вариант синхронного репозитория с тем же набором методов.
+
+    Каждый публичный метод sync_repository_class вызывается через AsyncSession.run_sync:
+    код репозитория выполняется в greenlet поверх асинхронного драйвера,
+    поэтому ожидание ответа БД не блокирует event loop.
+    Запросы описываются один раз - в синхронном репозитории.
+
+    Возвращаемые ORM-объекты после выхода из run_sync нельзя лениво догружать,
+    нужные связи должны загружаться в самом методе репозитория (joinedload/selectinload).
+    """
+
+    sync_repository_class: type = None
+
+    def __init__(self, session: AsyncSession):
+        self._session: AsyncSession = session
+
+    def __getattr__(self, name: str):
+        method = getattr(self.sync_repository_class, name, None)
+        if name.startswith("_") or not callable(method):
+            raise AttributeError(f"{type(self).__name__} has no attribute {name!r}")
+
+        async def call(*args, **kwargs):
+            return await self._session.run_sync(
+                lambda sync_session: method(self.sync_repository_class(sync_session), *args, **kwargs)
+            )
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        # кэшируем обёртку, чтобы __getattr__ не вызывался повторно
+        setattr(self, name, call)
+        return call
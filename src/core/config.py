@@ -24,6 +24,20 @@ SQLALCHEMY_DATABASE_URL = URL.create(
     database=DB_NAME
 )
 
+# тот же DSN для асинхронного движка # aiomysql
+SQLALCHEMY_ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.set(drivername="mysql+aiomysql")
+
+# пул соединений, размеры задаются на один процесс uvicorn
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 3600))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+# соединение, которое держат дольше этого времени (сек), считается утечкой
+DB_POOL_LEAK_THRESHOLD = float(os.environ.get("DB_POOL_LEAK_THRESHOLD", 30))
+# сохранять стек места выдачи соединения (дорого, только для отладки утечек)
+DB_POOL_LEAK_TRACEBACK = os.environ.get("DB_POOL_LEAK_TRACEBACK", "false").lower() == "true"
+
 # jwt конфигурация
 JWT_KEY = os.environ.get("JWT_KEY")
 JWT_ACCESS_EXPIRATION = int(os.environ.get("JWT_ACCESS_EXPIRATION"))
@@ -32,6 +46,54 @@ JWT_ALGORITHM = os.environ.get("JWT_ALGORITHM")
 
 if not all([JWT_KEY, JWT_ACCESS_EXPIRATION, JWT_REFRESH_EXPIRATION, JWT_ALGORITHM]):
     raise JWTConfigException("Not enough data for jwt building")
+# сколько проверенных токенов держать в памяти процесса
+JWT_TOKEN_CACHE_SIZE = int(os.environ.get("JWT_TOKEN_CACHE_SIZE", 10000))
+# id пользователей с доступом к служебным маршрутам (/api/metrics) через запятую, пусто - ни у кого.
+# Роль из токена не подходит: это должность, которую пользователь указывает сам при регистрации
+ADMIN_USER_IDS = frozenset(int(user_id) for user_id in os.environ.get("ADMIN_USER_IDS", "").split(",") if user_id.strip())
+
+# пул потоков bcrypt: число потоков и сколько запросов может ждать в очереди до отказа 503
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get("PASSWORD_HASH_MAX_PENDING", 32))
 
 FILE_SAVE_BASE_PATH = os.environ.get("FILE_SAVE_BASE_PATH")
 MAX_FILE_SIZE = int(os.environ.get("MAX_FILE_SIZE"))
+# предел всего тела запроса на загрузку (все файлы формы), как client_max_body_size в nginx
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 100 * 1024 * 1024))
+# сколько файлов одной загрузки одновременно пишутся на диск и хэшируются
+UPLOAD_CONCURRENCY = int(os.environ.get("UPLOAD_CONCURRENCY", 4))
+# число фоновых воркеров разбора и анализа загруженных файлов
+INGESTION_WORKERS = int(os.environ.get("INGESTION_WORKERS", 2))
+# пул процессов для разбора документов: 0 - разбор в потоке текущего процесса
+PARSER_POOL_SIZE = int(os.environ.get("PARSER_POOL_SIZE", 2))
+PARSER_MAX_TASKS_PER_CHILD = int(os.environ.get("PARSER_MAX_TASKS_PER_CHILD", 100))
+PARSER_TIMEOUT = float(os.environ.get("PARSER_TIMEOUT", 120))
+# превью текста в списке файлов (files.first_lines), строится при фоновой обработке загрузки
+PREVIEW_MAX_CHARS = int(os.environ.get("PREVIEW_MAX_CHARS", 500))
+PREVIEW_MAX_LINES = int(os.environ.get("PREVIEW_MAX_LINES", 5))
+# сколько первых символов текста просматривает извлечение полей договора, 0 - весь текст
+ANALYSIS_SCAN_WINDOW = int(os.environ.get("ANALYSIS_SCAN_WINDOW", 0))
+# авто-теги по содержимому: JSON с синонимами тегов ({"договор": ["контракт"]}, пусто - без синонимов)
+# и минимальная длина названия тега, которое ищется в тексте
+CONTENT_TAG_SYNONYMS_FILE = os.environ.get("CONTENT_TAG_SYNONYMS_FILE", "")
+CONTENT_TAG_MIN_LENGTH = int(os.environ.get("CONTENT_TAG_MIN_LENGTH", 3))
+# алгоритм хэша содержимого файлов: sha256, blake2b, xxh3_128, xxh64
+FILE_HASH_ALGORITHM = os.environ.get("FILE_HASH_ALGORITHM", "sha256")
+# размер страницы списка файлов по умолчанию и верхняя граница для клиента
+FILES_PAGE_SIZE = int(os.environ.get("FILES_PAGE_SIZE", 50))
+MAX_PAGE_SIZE = int(os.environ.get("MAX_PAGE_SIZE", 200))
+# скачивание через nginx: приложение только проверяет доступ и отвечает X-Accel-Redirect
+# на internal-location DOWNLOAD_ACCEL_PREFIX, в котором nginx раздаёт FILE_SAVE_BASE_PATH
+DOWNLOAD_ACCEL_REDIRECT = os.environ.get("DOWNLOAD_ACCEL_REDIRECT", "false").lower() in ("1", "true", "yes")
+DOWNLOAD_ACCEL_PREFIX = os.environ.get("DOWNLOAD_ACCEL_PREFIX", "/protected-files/")
+# кэш: memory - в памяти каждого процесса, redis - общий для всех воркеров
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memory")
+CACHE_MAX_BYTES = int(os.environ.get("CACHE_MAX_BYTES", 64 * 1024 * 1024))
+REDIS_HOST = os.environ.get("REDIS_HOST", "redis")
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
+# время жизни справочников (категории, источники, теги) в кэше, секунды
+REFERENCE_CACHE_TTL = float(os.environ.get("REFERENCE_CACHE_TTL", 60))
+# время жизни закэшированных страниц списка файлов, секунды
+LISTING_CACHE_TTL = float(os.environ.get("LISTING_CACHE_TTL", 300))
+# сжатый извлечённый текст документов (ключ - хэш содержимого и версия парсера)
+TEXT_STORE_PATH = os.environ.get("TEXT_STORE_PATH") or os.path.join(FILE_SAVE_BASE_PATH, "texts")
@@ -1,9 +1,13 @@
 # инициализация соединений с базами данных
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 
-from src.core.config import SQLALCHEMY_DATABASE_URL
+from src.core.config import SQLALCHEMY_DATABASE_URL, SQLALCHEMY_ASYNC_DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, \
+    DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING, DB_POOL_LEAK_THRESHOLD, DB_POOL_LEAK_TRACEBACK
+from src.core.pool_metrics import PoolMetrics, measured_pool_class
 
 Base = declarative_base()
 
@@ -14,15 +18,49 @@ from src.modules.storage.models import Source
 from src.modules.storage.models import Category
 from src.modules.storage.models import Tag
 from src.modules.storage.models import FileTag
+from src.modules.storage.models import Blob
+from src.modules.storage.models import DocumentText
+from src.modules.storage.models import FileAnalysisFields
+from src.modules.storage.models import Counterparty
+from src.modules.storage.models import FileCounterparty
 
+pool_metrics = PoolMetrics("sync", DB_POOL_LEAK_THRESHOLD, DB_POOL_LEAK_TRACEBACK)
+async_pool_metrics = PoolMetrics("async", DB_POOL_LEAK_THRESHOLD, DB_POOL_LEAK_TRACEBACK)
+
+# синхронный движок: скрипты, фоновые задачи, бенчмарки
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     echo=True,
-    pool_recycle=3600  # закрытие соединений при бездействии
+    poolclass=measured_pool_class(QueuePool, pool_metrics),
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE  # закрытие соединений при бездействии
 )
+pool_metrics.attach(engine)
 session_maker = sessionmaker(
     bind=engine,
     autocommit=False,
     autoflush=False,
     expire_on_commit=False
 )
+
+# асинхронный движок (aiomysql): используется обработчиками запросов,
+# чтобы запросы к БД не блокировали event loop
+async_engine = create_async_engine(
+    SQLALCHEMY_ASYNC_DATABASE_URL,
+    echo=True,
+    poolclass=measured_pool_class(AsyncAdaptedQueuePool, async_pool_metrics),
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=DB_POOL_PRE_PING,
+    pool_recycle=DB_POOL_RECYCLE
+)
+async_pool_metrics.attach(async_engine.sync_engine)
+async_session_maker = async_sessionmaker(
+    bind=async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
@@ -1,27 +1,63 @@
 # внедрение зависимостей, функции провайдеры для этого
+from functools import partial
+
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from src.core.config import JWT_KEY, JWT_ACCESS_EXPIRATION, JWT_REFRESH_EXPIRATION, JWT_ALGORITHM, FILE_SAVE_BASE_PATH
-from fastapi import Depends
+from src.core.config import JWT_KEY, JWT_ACCESS_EXPIRATION, JWT_REFRESH_EXPIRATION, JWT_ALGORITHM, FILE_SAVE_BASE_PATH, \
+    PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, FILE_HASH_ALGORITHM, INGESTION_WORKERS, PARSER_POOL_SIZE, \
+    PARSER_MAX_TASKS_PER_CHILD, PARSER_TIMEOUT, TEXT_STORE_PATH, UPLOAD_CONCURRENCY, CACHE_BACKEND, CACHE_MAX_BYTES, \
+    REDIS_HOST, REDIS_PORT, REFERENCE_CACHE_TTL, LISTING_CACHE_TTL, JWT_TOKEN_CACHE_SIZE, PREVIEW_MAX_CHARS, \
+    PREVIEW_MAX_LINES, ANALYSIS_SCAN_WINDOW, CONTENT_TAG_SYNONYMS_FILE, CONTENT_TAG_MIN_LENGTH, ADMIN_USER_IDS
+from fastapi import Depends, HTTPException
 
-from src.modules.analysis import analyze_file
+from src.modules.analysis import analyze_db_file, ContentTagger, load_synonyms
+from src.modules.cache import CacheBackend, create_cache_backend
 from src.modules.file_save_service.file_save_service import FileSaveService
-from src.modules.get_hash import get_file_hash
+from src.modules.get_hash import create_hasher
+from src.modules.jwt.schemas import TokenClaims
 from src.modules.jwt.services import JWTService
+from src.modules.jwt.token_cache import VerifiedTokenCache
+from src.modules.jwt.util import TokenType
 from src.core.security import PasswordManager
 from sqlalchemy.orm import Session
-from src.core.database import session_maker
+from sqlalchemy.ext.asyncio import AsyncSession
+from src.core.database import session_maker, async_session_maker, pool_metrics, async_pool_metrics
+from src.core.pool_metrics import PoolMetrics
+from src.modules.ingestion import IngestionQueue
 from src.modules.parser import ParserRegistry
-from src.modules.parser.services import parse_upload_file
-from src.modules.storage.repository import StorageRepository
+from src.modules.storage.cached_repository import CachedStorageRepository, ReferenceDataCache
+from src.modules.storage.listing_cache import ListingCache
+from src.modules.storage.repository import AsyncStorageRepository
 from src.modules.storage.services import StorageService
+from src.modules.text_store import TextStore
 
-from src.modules.user.repository import UserRepository
+from src.modules.user.repository import AsyncUserRepository
 from src.modules.user.services import UserService
 
-_password_manager = PasswordManager()
+_password_manager = PasswordManager(max_workers=PASSWORD_HASH_WORKERS, max_pending=PASSWORD_HASH_MAX_PENDING)
 _jwt_service = JWTService(JWT_KEY, JWT_ACCESS_EXPIRATION, JWT_REFRESH_EXPIRATION, JWT_ALGORITHM)
 _oauth2_scheme = HTTPBearer()
+_token_cache = VerifiedTokenCache(_jwt_service, JWT_TOKEN_CACHE_SIZE)
+_parser_registry = ParserRegistry(pool_size=PARSER_POOL_SIZE, max_tasks_per_child=PARSER_MAX_TASKS_PER_CHILD,
+                                  timeout=PARSER_TIMEOUT)
+_text_store = TextStore(TEXT_STORE_PATH)
+_cache_backend = create_cache_backend(CACHE_BACKEND, CACHE_MAX_BYTES, REDIS_HOST, REDIS_PORT)
+_reference_cache = ReferenceDataCache(_cache_backend, REFERENCE_CACHE_TTL)
+_listing_cache = ListingCache(_cache_backend, LISTING_CACHE_TTL)
+_content_tagger = ContentTagger(load_synonyms(CONTENT_TAG_SYNONYMS_FILE), CONTENT_TAG_MIN_LENGTH)
+_ingestion_queue = IngestionQueue(async_session_maker, _parser_registry, _text_store,
+                                  partial(analyze_db_file, scan_window=ANALYSIS_SCAN_WINDOW or None,
+                                          content_tagger=_content_tagger),
+                                  workers=INGESTION_WORKERS,
+                                  repository_factory=lambda session: CachedStorageRepository(
+                                      AsyncStorageRepository(session), _reference_cache),
+                                  listing_cache=_listing_cache,
+                                  preview_max_chars=PREVIEW_MAX_CHARS,
+                                  preview_max_lines=PREVIEW_MAX_LINES,
+                                  content_tagger=_content_tagger)
+
+# проверяем название алгоритма при старте, а не на первой загрузке
+create_hasher(FILE_HASH_ALGORITHM)
 
 
 def get_password_manager() -> PasswordManager:
@@ -31,21 +67,42 @@ def get_password_manager() -> PasswordManager:
 def get_session() -> Session:
     db = session_maker()
     try:
-        return db
+        yield db
     except Exception:
+        db.rollback()
+        raise
+    finally:
         db.close()
+
+
+async def get_async_session() -> AsyncSession:
+    # сессия живёт в пределах обработчика (Depends(..., scope="function")):
+    # соединение возвращается в пул до отправки ответа клиенту
+    db = async_session_maker()
+    try:
+        yield db
+    except Exception:
+        await db.rollback()
         raise
+    finally:
+        await db.close()
+
+
+def get_pool_metrics() -> list[PoolMetrics]:
+    return [pool_metrics, async_pool_metrics]
 
 
 def get_jwt_service() -> JWTService:
     return _jwt_service
 
 
-def get_user_repository(session: Session = Depends(get_session)) -> UserRepository:
-    return UserRepository(session)
+def get_user_repository(
+        session: AsyncSession = Depends(get_async_session, scope="function")
+) -> AsyncUserRepository:
+    return AsyncUserRepository(session)
 
 
-def get_user_service(user_repository: UserRepository = Depends(get_user_repository)):
+def get_user_service(user_repository: AsyncUserRepository = Depends(get_user_repository)):
     return UserService(user_repository, _password_manager)
 
 
@@ -53,31 +110,79 @@ def get_authentication_header(credentials: HTTPAuthorizationCredentials = Depend
     return credentials.credentials
 
 
+def get_token_cache() -> VerifiedTokenCache:
+    return _token_cache
+
+
+async def current_user(user_jwt: str = Depends(get_authentication_header)) -> TokenClaims:
+    """Пользователь по access-токену. async: проверка в event loop, без пула потоков"""
+    claims = _token_cache.verify(user_jwt)
+    if claims is None or claims.type != TokenType.ACCESS.value:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return claims
+
+
+async def admin_user(user: TokenClaims = Depends(current_user)) -> TokenClaims:
+    """Пользователь из ADMIN_USER_IDS: служебные маршруты (метрики пулов, кэша, отчёт об утечках)"""
+    if user.user_id not in ADMIN_USER_IDS:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    return user
+
+
+async def refresh_token_claims(user_jwt: str = Depends(get_authentication_header)) -> TokenClaims:
+    """Данные refresh-токена для выпуска новой пары токенов"""
+    claims = _token_cache.verify(user_jwt)
+    if claims is None or claims.type != TokenType.REFRESH.value:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return claims
+
+
 def get_file_save_service():
     return FileSaveService(FILE_SAVE_BASE_PATH)
 
 
-def get_storage_repository(session: Session = Depends(get_session)) -> StorageRepository:
-    return StorageRepository(session)
+def get_cache_backend() -> CacheBackend:
+    return _cache_backend
+
+
+def get_reference_cache() -> ReferenceDataCache:
+    return _reference_cache
+
+
+def get_listing_cache() -> ListingCache:
+    return _listing_cache
+
+
+def get_storage_repository(
+        session: AsyncSession = Depends(get_async_session, scope="function")
+) -> AsyncStorageRepository:
+    # справочники (категории, источники, теги) - из кэша, остальное - из БД
+    return CachedStorageRepository(AsyncStorageRepository(session), _reference_cache)
+
+
+def get_parser_registry() -> ParserRegistry:
+    return _parser_registry
 
 
-def get_analyzer():
-    return analyze_file
+def get_ingestion_queue() -> IngestionQueue:
+    return _ingestion_queue
 
 
-def get_parser_registry():
-    return parse_upload_file
+def get_text_store() -> TextStore:
+    return _text_store
 
 
 def get_hasher():
-    return get_file_hash
+    return partial(create_hasher, FILE_HASH_ALGORITHM)
 
 
 def get_storage_service(
-        storage_repository: StorageRepository = Depends(get_storage_repository),
+        storage_repository: AsyncStorageRepository = Depends(get_storage_repository),
         file_save_service: FileSaveService = Depends(get_file_save_service),
-        parser_registry: callable = Depends(get_parser_registry),
-        file_analyzer: callable = Depends(get_analyzer),
-        hasher: callable = Depends(get_hasher)
+        ingestion_queue: IngestionQueue = Depends(get_ingestion_queue),
+        hasher: callable = Depends(get_hasher),
+        text_store: TextStore = Depends(get_text_store),
+        parser_registry: ParserRegistry = Depends(get_parser_registry)
 ) -> StorageService:
-    return StorageService(storage_repository, file_save_service, parser_registry, file_analyzer, hasher)
+    return StorageService(storage_repository, file_save_service, ingestion_queue, hasher, text_store,
+                          parser_registry, _listing_cache, UPLOAD_CONCURRENCY)
@@ -12,3 +12,15 @@ class DatabaseConfigException(ConfigException):
     """
     Ошибка загрузки данных о соединении с БД
     """
+
+
+class PasswordHashingOverloadedError(Exception):
+    """
+    Очередь на хеширование/проверку паролей переполнена
+    """
+
+
+class UploadTooLargeError(Exception):
+    """
+    Тело запроса на загрузку больше допустимого размера
+    """
@@ -43,6 +43,7 @@ CREATE TABLE files (
     file_size INT,
     file_type VARCHAR(50),
     file_hash VARCHAR(64) NULL,
+    upload_token CHAR(32) NULL,
     upload_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     last_modified TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
 
@@ -54,7 +55,29 @@ CREATE TABLE files (
     FOREIGN KEY (category_id) REFERENCES categories(id) ON UPDATE CASCADE ON DELETE RESTRICT,
     FOREIGN KEY (source_id) REFERENCES source(id) ON UPDATE CASCADE ON DELETE RESTRICT,
 
-    INDEX idx_file_hash (file_hash)
+    INDEX idx_file_hash (file_hash),
+    UNIQUE INDEX uq_files_user_hash (user_id, file_hash),
+    INDEX idx_files_user_modified (user_id, last_modified, id),
+    INDEX idx_files_user_type (user_id, file_type)
+);
+
+-- Содержимое файлов: один файл на диске на уникальный хэш,
+-- ref_count - сколько строк files на него ссылаются
+CREATE TABLE blobs (
+    digest VARCHAR(64) PRIMARY KEY,
+    file_path VARCHAR(500) NOT NULL,
+    file_size INT,
+    ref_count INT NOT NULL DEFAULT 0,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Извлечённый текст документов для полнотекстового поиска, одна строка на хэш содержимого
+CREATE TABLE document_texts (
+    digest VARCHAR(64) PRIMARY KEY,
+    content LONGTEXT NOT NULL,
+    indexed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+
+    FULLTEXT INDEX idx_document_texts_content (content)
 );
 
 -- Таблица тегов
@@ -73,11 +96,51 @@ CREATE TABLE file_tags_users (
     assigned_by INT NULL,
     assigned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (file_id, tag_id),
+    INDEX idx_file_tags_tag_file (tag_id, file_id),
     FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE,
     FOREIGN KEY (tag_id) REFERENCES tags(id) ON DELETE CASCADE,
     FOREIGN KEY (assigned_by) REFERENCES users(id) ON DELETE SET NULL
 );
 
+-- Поля договора, извлечённые анализом текста, одна строка на файл.
+-- user_id повторяет files.user_id: фильтры списка файлов пользователя идут диапазоном по индексам
+CREATE TABLE file_analysis_fields (
+    file_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    contract_date DATE NULL,
+    contract_number VARCHAR(100) NULL,
+    total_amount DECIMAL(18, 2) NULL,
+    analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_analysis_user_amount (user_id, total_amount),
+    INDEX idx_analysis_user_date (user_id, contract_date),
+    INDEX idx_analysis_user_number (user_id, contract_number),
+    FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Контрагенты: организации из текста документов, одна запись на форму (ООО, АО...)
+-- и нормализованное название (без регистра, кавычек и лишних пробелов)
+CREATE TABLE counterparties (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    org_form VARCHAR(10) NOT NULL DEFAULT '',
+    name VARCHAR(255) NOT NULL,
+    normalized_name VARCHAR(255) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE INDEX uq_counterparties_name_form (normalized_name, org_form)
+);
+
+-- Таблица многие ко многим файлов и контрагентов, user_id повторяет files.user_id
+CREATE TABLE file_counterparties (
+    file_id INT NOT NULL,
+    counterparty_id INT NOT NULL,
+    user_id INT NOT NULL,
+    PRIMARY KEY (file_id, counterparty_id),
+    INDEX idx_file_counterparties_user (user_id, counterparty_id),
+    FOREIGN KEY (file_id) REFERENCES files(id) ON DELETE CASCADE,
+    FOREIGN KEY (counterparty_id) REFERENCES counterparties(id) ON DELETE CASCADE,
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
 -- ТЕСТОВЫЕ ДАННЫЕ
 INSERT INTO users (full_name, email, password, organization_name, position, department) VALUES
 ('Администратор Системы', 'admin@company.com', 'hashed_password_123', 'ООО "Тестовая Компания"', 'Администратор', 'ИТ'),
@@ -0,0 +1,113 @@
+# метрики пула соединений с БД и поиск утёкших соединений
+import logging
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Счётчики одного пула соединений: выдачи, таймауты, время ожидания соединения
+    и соединения, которые держат дольше leak_threshold секунд (вероятные утечки).
+    """
+
+    def __init__(self, name: str, leak_threshold: float, capture_traceback: bool = False):
+        self.name = name
+        self.leak_threshold = leak_threshold
+        self.capture_traceback = capture_traceback
+        self.engine: Optional[Engine] = None
+
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.leaks_detected = 0
+        # id записи пула -> (время выдачи, стек выдачи)
+        self._checked_out: Dict[int, tuple[float, Optional[str]]] = {}
+
+    def attach(self, engine: Engine) -> None:
+        """Подписывается на события выдачи/возврата соединений движка"""
+        self.engine = engine
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def record_wait(self, seconds: float, timed_out: bool) -> None:
+        with self._lock:
+            self.wait_time_total += seconds
+            self.wait_time_max = max(self.wait_time_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        stack = "".join(traceback.format_stack(limit=25)) if self.capture_traceback else None
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out[id(connection_record)] = (time.monotonic(), stack)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            checked_out = self._checked_out.pop(id(connection_record), None)
+        if checked_out is None:
+            return
+        held = time.monotonic() - checked_out[0]
+        if held > self.leak_threshold:
+            with self._lock:
+                self.leaks_detected += 1
+            logger.warning("Соединение пула %s удерживалось %.1f с", self.name, held)
+
+    def snapshot(self) -> Dict[str, Any]:
+        pool = self.engine.pool if self.engine is not None else None
+        now = time.monotonic()
+        with self._lock:
+            checkouts = self.checkouts
+            leaked = [
+                {"held_seconds": round(now - since, 3), "traceback": stack}
+                for since, stack in self._checked_out.values()
+                if now - since > self.leak_threshold
+            ]
+            data = {
+                "name": self.name,
+                "checkouts": checkouts,
+                "timeouts": self.timeouts,
+                "wait_time_total": round(self.wait_time_total, 6),
+                "wait_time_avg": round(self.wait_time_total / checkouts, 6) if checkouts else 0.0,
+                "wait_time_max": round(self.wait_time_max, 6),
+                "leaks_detected": self.leaks_detected,
+            }
+        data.update({
+            "size": pool.size() if pool is not None else 0,
+            "checked_in": pool.checkedin() if pool is not None else 0,
+            "checked_out": pool.checkedout() if pool is not None else 0,
+            "overflow": pool.overflow() if pool is not None else 0,
+            "suspected_leaks": leaked,
+        })
+        return data
+
+
+def measured_pool_class(base_pool_class: type[Pool], metrics: PoolMetrics) -> type[Pool]:
+    """
+    Подкласс пула, который замеряет время получения соединения (ожидание в очереди,
+    создание overflow-соединения, pre-ping) и считает таймауты.
+    Класс, а не экземпляр, чтобы метрики переживали Pool.recreate().
+    """
+
+    def connect(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return base_pool_class.connect(self)
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            metrics.record_wait(time.perf_counter() - started, timed_out)
+
+    return type(f"Measured{base_pool_class.__name__}", (base_pool_class,), {"connect": connect})
@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import asyncio
 import re
-from typing import Final
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Final
 
 import bcrypt
 
+from src.core.exceptions import PasswordHashingOverloadedError
+
 
 class PasswordManager:
     """
@@ -14,14 +19,81 @@ class PasswordManager:
     * хеширование паролей (bcrypt с солью);
     * проверку пароля по сохранённому хэшу;
     * базовую проверку "силы" пароля.
+
+    bcrypt занимает процессор на сотни миллисекунд, поэтому из async-кода нужно
+    вызывать *_async варианты: они выполняются в отдельном ограниченном пуле потоков
+    (bcrypt отпускает GIL), а при переполнении очереди сразу выбрасывают
+    PasswordHashingOverloadedError вместо того, чтобы копить ожидающих.
     """
 
     _MAX_BYTES: Final[int] = 72
 
-    def __init__(self, rounds: int = 12) -> None:
+    def __init__(self, rounds: int = 12, max_workers: int = 2, max_pending: int = 32) -> None:
         if rounds < 4 or rounds > 31:
             raise ValueError("Параметр 'rounds' для bcrypt должен быть в диапазоне 4..31.")
+        if max_workers < 1 or max_pending < max_workers:
+            raise ValueError("Нужен хотя бы один поток, и очередь не меньше числа потоков.")
         self._rounds: int = rounds
+        self._max_workers: int = max_workers
+        self._max_pending: int = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+
+        self._lock = threading.Lock()
+        self._pending: int = 0
+        self._completed: int = 0
+        self._rejected: int = 0
+
+    async def hash_password_async(self, password: str) -> str:
+        """
+        То же, что hash_password(), но в пуле потоков bcrypt.
+
+        :raises ValueError: если пароль не соответствует требованиям.
+        :raises PasswordHashingOverloadedError: если очередь пула переполнена.
+        """
+        # дешёвая проверка до постановки в очередь
+        self.validate_strength(password)
+        return await self._run_bounded(self.hash_password, password)
+
+    async def verify_password_async(self, plain_password: str, hashed_password: str) -> bool:
+        """
+        То же, что verify_password(), но в пуле потоков bcrypt.
+
+        :raises PasswordHashingOverloadedError: если очередь пула переполнена.
+        """
+        if not hashed_password:
+            return False
+        return await self._run_bounded(self.verify_password, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, int]:
+        """Текущее состояние пула bcrypt"""
+        with self._lock:
+            return {
+                "workers": self._max_workers,
+                "max_pending": self._max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    async def _run_bounded(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._pending >= self._max_pending:
+                self._rejected += 1
+                raise PasswordHashingOverloadedError("Очередь на проверку паролей переполнена")
+            self._pending += 1
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="bcrypt")
+        future = self._executor.submit(func, *args)
+        # счётчик уменьшаем по факту завершения работы в потоке, а не по отмене ожидания:
+        # иначе отключившиеся клиенты "освобождали" бы место, пока bcrypt ещё считает
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
 
 
     def hash_password(self, password: str) -> str:
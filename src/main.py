@@ -1,9 +1,28 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
+
+from src.core.dependencies import get_ingestion_queue, get_parser_registry
 from src.modules.storage.routers import storage_router, tag_controller, counterparty_controller, save_file_controller
 from src.modules.user.routers import user_router
+from src.modules.metrics.routers import metrics_router
+
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    # пул процессов разбора документов и воркеры фоновой обработки загрузок
+    parser_registry = get_parser_registry()
+    parser_registry.start()
+    ingestion_queue = get_ingestion_queue()
+    await ingestion_queue.start()
+    yield
+    await ingestion_queue.stop()
+    parser_registry.shutdown()
+
 
 app = FastAPI(
+lifespan=lifespan,
 max_upload_size=100 * 1024 * 1024
 )
 # /api/users
@@ -15,6 +34,8 @@ app.include_router(counterparty_controller)
 
 app.include_router(save_file_controller)
 
+app.include_router(metrics_router)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
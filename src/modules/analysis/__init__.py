@@ -6,8 +6,10 @@ from .models import (
     PriorityLevel,
     ConfidentialityLevel,
 )
+from .content_tagger import ContentTagger, load_synonyms
 from .pipeline import (
     analyze_file,
+    analyze_batch,
     analyze_db_file,
     build_metadata_from_db_file,
     get_manual_tag_names_from_db_file,
@@ -20,7 +22,10 @@ __all__ = [
     "TagSource",
     "PriorityLevel",
     "ConfidentialityLevel",
+    "ContentTagger",
+    "load_synonyms",
     "analyze_file",
+    "analyze_batch",
     "analyze_db_file",
     "build_metadata_from_db_file",
     "get_manual_tag_names_from_db_file",
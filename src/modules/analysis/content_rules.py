@@ -1,9 +1,14 @@
 from __future__ import annotations
 
+import math
 import re
-from typing import Any, Dict, List
+from datetime import date, datetime
+from typing import Any, Dict, List, Tuple
 
 
+# сколько разных организаций извлекать из документа
+ORGANIZATIONS_LIMIT = 5
+
 DATE_PATTERN = re.compile(
     r"\b(\d{1,2}[.\-]\d{1,2}[.\-]\d{2,4})\b"
 )
@@ -21,6 +26,42 @@ ORG_PATTERN = re.compile(
     r"\b(ООО|АО|ПАО|ЗАО|ИП)\s*[«\"]?([A-Za-zА-Яа-я0-9\s\.\-]+?)[»\"]?(?=[\s,.]|$)"
 )
 
+# форма в начале названия контрагента (запрос пользователя или значение из organizations)
+ORG_FORM_PREFIX = re.compile(r"\s*(ООО|АО|ПАО|ЗАО|ИП)(?:\s+|(?=[«\"]))", re.IGNORECASE)
+_QUOTES = re.compile(r"[«»\"“”„']")
+_SPACES = re.compile(r"\s+")
+
+_DATE_BODY = r"\d{1,2}[.\-]\d{1,2}[.\-]\d{2,4}\b"
+
+
+def _scan_pattern(with_date: bool) -> re.Pattern:
+    """
+    Единый проход по тексту: числа-кандидаты в сумму (AMOUNT_PATTERN без необязательного префикса:
+    префикс не меняет, какие числа найдёт поиск слева направо, он только расширяет совпадение влево),
+    ключевые слова номера договора и организационные формы. Цифры и слова не пересекаются,
+    поэтому числа идут ровно те же, что у AMOUNT_PATTERN.finditer. \b для форм проверяет ORG_PATTERN.
+
+    with_date - дата (DATE_PATTERN) проверяется опережающими группами внутри числа: с границей слова
+    она может начаться только в начале числа или сразу после его [.,] (между группами разрядов
+    стоят ровно три цифры, а дате нужны одна-две и разделитель). Совпадение даты числа не сдвигает,
+    поэтому все числа остаются кандидатами в сумму
+    """
+    date_at_start = rf"(?:\b(?=(?P<date>{_DATE_BODY})))?" if with_date else ""
+    date_in_fraction = rf"(?:(?=(?P<fraction_date>{_DATE_BODY})))?" if with_date else ""
+    return re.compile(
+        rf"(?P<amount>{date_at_start}\d{{1,3}}(?:[\s ]\d{{3}})*(?:[.,]{date_in_fraction}\d+)?|\d+(?:[.,]\d+)?)"
+        r"|(?P<number>ДОГОВОР|Договор|Номер договора|№)"
+        r"|(?P<org>ООО|АО|ПАО|ЗАО|ИП)"
+    )
+
+
+SCAN_PATTERN = _scan_pattern(with_date=True)
+# после первой даты остальные не нужны: числа дальше проверяются без опережающих групп
+SCAN_AFTER_DATE_PATTERN = _scan_pattern(with_date=False)
+# первые символы SCAN_PATTERN: поиск одного класса символов re выполняет быстрым циклом,
+# а альтернативы SCAN_PATTERN пробует только на найденных позициях
+SCAN_START_PATTERN = re.compile(r"[\dДНОАПЗИ№]")
+
 
 def _extract_date(text: str) -> str | None:
     match = DATE_PATTERN.search(text)
@@ -44,18 +85,8 @@ def _extract_amount(text: str) -> float | None:
     candidates: List[float] = []
 
     for m in AMOUNT_PATTERN.finditer(text):
-        raw = m.group(1)
-        # убираем пробелы-разделители тысяч
-        normalized = raw.replace(" ", "").replace(" ", "")
-        # заменяем запятую на точку
-        normalized = normalized.replace(",", ".")
-        try:
-            value = float(normalized)
-        except ValueError:
-            continue
-
-        # отбрасываем заведомо странные маленькие числа
-        if value <= 0:
+        value = _parse_amount(m.group(1))
+        if value is None:
             continue
         candidates.append(value)
 
@@ -66,7 +97,24 @@ def _extract_amount(text: str) -> float | None:
     return max(candidates)
 
 
-def _extract_organizations(text: str, limit: int = 5) -> List[str]:
+def _parse_amount(raw: str) -> float | None:
+    # убираем пробелы-разделители тысяч
+    normalized = raw.replace(" ", "").replace(" ", "")
+    # заменяем запятую на точку
+    normalized = normalized.replace(",", ".")
+    try:
+        value = float(normalized)
+    except ValueError:
+        # например, числа через перевод строки: "100\n200"
+        return None
+
+    # отбрасываем заведомо странные маленькие числа
+    if value <= 0:
+        return None
+    return value
+
+
+def _extract_organizations(text: str, limit: int = ORGANIZATIONS_LIMIT) -> List[str]:
     orgs: List[str] = []
 
     for m in ORG_PATTERN.finditer(text):
@@ -81,13 +129,116 @@ def _extract_organizations(text: str, limit: int = 5) -> List[str]:
     return orgs
 
 
-def extract_fields_from_text(text: str) -> Dict[str, Any]:
+def extract_fields_from_text(text: str, scan_window: int | None = None) -> Dict[str, Any]:
     """
     Извлекает структурированные поля из текста договора:
     - date
     - number
     - total_amount
     - organizations (список)
+
+    Результат тот же, что у отдельных _extract_* (extract_fields_legacy), но текст
+    просматривается один раз: SCAN_PATTERN выдаёт числа (вместе с датой, если она начинается
+    в числе) и места, где может начаться номер или организация, там же проверяется нужный
+    шаблон (pattern.match с позиции). Для суммы хранится только текущий максимум, а не список
+    всех чисел документа; дата - первое совпадение, после него числа ищутся без проверки даты.
+
+    scan_window - сколько первых символов просматривать (None - весь текст)
+    """
+    endpos = len(text) if scan_window is None else min(scan_window, len(text))
+
+    date: str | None = None
+    scan_pattern = SCAN_PATTERN
+    number: str | None = None
+    amount = 0.0
+    # число из n символов меньше 10**n: такие числа не могут превысить текущий максимум
+    # и не переводятся во float
+    amount_skip_len = 0
+    orgs: List[str] = []
+    # конец последней найденной организации: как в finditer, следующая не может начаться раньше
+    org_end = 0
+
+    pos = 0
+    while (start := SCAN_START_PATTERN.search(text, pos, endpos)) is not None:
+        m = scan_pattern.match(text, start.start(), endpos)
+        if m is None:
+            pos = start.start() + 1
+            continue
+        pos = m.end()
+
+        raw = m.group("amount")
+        if raw is not None:
+            if date is None:
+                date = m.group("date") or m.group("fraction_date")
+                if date is not None:
+                    scan_pattern = SCAN_AFTER_DATE_PATTERN
+            if len(raw) <= amount_skip_len:
+                continue
+            value = _parse_amount(raw)
+            if value is not None and value > amount:
+                amount = value
+                # у бесконечности (слишком длинное число) разрядов нет - её уже ничто не превысит
+                amount_skip_len = len(str(int(value))) - 1 if value != math.inf else endpos
+        elif m.lastgroup == "number":
+            if number is None:
+                number_match = NUMBER_PATTERN.match(text, m.start(), endpos)
+                if number_match:
+                    number = number_match.group(1)
+        elif len(orgs) < ORGANIZATIONS_LIMIT and m.start() >= org_end:
+            org_match = ORG_PATTERN.match(text, m.start(), endpos)
+            if org_match:
+                org_end = org_match.end()
+                full = f"{org_match.group(1)} «{org_match.group(2).strip()}»"
+                if full not in orgs:
+                    orgs.append(full)
+
+    fields: Dict[str, Any] = {}
+    if date:
+        fields["date"] = date
+    if number:
+        fields["number"] = number
+    if amount > 0:
+        fields["total_amount"] = amount
+    if orgs:
+        fields["organizations"] = orgs
+    return fields
+
+
+def parse_contract_date(raw: str) -> date | None:
+    """
+    Дата из поля date ("01.02.2024", "1-2-24") в date. Двузначный год - как у strptime %y.
+    Несуществующая дата (31.02) или год из трёх цифр - None
+    """
+    day, month, year = re.split(r"[.\-]", raw)
+    try:
+        if len(year) == 2:
+            return datetime.strptime(f"{day}.{month}.{year}", "%d.%m.%y").date()
+        if len(year) == 4:
+            return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
+    return None
+
+
+def split_organization(value: str) -> Tuple[str | None, str]:
+    """
+    Организационная форма и название: "ООО «Ромашка»" (поле organizations),
+    'ооо "Ромашка"' или "ООО Ромашка" -> ("ООО", "Ромашка"); без формы - (None, "Ромашка")
+    """
+    match = ORG_FORM_PREFIX.match(value)
+    org_form, name = (match.group(1).upper(), value[match.end():]) if match else (None, value)
+    return org_form, _QUOTES.sub("", name).strip()
+
+
+def normalize_counterparty_name(name: str) -> str:
+    """Ключ контрагента: без регистра, ё/е, кавычек и лишних пробелов"""
+    return _SPACES.sub(" ", _QUOTES.sub("", name).lower().replace("ё", "е")).strip()
+
+
+def extract_fields_legacy(text: str) -> Dict[str, Any]:
+    """
+    Прежний вариант extract_fields_from_text: четыре отдельных прохода по тексту.
+    Оставлен как эталон для сверки результатов (benchmarks/field_extraction.py)
     """
 
     fields: Dict[str, Any] = {}
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import json
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .models import TagResult, TagSource
+
+try:
+    # C-реализация автомата, в разы быстрее; без неё работает вариант на чистом Python
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_for_matching(text: str) -> str:
+    """
+    Приводит текст и названия тегов к одному виду:
+    - нижний регистр, ё -> е
+    - любые пробельные символы подряд -> один пробел
+    """
+    return _WHITESPACE.sub(" ", text.lower().replace("ё", "е"))
+
+
+def load_synonyms(path: str) -> Dict[str, List[str]]:
+    """
+    Синонимы тегов из JSON-файла вида {"договор": ["контракт", "соглашение"]}.
+    Пустой путь - синонимов нет
+    """
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class _Automaton:
+    """
+    Автомат Ахо-Корасик на словарях Python.
+
+    Новые строки добавляются в бор без его перестройки, после этого заново
+    считаются только суффиксные ссылки (обход в ширину, линейно по размеру бора)
+    """
+
+    def __init__(self) -> None:
+        self.__goto: List[Dict[str, int]] = [{}]
+        self.__fail: List[int] = [0]
+        # строки, заканчивающиеся в узле, включая найденные по суффиксным ссылкам
+        self.__out: List[List[str]] = [[]]
+        self.__own: List[Optional[str]] = [None]
+        self.__dirty = False
+
+    def add(self, key: str) -> None:
+        node = 0
+        for char in key:
+            next_node = self.__goto[node].get(char)
+            if next_node is None:
+                next_node = len(self.__goto)
+                self.__goto[node][char] = next_node
+                self.__goto.append({})
+                self.__fail.append(0)
+                self.__out.append([])
+                self.__own.append(None)
+            node = next_node
+        self.__own[node] = key
+        self.__dirty = True
+
+    def build(self) -> None:
+        if not self.__dirty:
+            return
+        queue = []
+        for child in self.__goto[0].values():
+            self.__fail[child] = 0
+            queue.append(child)
+        self.__out[0] = []
+        for node in queue:
+            fail_out = self.__out[self.__fail[node]]
+            self.__out[node] = [self.__own[node], *fail_out] if self.__own[node] else list(fail_out)
+            for char, child in self.__goto[node].items():
+                state = self.__fail[node]
+                while state and char not in self.__goto[state]:
+                    state = self.__fail[state]
+                self.__fail[child] = self.__goto[state].get(char, 0)
+                queue.append(child)
+        self.__dirty = False
+
+    def iter(self, text: str) -> Iterable[Tuple[int, str]]:
+        """(индекс последнего символа, строка) для каждого вхождения"""
+        goto, fail, out = self.__goto, self.__fail, self.__out
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if out[node]:
+                for key in out[node]:
+                    yield index, key
+
+
+class ContentTagger:
+    """
+    Авто-теги по содержимому (TagSource.AUTO_CONTENT): названия всех тегов из справочника
+    и их синонимы собираются в один автомат Ахо-Корасик, текст документа проходится
+    один раз - время почти не зависит от числа тегов.
+
+    Совпадение засчитывается только целым словом (или фразой): соседние символы
+    не буквы и не цифры. Регистр, ё/е и пробелы между словами не учитываются.
+    Теги короче min_length символов не ищутся - слишком много случайных совпадений.
+
+    sync() добавляет в автомат только новые теги, поэтому его можно вызывать перед каждым
+    анализом со свежим справочником. Если установлен pyahocorasick, используется он
+    """
+
+    def __init__(self,
+                 synonyms: Optional[Dict[str, List[str]]] = None,
+                 min_length: int = 3,
+                 use_native: bool = True
+                 ):
+        # синонимы по нормализованному названию тега
+        self.__synonyms: Dict[str, List[str]] = {
+            normalize_for_matching(tag_name): [normalize_for_matching(synonym) for synonym in tag_synonyms]
+            for tag_name, tag_synonyms in (synonyms or {}).items()
+        }
+        self.__min_length = min_length
+        self.__native = use_native and ahocorasick is not None
+        self.__automaton = ahocorasick.Automaton() if self.__native else _Automaton()
+        # строка в автомате -> названия тегов, которые она означает
+        self.__keys: Dict[str, List[str]] = {}
+        self.__tag_names: set[str] = set()
+        self.__lock = threading.Lock()
+        self.__dirty = False
+
+    def __len__(self) -> int:
+        return len(self.__tag_names)
+
+    @property
+    def native(self) -> bool:
+        return self.__native
+
+    def sync(self, tag_names: Iterable[str]) -> int:
+        """Добавляет теги, которых ещё нет в автомате. Возвращает, сколько добавлено"""
+        new_names = [name for name in tag_names if name and name not in self.__tag_names]
+        if not new_names:
+            return 0
+        with self.__lock:
+            for tag_name in new_names:
+                self.__add(tag_name)
+        return len(new_names)
+
+    def add(self, tag_name: str) -> None:
+        with self.__lock:
+            self.__add(tag_name)
+
+    def match(self, text: str, exclude: Iterable[str] = ()) -> List[TagResult]:
+        """
+        Теги, названия или синонимы которых встречаются в тексте, в порядке первого вхождения.
+        exclude - названия тегов, которые уже есть у файла (без учёта регистра)
+        """
+        excluded = {name.lower() for name in exclude}
+        normalized = normalize_for_matching(text)
+        found: Dict[str, str] = {}
+
+        with self.__lock:
+            if self.__dirty:
+                if self.__native:
+                    self.__automaton.make_automaton()
+                else:
+                    self.__automaton.build()
+                self.__dirty = False
+            if not self.__keys:
+                return []
+
+            for end, key in self.__automaton.iter(normalized):
+                start = end - len(key) + 1
+                if start > 0 and normalized[start - 1].isalnum():
+                    continue
+                if end + 1 < len(normalized) and normalized[end + 1].isalnum():
+                    continue
+                for tag_name in self.__keys[key]:
+                    if tag_name not in found and tag_name.lower() not in excluded:
+                        found[tag_name] = key
+
+        return [
+            TagResult(name=tag_name, source=TagSource.AUTO_CONTENT, reason=f"Найдено в тексте: «{key}»")
+            for tag_name, key in found.items()
+        ]
+
+    def __add(self, tag_name: str) -> None:
+        if tag_name in self.__tag_names:
+            return
+        self.__tag_names.add(tag_name)
+        normalized = normalize_for_matching(tag_name).strip()
+        for key in [normalized, *self.__synonyms.get(normalized, [])]:
+            key = key.strip()
+            if len(key) < self.__min_length:
+                continue
+            if key not in self.__keys:
+                self.__keys[key] = []
+                if self.__native:
+                    self.__automaton.add_word(key, key)
+                else:
+                    self.__automaton.add(key)
+                self.__dirty = True
+            self.__keys[key].append(tag_name)
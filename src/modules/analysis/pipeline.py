@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Sequence
+from typing import TYPE_CHECKING, Dict, Iterable, List, Sequence, Tuple
 
 from .models import (
     FileMetadata,
@@ -11,14 +11,21 @@ from .models import (
 from .metadata_rules import build_tags_from_metadata
 from .content_rules import extract_fields_from_text
 
+if TYPE_CHECKING:
+    from .content_tagger import ContentTagger
+
 
 def analyze_file(
     meta: FileMetadata,
     text: str,
     manual_tag_names: Sequence[str] | None = None,
+    scan_window: int | None = None,
+    content_tagger: ContentTagger | None = None,
 ) -> AnalysisResult:
     """
     Главная функция анализа: принимает метаданные файла, текст и список ручных тегов.
+    scan_window - сколько первых символов текста просматривать при извлечении полей
+    (None - весь текст). content_tagger - авто-теги по вхождению названий тегов в текст.
     Возвращает AnalysisResult.
     """
 
@@ -41,10 +48,14 @@ def analyze_file(
     )
 
     # Извлечение полей из текста (дата, номер, сумма, организации и т.п.)
-    fields = extract_fields_from_text(text)
+    fields = extract_fields_from_text(text, scan_window=scan_window)
 
     all_tags = manual_tags + auto_meta_tags
 
+    # Авто-теги по содержимому: только те, что ещё не выставлены вручную или по метаданным
+    if content_tagger is not None:
+        all_tags += content_tagger.match(text, exclude=[tag.name for tag in all_tags])
+
     return AnalysisResult(
         file_id=meta.file_id,
         doc_type=meta.category_document_type,
@@ -53,6 +64,44 @@ def analyze_file(
     )
 
 
+def analyze_batch(
+    items: Iterable[Tuple[FileMetadata, str, Sequence[str]]],
+    scan_window: int | None = None,
+    content_tagger: ContentTagger | None = None,
+) -> List[AnalysisResult]:
+    """
+    Анализ пачки документов: items - (метаданные, текст, ручные теги) для каждого файла.
+    Результат тот же, что у analyze_file() по каждому элементу, но авто-теги по метаданным
+    строятся один раз на сочетание (тип документа, приоритет, конфиденциальность):
+    в большом архиве таких сочетаний единицы.
+    """
+
+    metadata_tags: Dict[tuple, List[TagResult]] = {}
+    results: List[AnalysisResult] = []
+
+    for meta, text, manual_tag_names in items:
+        manual_tag_names = list(dict.fromkeys(manual_tag_names or []))
+        manual_lower = {name.lower() for name in manual_tag_names}
+
+        key = (meta.category_document_type, meta.priority_level, meta.confidentiality)
+        if key not in metadata_tags:
+            metadata_tags[key] = build_tags_from_metadata(meta)
+
+        all_tags = [TagResult(name=name, source=TagSource.MANUAL, reason=None) for name in manual_tag_names]
+        all_tags += [tag for tag in metadata_tags[key] if tag.name.lower() not in manual_lower]
+        if content_tagger is not None:
+            all_tags += content_tagger.match(text, exclude=[tag.name for tag in all_tags])
+
+        results.append(AnalysisResult(
+            file_id=meta.file_id,
+            doc_type=meta.category_document_type,
+            fields=extract_fields_from_text(text, scan_window=scan_window),
+            tags=all_tags,
+        ))
+
+    return results
+
+
 def build_metadata_from_db_file(db_file) -> FileMetadata:
     """
     Строит FileMetadata из ORM-объекта File (modules/storage/models.py).
@@ -114,7 +163,12 @@ def get_manual_tag_names_from_db_file(db_file) -> list[str]:
     return list(dict.fromkeys(tag_names))
 
 
-def analyze_db_file(db_file, parsed_document) -> AnalysisResult:
+def analyze_db_file(
+    db_file,
+    parsed_document,
+    scan_window: int | None = None,
+    content_tagger: ContentTagger | None = None,
+) -> AnalysisResult:
     """
     Удобная обёртка: принимает ORM-файл и ParsedDocument,
     сам собирает метаданные, ручные теги и вызывает analyze_file().
@@ -128,4 +182,6 @@ def analyze_db_file(db_file, parsed_document) -> AnalysisResult:
         meta=meta,
         text=text,
         manual_tag_names=manual_tag_names,
+        scan_window=scan_window,
+        content_tagger=content_tagger,
     )
@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Protocol
+
+
+class CacheBackend(Protocol):
+    """Хранилище кэша: байты по строковому ключу с необязательным временем жизни"""
+
+    async def get(self, key: str) -> Optional[bytes]: ...
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None: ...
+
+    async def delete(self, *keys: str) -> None: ...
+
+    async def incr(self, key: str) -> int: ...
+
+
+class MemoryCacheBackend:
+    """
+    LRU-кэш в памяти процесса с ограничением по объёму (ключи + значения, байты).
+
+    Работает только из event loop, без блокировок. У каждого воркера uvicorn свой
+    экземпляр, поэтому изменения, сделанные другим воркером, видны только после TTL.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.__max_bytes = max_bytes
+        self.__size = 0
+        self.__items: OrderedDict[str, tuple[Optional[float], bytes]] = OrderedDict()
+        self.__counters: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key in self.__counters:
+            # как в Redis: значение счётчика читается обычным get
+            return str(self.__counters[key]).encode()
+        item = self.__items.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            self.__remove(key)
+            return None
+        self.__items.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.__remove(key)
+        item_size = len(key) + len(value)
+        if item_size > self.__max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl else None
+        self.__items[key] = (expires_at, value)
+        self.__size += item_size
+        while self.__size > self.__max_bytes:
+            self.__remove(next(iter(self.__items)))
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.__remove(key)
+            self.__counters.pop(key, None)
+
+    async def incr(self, key: str) -> int:
+        # счётчики (версии) не вытесняются по LRU: иначе старые записи снова стали бы актуальными
+        self.__counters[key] = self.__counters.get(key, 0) + 1
+        return self.__counters[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"items": len(self.__items), "bytes": self.__size, "max_bytes": self.__max_bytes}
+
+    def __remove(self, key: str) -> None:
+        item = self.__items.pop(key, None)
+        if item is not None:
+            self.__size -= len(key) + len(item[1])
+
+
+class RedisCacheBackend:
+    """
+    Кэш в Redis, общий для всех воркеров uvicorn. Нужен пакет redis (redis.asyncio)
+    """
+
+    def __init__(self, host: str, port: int, prefix: str = "docs:"):
+        try:
+            from redis import asyncio as redis
+        except ImportError as error:
+            raise RuntimeError("Для CACHE_BACKEND=redis нужен пакет redis") from error
+        self.__client = redis.Redis(host=host, port=port)
+        self.__prefix = prefix
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.__client.get(self.__prefix + key)
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        await self.__client.set(self.__prefix + key, value, px=int(ttl * 1000) if ttl else None)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.__client.delete(*(self.__prefix + key for key in keys))
+
+    async def incr(self, key: str) -> int:
+        return await self.__client.incr(self.__prefix + key)
+
+    async def close(self) -> None:
+        await self.__client.aclose()
+
+
+def create_cache_backend(name: str,
+                         max_bytes: int = 64 * 1024 * 1024,
+                         redis_host: str = "localhost",
+                         redis_port: int = 6379
+                         ) -> CacheBackend:
+    """Бэкенд кэша по названию из настроек: memory или redis"""
+    if name == "memory":
+        return MemoryCacheBackend(max_bytes)
+    if name == "redis":
+        return RedisCacheBackend(redis_host, redis_port)
+    raise ValueError(f"Неизвестный бэкенд кэша: {name}. Поддерживаются: memory, redis")
@@ -1,38 +1,120 @@
-import shutil
-from datetime import datetime
+import os
+import uuid
 from pathlib import Path
-from typing import BinaryIO
+from typing import BinaryIO, Optional
+
+from pydantic import BaseModel
+
+from src.modules.get_hash import Hasher, CHUNK_SIZE
+
+
+class SavedFile(BaseModel):
+    """
+    Результат сохранения файла на диск
+    """
+    path: str
+    size: int
+    digest: Optional[str] = None
+
+
+class StagedWriter:
+    """
+    Временный файл загрузки, который пишется частями.
+    Хэш и размер считаются по ходу записи, повторно файл не читается
+    """
+
+    def __init__(self, path: Path, hasher: Hasher):
+        self.__path: Path = path
+        self.__hasher: Hasher = hasher
+        self.__size: int = 0
+        self.__file: Optional[BinaryIO] = open(path, 'wb')
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def write(self, data: bytes) -> None:
+        self.__hasher.update(data)
+        self.__file.write(data)
+        self.__size += len(data)
+
+    def close(self) -> SavedFile:
+        """Закрывает файл. Возвращает путь к временному файлу, размер и хэш"""
+        self.__file.close()
+        return SavedFile(path=str(self.__path), size=self.__size, digest=self.__hasher.hexdigest())
+
+    def abort(self) -> None:
+        """Закрывает и удаляет недописанный файл"""
+        self.__file.close()
+        self.__path.unlink(missing_ok=True)
 
 
 class FileSaveService:
+    """
+    Хранилище файлов с адресацией по содержимому.
+
+    Загрузка сначала пишется во временный файл base/tmp (хэш считается в том же проходе),
+    затем переименовывается в base/blobs/ab/cd/<digest><ext>. Одинаковое содержимое
+    хранится на диске один раз, сколько бы пользователей его ни загрузили.
+    """
+
     def __init__(self, base_storage_path: str = "./files_saved_storage"):
         self.base_storage_path = Path(base_storage_path)
         self.base_storage_path.mkdir(parents=True, exist_ok=True)
+        # временные файлы на той же файловой системе, что и blobs: перенос - это rename
+        self.staging_path = self.base_storage_path / "tmp"
+        self.staging_path.mkdir(exist_ok=True)
+        self.blobs_path = self.base_storage_path / "blobs"
+        self.blobs_path.mkdir(exist_ok=True)
 
-    def save_user_file(self, file: BinaryIO, original_filename: str, user_id: int) -> str:
-        """Сохраняет файл пользователя на диск в папку user_id
-            Возвращает путь к сохраненному файлу для сохранения в БД"""
-
-        # Создаем папку пользователя
-        user_folder: Path = self.base_storage_path / str(user_id)
-        user_folder.mkdir(exist_ok=True)
+    def stage_file(self, file: BinaryIO, original_filename: str, hasher: Hasher) -> SavedFile:
+        """Записывает файл во временную папку, считая хэш содержимого в том же проходе.
+            Возвращает путь к временному файлу, размер и хэш"""
+        writer = self.open_staged(original_filename, hasher)
+        try:
+            file.seek(0)
+            while chunk := file.read(CHUNK_SIZE):
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.close()
 
-        # Получаем расширение файла
+    def open_staged(self, original_filename: str, hasher: Hasher) -> "StagedWriter":
+        """Открывает временный файл для записи по частям - для загрузок, которые читаются
+            из сети потоком и не лежат целиком ни в памяти, ни в другом временном файле"""
         file_extension = Path(original_filename).suffix.lower()
+        return StagedWriter(self.staging_path / f"{uuid.uuid4().hex}{file_extension}", hasher)
 
-        # Генерируем уникальное имя
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        unique_filename = f"file_{timestamp}{file_extension}"
+    def blob_path(self, digest: str, original_filename: str) -> Path:
+        """Путь к содержимому по хэшу: два уровня каталогов по первым символам хэша,
+            чтобы в одной папке не копились сотни тысяч файлов"""
+        file_extension = Path(original_filename).suffix.lower()
+        return self.blobs_path / digest[:2] / digest[2:4] / f"{digest}{file_extension}"
 
-        # Полный путь к файлу
-        file_path = user_folder / unique_filename
+    @staticmethod
+    def commit_staged(staged_path: str, blob_path: str) -> str:
+        """Переносит временный файл на место blob_path. Файл с тем же содержимым, если он
+            уже есть, заменяется: проверка "уже лежит на диске" не защищает от удаления,
+            которое начал параллельный запрос, а rename атомарен и даёт то же содержимое"""
+        target = Path(blob_path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(staged_path, target)
+        return str(target)
 
-        # Копируем файловый объект напрямую на диск
-        file.seek(0)
-        with open(file_path, 'wb') as destination_file:
-            shutil.copyfileobj(file, destination_file)
+    def detach_file(self, file_path: str) -> Optional[str]:
+        """Убирает файл с его пути во временную папку (rename). Возвращает новый путь,
+            None - файла нет. Удалить его окончательно можно delete_file, вернуть - restore_file"""
+        detached = self.staging_path / f"{uuid.uuid4().hex}.deleted"
+        try:
+            os.replace(file_path, detached)
+        except FileNotFoundError:
+            return None
+        return str(detached)
 
-        return str(file_path)
+    @staticmethod
+    def restore_file(detached_path: str, file_path: str) -> None:
+        os.replace(detached_path, file_path)
 
     @staticmethod
     def delete_file(file_path: str) -> bool:
@@ -1,3 +1,3 @@
-from .file_hash import get_file_hash
+from .file_hash import get_file_hash, create_hasher, Hasher, SUPPORTED_ALGORITHMS, CHUNK_SIZE
 
-__all__ = ["get_file_hash"]
+__all__ = ["get_file_hash", "create_hasher", "Hasher", "SUPPORTED_ALGORITHMS", "CHUNK_SIZE"]
@@ -1,26 +1,58 @@
 import hashlib
-from fastapi import UploadFile
+from typing import BinaryIO, Protocol
 
+import xxhash
 
-def get_file_hash(file: UploadFile, algorithm: str = "sha256") -> str:
+# размер блока при потоковом чтении/хэшировании
+CHUNK_SIZE = 1024 * 1024
+
+SUPPORTED_ALGORITHMS = ("sha256", "blake2b", "xxh3_128", "xxh64")
+
+
+class Hasher(Protocol):
+    """
+    Инкрементальный хэшер: общий интерфейс hashlib и xxhash
+    """
+
+    def update(self, data: bytes) -> None: ...
+
+    def hexdigest(self) -> str: ...
+
+
+def create_hasher(algorithm: str = "sha256") -> Hasher:
     """
-    Возвращает хэш по метаданным UploadFile:
-      - имени файла (filename)
-      - MIME-типу (content_type)
-      - размеру (size)
+    Возвращает новый инкрементальный хэшер.
 
-    Содержимое файла НЕ учитывается.
+    Все алгоритмы дают не больше 64 hex-символов (размер колонки files.file_hash):
+      - sha256   - криптостойкий, по умолчанию;
+      - blake2b  - криптостойкий, быстрее sha256 на процессорах без SHA-расширений (digest_size=32);
+      - xxh3_128, xxh64 - некриптографические, в разы быстрее, для доверенной среды.
     """
+    if algorithm == "sha256":
+        return hashlib.sha256()
+    if algorithm == "blake2b":
+        return hashlib.blake2b(digest_size=32)
+    if algorithm == "xxh3_128":
+        return xxhash.xxh3_128()
+    if algorithm == "xxh64":
+        return xxhash.xxh64()
+    raise ValueError(f"Неизвестный алгоритм хэширования: {algorithm}. Доступны: {', '.join(SUPPORTED_ALGORITHMS)}")
 
-    filename = file.filename or ""
-    content_type = file.content_type or ""
-    size = getattr(file, "size", 0) or 0
 
-    # Собираем строку вида:
-    # "contract.pdf|application/pdf|123456"
-    meta_string = f"{filename}|{content_type}|{size}"
+def get_file_hash(file: BinaryIO, algorithm: str = "sha256") -> str:
+    """
+    Возвращает хэш содержимого файлового объекта (читается с начала блоками по CHUNK_SIZE).
+    Принимает и UploadFile - тогда читается его file.
+
+    При сохранении загрузки хэш считается в StagedWriter
+    в том же проходе, что и запись на диск, эта функция - для уже сохранённых файлов.
+    """
+    source: BinaryIO = getattr(file, "file", file)
+    hasher = create_hasher(algorithm)
 
-    hasher = hashlib.new(algorithm)
-    hasher.update(meta_string.encode("utf-8"))
+    source.seek(0)
+    while chunk := source.read(CHUNK_SIZE):
+        hasher.update(chunk)
+    source.seek(0)
 
     return hasher.hexdigest()
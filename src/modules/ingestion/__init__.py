@@ -0,0 +1,8 @@
+from .models import IngestionJob, JobStatus
+from .services import IngestionQueue
+
+__all__ = [
+    "IngestionJob",
+    "JobStatus",
+    "IngestionQueue",
+]
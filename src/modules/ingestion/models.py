@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from datetime import datetime
+from enum import Enum
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel, Field, computed_field
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class IngestionJob(BaseModel):
+    """
+    Задача фоновой обработки загрузки: разбор текста, анализ и сохранение авто-тегов
+    для каждого файла из file_ids.
+    """
+
+    job_id: str
+    user_id: int
+    file_ids: List[int]
+    status: JobStatus = JobStatus.QUEUED
+    processed: int = 0
+    errors: Dict[int, str] = Field(
+        default_factory=dict,
+        description="file_id -> текст ошибки для файлов, которые не удалось обработать",
+    )
+    skipped: List[int] = Field(
+        default_factory=list,
+        description="файлы формата без парсера: текст не извлекался, анализ только по метаданным",
+    )
+    created_at: datetime = Field(default_factory=datetime.now)
+    finished_at: Optional[datetime] = None
+
+    @computed_field
+    @property
+    def total(self) -> int:
+        return len(self.file_ids)
+
+    @computed_field
+    @property
+    def progress(self) -> float:
+        """Доля обработанных файлов, 0..1"""
+        return self.processed / self.total if self.total else 1.0
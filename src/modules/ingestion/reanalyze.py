@@ -0,0 +1,294 @@
+"""
+Повторный анализ всех сохранённых документов, например после изменения правил
+извлечения полей или справочника тегов.
+
+Файлы читаются пачками по возрастанию id (категория, источник и теги - selectinload
+на всю пачку), текст берётся из TextStore (разбор - только если его там нет), анализ
+идёт в пуле процессов через analyze_batch, авто-теги и поля договора пачки записываются
+несколькими многострочными запросами в одной транзакции. После каждой записанной пачки
+в файл контрольной точки сохраняется последний id, повторный запуск продолжает с него.
+    python -m src.modules.ingestion.reanalyze --workers 8 --batch-size 1000
+    python -m src.modules.ingestion.reanalyze --restart    # с начала, игнорируя контрольную точку
+
+Закэшированные страницы списков файлов обновятся по истечении LISTING_CACHE_TTL.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.core.database import engine, session_maker
+from src.core.config import ANALYSIS_SCAN_WINDOW, CONTENT_TAG_MIN_LENGTH, CONTENT_TAG_SYNONYMS_FILE, \
+    TEXT_STORE_PATH
+from src.modules.analysis import (
+    ContentTagger,
+    FileMetadata,
+    TagSource,
+    analyze_batch,
+    build_metadata_from_db_file,
+    get_manual_tag_names_from_db_file,
+    load_synonyms,
+)
+from src.modules.parser import ParserRegistry
+from src.modules.storage.repository import StorageRepository
+from src.modules.text_store import TextStore
+
+# (метаданные, путь к файлу, хэш содержимого, ручные теги) - всё, что нужно процессу пула
+_Item = Tuple[FileMetadata, str, Optional[str], List[str]]
+
+
+class _Outcome:
+    """Результат одного файла из процесса пула"""
+
+    __slots__ = ("file_id", "auto_tags", "fields", "error", "parsed_text", "file_hash")
+
+    def __init__(self,
+                 file_id: int,
+                 auto_tags: Optional[Dict[str, Optional[str]]] = None,
+                 fields: Optional[Dict[str, Any]] = None,
+                 error: Optional[str] = None,
+                 parsed_text: Optional[str] = None,
+                 file_hash: Optional[str] = None):
+        self.file_id = file_id
+        self.auto_tags = auto_tags
+        self.fields = fields
+        self.error = error
+        # текст, которого не было в TextStore: родитель добавит его в полнотекстовый индекс
+        self.parsed_text = parsed_text
+        self.file_hash = file_hash
+
+
+class ReanalysisCheckpoint:
+    """
+    Контрольная точка в JSON: последний записанный id, счётчики и id файлов с ошибками.
+    Пишется через временный файл, поэтому прерывание не оставляет её недописанной
+    """
+
+    def __init__(self, path: str):
+        self.__path = Path(path)
+        self.last_id = 0
+        self.processed = 0
+        self.added = 0
+        self.removed = 0
+        self.failed: List[int] = []
+
+    def load(self) -> bool:
+        if not self.__path.exists():
+            return False
+        state = json.loads(self.__path.read_text(encoding="utf-8"))
+        self.last_id = state["last_id"]
+        self.processed = state.get("processed", 0)
+        self.added = state.get("added", 0)
+        self.removed = state.get("removed", 0)
+        self.failed = state.get("failed", [])
+        return True
+
+    def save(self) -> None:
+        tmp_path = self.__path.with_name(f"{self.__path.name}.tmp")
+        tmp_path.write_text(json.dumps({
+            "last_id": self.last_id,
+            "processed": self.processed,
+            "added": self.added,
+            "removed": self.removed,
+            "failed": self.failed,
+        }), encoding="utf-8")
+        os.replace(tmp_path, self.__path)
+
+
+# -------------------- процесс пула --------------------
+
+_worker_tagger: ContentTagger | None = None
+_worker_registry: ParserRegistry | None = None
+_worker_text_store: TextStore | None = None
+_worker_scan_window: int | None = None
+_worker_parse_missing = True
+
+
+def _init_worker(tag_names: Sequence[str],
+                 synonyms: Dict[str, List[str]],
+                 min_length: int,
+                 scan_window: int | None,
+                 parse_missing: bool) -> None:
+    """Автомат тегов строится один раз на процесс по справочнику на момент запуска"""
+    global _worker_tagger, _worker_registry, _worker_text_store, _worker_scan_window, _worker_parse_missing
+    _worker_tagger = ContentTagger(synonyms, min_length)
+    _worker_tagger.sync(tag_names)
+    _worker_registry = ParserRegistry()
+    _worker_text_store = TextStore(TEXT_STORE_PATH)
+    _worker_scan_window = scan_window
+    _worker_parse_missing = parse_missing
+
+
+def _analyze_in_worker(items: List[_Item]) -> List[_Outcome]:
+    outcomes: List[_Outcome] = []
+    ready: List[Tuple[FileMetadata, str, List[str]]] = []
+    parsed: Dict[int, Tuple[str, Optional[str]]] = {}
+
+    for meta, file_path, file_hash, manual_tag_names in items:
+        try:
+            path = Path(file_path)
+            parser_version = _worker_registry.parser_version(path)
+            text = _worker_text_store.get(file_hash, parser_version) if file_hash else None
+            if text is None:
+                if not _worker_parse_missing:
+                    outcomes.append(_Outcome(meta.file_id, error="нет извлечённого текста"))
+                    continue
+                text = _worker_registry.parse(path).raw_text
+                if file_hash:
+                    _worker_text_store.put(file_hash, parser_version, text)
+                parsed[meta.file_id] = (text, file_hash)
+        except Exception as error:
+            outcomes.append(_Outcome(meta.file_id, error=str(error) or type(error).__name__))
+            continue
+        ready.append((meta, text, manual_tag_names))
+
+    for result in analyze_batch(ready, scan_window=_worker_scan_window, content_tagger=_worker_tagger):
+        text, file_hash = parsed.get(result.file_id, (None, None))
+        outcomes.append(_Outcome(
+            result.file_id,
+            auto_tags={tag.name: tag.reason for tag in result.tags if tag.source != TagSource.MANUAL},
+            fields=result.fields,
+            parsed_text=text,
+            file_hash=file_hash,
+        ))
+    return outcomes
+
+
+# -------------------- родительский процесс --------------------
+
+def _load_items(repository: StorageRepository,
+                after_id: int,
+                batch_size: int) -> Tuple[List[_Item], Dict[int, int], int]:
+    """
+    Следующая пачка для анализа, владельцы её файлов (file_id -> user_id)
+    и последний id (after_id, если файлов больше нет)
+    """
+    items: List[_Item] = []
+    owners: Dict[int, int] = {}
+    last_id = after_id
+    for db_file in repository.get_files_for_analysis_after(after_id, batch_size):
+        owners[db_file.id] = db_file.user_id
+        items.append((
+            build_metadata_from_db_file(db_file),
+            db_file.file_path,
+            db_file.file_hash,
+            get_manual_tag_names_from_db_file(db_file),
+        ))
+        last_id = db_file.id
+    return items, owners, last_id
+
+
+def _split(items: List[_Item], parts: int) -> List[List[_Item]]:
+    size = max(1, -(-len(items) // parts))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _write(session: Session,
+           futures: List[Future],
+           owners: Dict[int, int],
+           remove_stale: bool,
+           checkpoint: ReanalysisCheckpoint) -> None:
+    repository = StorageRepository(session)
+    outcomes = [outcome for future in futures for outcome in future.result()]
+    file_tags = {outcome.file_id: outcome.auto_tags for outcome in outcomes if outcome.auto_tags is not None}
+    added, removed = repository.replace_auto_tags_bulk(file_tags, remove_stale=remove_stale, commit=False)
+    repository.save_analysis_fields([
+        (outcome.file_id, owners[outcome.file_id], outcome.fields) for outcome in outcomes if outcome.fields is not None
+    ], commit=False)
+    session.commit()
+    for outcome in outcomes:
+        if outcome.parsed_text is not None and outcome.file_hash:
+            # текста не было в TextStore - скорее всего, и в полнотекстовом индексе его нет
+            repository.index_document_text(outcome.file_hash, outcome.parsed_text, replace=True)
+
+    checkpoint.processed += len(file_tags)
+    checkpoint.added += added
+    checkpoint.removed += removed
+    checkpoint.failed += [outcome.file_id for outcome in outcomes if outcome.error is not None]
+
+
+def reanalyze(batch_size: int,
+              workers: int,
+              checkpoint: ReanalysisCheckpoint,
+              remove_stale: bool = True,
+              parse_missing: bool = True) -> None:
+    with session_maker() as session:
+        repository = StorageRepository(session)
+        tag_names = [tag.tag_name for tag in repository.get_all_tags()]
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        # как и в пуле парсеров: без fork, дочерние процессы не наследуют соединения с БД
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(tag_names, load_synonyms(CONTENT_TAG_SYNONYMS_FILE), CONTENT_TAG_MIN_LENGTH,
+                  ANALYSIS_SCAN_WINDOW or None, parse_missing),
+    )
+    started = time.perf_counter()
+    done_before = checkpoint.processed + len(checkpoint.failed)
+    # чтение и запись в разных сессиях: следующая пачка читается и анализируется,
+    # пока записывается предыдущая
+    try:
+        with session_maker() as read_session, session_maker() as write_session:
+            reader = StorageRepository(read_session)
+            pending: Optional[Tuple[List[Future], Dict[int, int], int]] = None
+            after_id = checkpoint.last_id
+            while True:
+                items, owners, last_id = _load_items(reader, after_id, batch_size)
+                # объекты пачки больше не нужны: identity map сессии не растёт,
+                read_session.expunge_all()
+                # и транзакция чтения не держит снимок данных часами
+                read_session.rollback()
+                futures = [executor.submit(_analyze_in_worker, part) for part in _split(items, workers * 2)]
+                current = (futures, owners, last_id)
+
+                if pending is not None:
+                    _write(write_session, pending[0], pending[1], remove_stale, checkpoint)
+                    checkpoint.last_id = pending[2]
+                    checkpoint.save()
+                    done = checkpoint.processed + len(checkpoint.failed) - done_before
+                    rate = done / max(time.perf_counter() - started, 1e-9)
+                    print(f"last id {checkpoint.last_id}: {checkpoint.processed} analyzed, "
+                          f"+{checkpoint.added}/-{checkpoint.removed} tag links, "
+                          f"{len(checkpoint.failed)} failed, {rate:.0f} files/s")
+
+                if not items:
+                    break
+                pending = current
+                after_id = last_id
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=1000, help="файлов в одной пачке чтения и записи")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="процессов анализа")
+    parser.add_argument("--checkpoint", default="reanalyze.checkpoint.json", help="файл контрольной точки")
+    parser.add_argument("--restart", action="store_true", help="начать с первого файла")
+    parser.add_argument("--keep-stale", action="store_true",
+                        help="не удалять авто-теги, которые правила больше не выставляют")
+    parser.add_argument("--no-parse", action="store_true",
+                        help="файлы без текста в TextStore пропускать, а не разбирать")
+    parser.add_argument("--echo-sql", action="store_true", help="логировать SQL (echo движка)")
+    args = parser.parse_args()
+
+    engine.echo = args.echo_sql
+    checkpoint = ReanalysisCheckpoint(args.checkpoint)
+    if not args.restart and checkpoint.load():
+        print(f"resuming after id {checkpoint.last_id}")
+    reanalyze(args.batch_size, args.workers, checkpoint,
+              remove_stale=not args.keep_stale, parse_missing=not args.no_parse)
+    print(f"done: {checkpoint.processed} analyzed, {len(checkpoint.failed)} failed")
+
+
+if __name__ == "__main__":
+    main()
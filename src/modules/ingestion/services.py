@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
+
+from src.modules.analysis import AnalysisResult, TagSource, ContentTagger
+from src.modules.ingestion.models import IngestionJob, JobStatus
+from src.modules.parser import ParserRegistry, make_preview
+from src.modules.storage.listing_cache import ListingCache
+from src.modules.storage.models import File
+from src.modules.storage.repository import AsyncStorageRepository
+from src.modules.text_store import TextStore
+
+
+class IngestionQueue:
+    """
+    Очередь фоновой обработки загруженных файлов внутри процесса.
+
+    Загрузка только создаёт строки files и ставит задачу; пул воркеров (asyncio-задач)
+    для каждого файла выполняет ParserRegistry.parse -> analyze_db_file и сохраняет
+    авто-теги и поля договора (file_analysis_fields). Извлечённый текст кладётся в TextStore (файл с уже разобранным
+    содержимым повторно не парсится) и в полнотекстовый индекс document_texts. Статусы задач хранятся в памяти процесса
+    (последние max_jobs_kept).
+
+    Превью (files.first_lines) сохраняется до полного разбора: парсер в режиме max_chars
+    читает только первые страницы/абзацы, и список файлов показывает превью, пока идут
+    разбор и анализ. Если текст уже есть в TextStore или парсер не умеет останавливаться
+    раньше (RTF), превью берётся из полного текста. Файлы форматов, для которых нет парсера,
+    анализируются только по метаданным и попадают в skipped задачи, а не в errors.
+
+    content_tagger - тот же ContentTagger, что использует file_analyzer: перед анализом
+    в него добавляются новые теги справочника.
+    """
+
+    def __init__(self,
+                 session_maker: async_sessionmaker,
+                 parser_registry: ParserRegistry,
+                 text_store: TextStore,
+                 file_analyzer: Callable[..., AnalysisResult],
+                 workers: int = 2,
+                 max_jobs_kept: int = 1000,
+                 repository_factory: Callable[[AsyncSession], AsyncStorageRepository] = AsyncStorageRepository,
+                 listing_cache: Optional[ListingCache] = None,
+                 preview_max_chars: int = 500,
+                 preview_max_lines: int = 5,
+                 content_tagger: Optional[ContentTagger] = None
+                 ):
+        self.__session_maker = session_maker
+        self.__parser_registry = parser_registry
+        self.__text_store = text_store
+        self.__file_analyzer = file_analyzer
+        self.__workers_count = workers
+        self.__max_jobs_kept = max_jobs_kept
+        self.__repository_factory = repository_factory
+        self.__listing_cache = listing_cache
+        self.__preview_max_chars = preview_max_chars
+        self.__preview_max_lines = preview_max_lines
+        self.__content_tagger = content_tagger
+
+        self.__queue: asyncio.Queue[tuple[IngestionJob, int]] | None = None
+        self.__workers: List[asyncio.Task] = []
+        self.__jobs: OrderedDict[str, IngestionJob] = OrderedDict()
+
+    async def start(self) -> None:
+        self.__queue = asyncio.Queue()
+        self.__workers = [asyncio.create_task(self.__worker()) for _ in range(self.__workers_count)]
+
+    async def stop(self) -> None:
+        for worker in self.__workers:
+            worker.cancel()
+        await asyncio.gather(*self.__workers, return_exceptions=True)
+        self.__workers = []
+
+    def submit(self, user_id: int, file_ids: List[int]) -> IngestionJob:
+        """Ставит файлы в очередь на обработку и сразу возвращает задачу"""
+        job = IngestionJob(job_id=uuid.uuid4().hex, user_id=user_id, file_ids=file_ids)
+        self.__jobs[job.job_id] = job
+        while len(self.__jobs) > self.__max_jobs_kept:
+            self.__jobs.popitem(last=False)
+
+        if not file_ids:
+            self.__finish(job)
+        for file_id in file_ids:
+            self.__queue.put_nowait((job, file_id))
+        return job
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self.__jobs.get(job_id)
+
+    async def __worker(self) -> None:
+        while True:
+            job, file_id = await self.__queue.get()
+            job.status = JobStatus.RUNNING
+            try:
+                if not await self.__process_file(file_id):
+                    job.skipped.append(file_id)
+            except Exception as error:
+                job.errors[file_id] = str(error) or type(error).__name__
+            finally:
+                job.processed += 1
+                if job.processed >= job.total:
+                    self.__finish(job)
+                self.__queue.task_done()
+
+    async def __process_file(self, file_id: int) -> bool:
+        """False - для формата файла нет парсера, текст не извлекался"""
+        async with self.__session_maker() as session:
+            repository = self.__repository_factory(session)
+            db_file = await repository.get_file_for_analysis(file_id)
+            if db_file is None:
+                # файл удалили, пока задача стояла в очереди
+                return True
+
+            path = Path(db_file.file_path)
+            supported = self.__parser_registry.supports(path)
+            if supported:
+                text = await self.__extract_text(repository, db_file, path)
+            else:
+                # формат без парсера (например, изображения): ни превью, ни полнотекстового индекса,
+                # анализ - только по метаданным
+                text = ""
+            if self.__content_tagger is not None:
+                # теги, созданные после прошлого анализа (в том числе другими воркерами),
+                # достраиваются в автомат, уже известные пропускаются
+                self.__content_tagger.sync(tag.tag_name for tag in await repository.get_all_tags())
+            # анализ - чистый Python по всему тексту, в потоке, чтобы не держать event loop
+            analysis_result = await asyncio.to_thread(self.__file_analyzer, db_file, text)
+
+            assigned = {tag.tag_name.lower() for tag in db_file.tags}
+            auto_tags = {
+                tag.name: tag.reason for tag in analysis_result.tags
+                if tag.source != TagSource.MANUAL and tag.name.lower() not in assigned
+            }
+            await repository.assign_tags_bulk([file_id], list(auto_tags), "auto", descriptions=auto_tags)
+            await repository.save_analysis_fields([(file_id, db_file.user_id, analysis_result.fields)])
+            if self.__listing_cache is not None:
+                # у файла появились теги и поля для фильтров - закэшированные списки пользователя устарели
+                await self.__listing_cache.invalidate(db_file.user_id)
+            return supported
+
+    async def __extract_text(self, repository: AsyncStorageRepository, db_file: File, path: Path) -> str:
+        """Текст файла (из TextStore или разбором) с превью и записью в полнотекстовый индекс"""
+        parser_version = self.__parser_registry.parser_version(path)
+        text = await self.__stored_text(db_file.file_hash, parser_version)
+        parsed_now = text is None
+        if parsed_now and self.__parser_registry.stops_early(path):
+            preview_document = await self.__parser_registry.parse_async(path, max_chars=self.__preview_max_chars)
+            await self.__save_preview(repository, db_file, preview_document.raw_text)
+            if preview_document.metadata.get("truncated") == "true":
+                text = await self.__parse_text(path, db_file.file_hash, parser_version)
+            else:
+                # документ целиком уместился в превью - второй разбор дал бы тот же текст
+                text = preview_document.raw_text
+                await self.__store_text(db_file.file_hash, parser_version, text)
+        else:
+            if parsed_now:
+                # превью такого парсера стоит столько же, сколько полный разбор: берём его из полного текста
+                text = await self.__parse_text(path, db_file.file_hash, parser_version)
+            await self.__save_preview(repository, db_file, text)
+
+        if db_file.file_hash:
+            # текст того же содержимого уже мог попасть в индекс с загрузкой другого пользователя
+            await repository.index_document_text(db_file.file_hash, text, replace=parsed_now)
+        return text
+
+    async def __stored_text(self, file_hash: Optional[str], parser_version: str) -> Optional[str]:
+        """Текст документа из TextStore, None - файл нужно разобрать"""
+        if not file_hash:
+            return None
+        return await asyncio.to_thread(self.__text_store.get, file_hash, parser_version)
+
+    async def __parse_text(self, path: Path, file_hash: Optional[str], parser_version: str) -> str:
+        """Полный разбор файла с сохранением текста в TextStore"""
+        # разбор документа - CPU и диск, уводим из event loop (пул процессов реестра)
+        parsed_document = await self.__parser_registry.parse_async(path)
+        await self.__store_text(file_hash, parser_version, parsed_document.raw_text)
+        return parsed_document.raw_text
+
+    async def __store_text(self, file_hash: Optional[str], parser_version: str, text: str) -> None:
+        if file_hash:
+            await asyncio.to_thread(self.__text_store.put, file_hash, parser_version, text)
+
+    async def __save_preview(self, repository: AsyncStorageRepository, db_file: File, text: str) -> None:
+        preview = make_preview(text, self.__preview_max_chars, self.__preview_max_lines)
+        if preview == db_file.first_lines:
+            return
+        await repository.set_file_preview(db_file.id, preview)
+        if self.__listing_cache is not None:
+            await self.__listing_cache.invalidate(db_file.user_id)
+
+    @staticmethod
+    def __finish(job: IngestionJob) -> None:
+        job.status = JobStatus.FAILED if job.errors and len(job.errors) == job.total else JobStatus.DONE
+        job.finished_at = datetime.now()
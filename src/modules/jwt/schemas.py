@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -5,3 +7,12 @@ class JWTResponseDTO(BaseModel):
     user_id: int
     access: str
     refresh: str
+
+
+class TokenClaims(BaseModel):
+    """Проверенные данные токена"""
+    user_id: int
+    type: str
+    role: Optional[str] = None
+    # время истечения, unix-время в секундах
+    exp: int
@@ -0,0 +1,55 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from src.modules.jwt.schemas import TokenClaims
+from src.modules.jwt.services import JWTService
+
+
+class VerifiedTokenCache:
+    """
+    LRU уже проверенных токенов: подпись проверяется один раз, дальше токен берётся
+    из кэша до своего exp. Не больше max_size записей, неверные токены не кэшируются.
+
+    Используется только из event loop, без блокировок
+    """
+
+    def __init__(self, jwt_service: JWTService, max_size: int = 10000):
+        self.__jwt_service = jwt_service
+        self.__max_size = max_size
+        self.__tokens: OrderedDict[str, TokenClaims] = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
+
+    def verify(self, token: str) -> Optional[TokenClaims]:
+        """Данные токена или None, если токен неверный или истёк"""
+        now = time.time()
+        claims = self.__tokens.get(token)
+        if claims is not None:
+            if claims.exp > now:
+                self.__hits += 1
+                self.__tokens.move_to_end(token)
+                return claims
+            del self.__tokens[token]
+
+        self.__misses += 1
+        claims = self.__decode(token)
+        if claims is None or claims.exp <= now:
+            return None
+        self.__tokens[token] = claims
+        if len(self.__tokens) > self.__max_size:
+            self.__tokens.popitem(last=False)
+        return claims
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self.__tokens), "max_size": self.__max_size, "hits": self.__hits, "misses": self.__misses}
+
+    def __decode(self, token: str) -> Optional[TokenClaims]:
+        payload = self.__jwt_service.decode_token(token)
+        if not payload or not payload.get("type") or not payload.get("exp"):
+            return None
+        try:
+            return TokenClaims(user_id=int(payload.get("sub")), type=payload["type"], role=payload.get("role"),
+                               exp=int(payload["exp"]))
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends
+
+from src.core.dependencies import get_pool_metrics, get_password_manager, get_cache_backend, get_reference_cache, \
+    get_listing_cache, admin_user
+from src.core.pool_metrics import PoolMetrics
+from src.core.security import PasswordManager
+from src.modules.cache import CacheBackend, MemoryCacheBackend
+from src.modules.metrics.schemas import PoolMetricsDTO, PasswordHashingMetricsDTO, CacheMetricsDTO, CacheHitsDTO, \
+    CacheMemoryDTO
+from src.modules.storage.cached_repository import ReferenceDataCache
+from src.modules.storage.listing_cache import ListingCache
+
+# отчёт о пуле может содержать стеки мест, где взяты соединения - только для администраторов
+metrics_router = APIRouter(prefix="/api/metrics", dependencies=[Depends(admin_user)])
+
+
+@metrics_router.get("/db-pool")
+async def get_db_pool_metrics(
+        metrics: list[PoolMetrics] = Depends(get_pool_metrics)
+) -> list[PoolMetricsDTO]:
+    return [PoolMetricsDTO.model_validate(pool.snapshot()) for pool in metrics]
+
+
+@metrics_router.get("/password-hashing")
+async def get_password_hashing_metrics(
+        password_manager: PasswordManager = Depends(get_password_manager)
+) -> PasswordHashingMetricsDTO:
+    return PasswordHashingMetricsDTO.model_validate(password_manager.stats())
+
+
+@metrics_router.get("/cache")
+async def get_cache_metrics(
+        backend: CacheBackend = Depends(get_cache_backend),
+        reference_cache: ReferenceDataCache = Depends(get_reference_cache),
+        listing_cache: ListingCache = Depends(get_listing_cache)
+) -> CacheMetricsDTO:
+    return CacheMetricsDTO(
+        backend="memory" if isinstance(backend, MemoryCacheBackend) else "redis",
+        reference=_hits(reference_cache.stats()),
+        listing=_hits(listing_cache.stats()),
+        memory=CacheMemoryDTO.model_validate(backend.stats()) if isinstance(backend, MemoryCacheBackend) else None
+    )
+
+
+def _hits(stats: dict) -> CacheHitsDTO:
+    total = stats["hits"] + stats["misses"]
+    return CacheHitsDTO(hits=stats["hits"], misses=stats["misses"], hit_ratio=stats["hits"] / total if total else 0.0)
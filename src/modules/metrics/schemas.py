@@ -0,0 +1,51 @@
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class SuspectedLeakDTO(BaseModel):
+    held_seconds: float
+    traceback: Optional[str] = None
+
+
+class PoolMetricsDTO(BaseModel):
+    name: str
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    wait_time_total: float
+    wait_time_avg: float
+    wait_time_max: float
+    leaks_detected: int
+    suspected_leaks: list[SuspectedLeakDTO] = []
+
+
+class PasswordHashingMetricsDTO(BaseModel):
+    workers: int
+    max_pending: int
+    pending: int
+    completed: int
+    rejected: int
+
+
+class CacheHitsDTO(BaseModel):
+    hits: int
+    misses: int
+    hit_ratio: float
+
+
+class CacheMemoryDTO(BaseModel):
+    items: int
+    bytes: int
+    max_bytes: int
+
+
+class CacheMetricsDTO(BaseModel):
+    backend: str
+    reference: CacheHitsDTO
+    listing: CacheHitsDTO
+    # только для бэкенда memory
+    memory: Optional[CacheMemoryDTO] = None
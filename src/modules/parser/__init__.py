@@ -1,5 +1,6 @@
 from .models import ParsedDocument
 from .services import parse_file, ParserRegistry
+from .utils import make_preview
 from .txt_parser import TxtParser
 from .docx_parser import DocxParser
 from .pdf_parser import PdfParser
@@ -9,6 +10,7 @@ __all__ = [
     "ParsedDocument",
     "parse_file",
     "ParserRegistry",
+    "make_preview",
     "TxtParser",
     "DocxParser",
     "PdfParser",
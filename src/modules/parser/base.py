@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import Optional
 
 from .models import ParsedDocument
 
@@ -11,6 +12,13 @@ class BaseParser(ABC):
     Базовый интерфейс для парсеров документов.
     """
 
+    # версия логики извлечения текста: увеличивать при изменениях, после которых
+    # сохранённый ранее текст нужно извлечь заново
+    version: int = 1
+    # в режиме max_chars разбор действительно останавливается раньше; False - файл
+    # разбирается целиком и текст только обрезается, отдельный разбор для превью не нужен
+    stops_early: bool = True
+
     @abstractmethod
     def supports(self, path: Path) -> bool:
         """
@@ -20,8 +28,12 @@ class BaseParser(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    def parse(self, path: Path) -> ParsedDocument:
+    def parse(self, path: Path, max_chars: Optional[int] = None) -> ParsedDocument:
         """
         Парсит указанный файл и возвращает ParsedDocument.
+
+        max_chars - режим превью: разбор можно остановить, как только набрано
+        max_chars символов текста (страница или абзац дочитываются целиком),
+        в metadata тогда "truncated": "true".
         """
         raise NotImplementedError
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, List, Optional
 
 from docx import Document  # библиотека python-docx
 
@@ -19,14 +19,27 @@ class DocxParser(BaseParser):
     def supports(self, path: Path) -> bool:
         return path.suffix.lower() == ".docx"
 
-    def parse(self, path: Path) -> ParsedDocument:
+    def parse(self, path: Path, max_chars: Optional[int] = None) -> ParsedDocument:
         if not path.exists():
             raise FileNotFoundError(path)
 
         doc = Document(str(path))
 
-        # тексты всех непустых параграфов
-        paragraphs = [p.text for p in doc.paragraphs if p.text.strip()]
+        # тексты непустых параграфов, для превью - только первых
+        paragraphs: List[str] = []
+        chars = 0
+        truncated = False
+        for paragraph in doc.paragraphs:
+            paragraph_text = paragraph.text
+            if not paragraph_text.strip():
+                continue
+            if max_chars is not None and chars >= max_chars:
+                # обрезано, только если дальше есть текст: пустые абзацы в конце документа
+                # не должны вызывать полный разбор
+                truncated = True
+                break
+            paragraphs.append(paragraph_text)
+            chars += len(paragraph_text)
         text = "\n".join(paragraphs)
 
         stat = path.stat()
@@ -40,6 +53,8 @@ class DocxParser(BaseParser):
             ),
             "source_format": "docx",
         }
+        if truncated:
+            metadata["truncated"] = "true"
 
         return ParsedDocument(
             id=str(path.resolve()),
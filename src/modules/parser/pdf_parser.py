@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from pypdf import PdfReader
 
@@ -21,19 +21,26 @@ class PdfParser(BaseParser):
     def supports(self, path: Path) -> bool:
         return path.suffix.lower() == ".pdf"
 
-    def parse(self, path: Path) -> ParsedDocument:
+    def parse(self, path: Path, max_chars: Optional[int] = None) -> ParsedDocument:
         if not path.exists():
             raise FileNotFoundError(path)
 
         reader = PdfReader(str(path))
         pages_text: List[str] = []
+        chars = 0
+        truncated = False
 
         for page in reader.pages:
+            if max_chars is not None and chars >= max_chars:
+                # для превью хватает первых страниц, остальные не разбираем
+                truncated = True
+                break
             try:
                 extracted = page.extract_text() or ""
             except Exception:
                 extracted = ""
             pages_text.append(extracted)
+            chars += len(extracted)
 
         text = "\n".join(pages_text)
 
@@ -47,6 +54,8 @@ class PdfParser(BaseParser):
             "pages": str(len(reader.pages)),
             "source_format": "pdf",
         }
+        if truncated:
+            metadata["truncated"] = "true"
 
         return ParsedDocument(
             id=str(path.resolve()),
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from striprtf.striprtf import rtf_to_text
 
@@ -16,10 +16,12 @@ class RtfParser(BaseParser):
     Парсер RTF-файлов (.rtf)
     """
 
+    stops_early = False
+
     def supports(self, path: Path) -> bool:
         return path.suffix.lower() == ".rtf"
 
-    def parse(self, path: Path) -> ParsedDocument:
+    def parse(self, path: Path, max_chars: Optional[int] = None) -> ParsedDocument:
         if not path.exists():
             raise FileNotFoundError(path)
 
@@ -27,7 +29,12 @@ class RtfParser(BaseParser):
         with open(path, "r", encoding="utf-8", errors="ignore") as f:
             rtf_content = f.read()
 
+        # управляющие слова RTF не дают остановиться раньше: разбирается весь файл,
+        # для превью текст просто обрезается
         text = rtf_to_text(rtf_content)
+        truncated = max_chars is not None and len(text) > max_chars
+        if truncated:
+            text = text[:max_chars]
 
         # --- Метаданные ---
         stat = path.stat()
@@ -39,6 +46,8 @@ class RtfParser(BaseParser):
             "content_type": "application/rtf",
             "source_format": "rtf",
         }
+        if truncated:
+            metadata["truncated"] = "true"
 
         return ParsedDocument(
             id=str(path.resolve()),
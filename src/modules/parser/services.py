@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-import tempfile
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Sequence
-
-from fastapi import UploadFile
+from typing import List, Optional, Sequence
 
 from .base import BaseParser
 from .docx_parser import DocxParser
@@ -19,7 +20,21 @@ from .txt_parser import TxtParser
 
 
 class ParserRegistry:
-    def __init__(self, parsers: Sequence[BaseParser] | None = None) -> None:
+    """
+    Реестр парсеров.
+
+    parse() разбирает файл в текущем процессе. parse_async() для async-кода:
+    при pool_size > 0 разбор уходит в заранее запущенный пул процессов (парсеры
+    на чистом Python держат GIL и иначе блокируют весь воркер), при pool_size == 0 -
+    в поток. Процесс пула перезапускается после max_tasks_per_child задач,
+    чтобы не копить память после тяжёлых PDF.
+    """
+
+    def __init__(self,
+                 parsers: Sequence[BaseParser] | None = None,
+                 pool_size: int = 0,
+                 max_tasks_per_child: int | None = None,
+                 timeout: float | None = None) -> None:
         if parsers is None:
             parsers = [
                 TxtParser(),
@@ -29,65 +44,106 @@ class ParserRegistry:
                 RtfParser(),
             ]
         self._parsers: List[BaseParser] = list(parsers)
+        self._pool_size = pool_size
+        self._max_tasks_per_child = max_tasks_per_child
+        self._timeout = timeout
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def pool_size(self) -> int:
+        return self._pool_size
 
     def register(self, parser: BaseParser) -> None:
+        if self._executor is not None:
+            raise RuntimeError("Парсеры регистрируются до запуска пула процессов")
         self._parsers.append(parser)
 
-    def parse(self, path: Path) -> ParsedDocument:
+    def get_parser(self, path: Path) -> BaseParser:
         for parser in self._parsers:
             if parser.supports(path):
-                return parser.parse(path)
+                return parser
         raise ValueError(f"Нет подходящего парсера для файла: {path}")
 
+    def supports(self, path: Path) -> bool:
+        """Есть ли парсер для файла"""
+        return any(parser.supports(path) for parser in self._parsers)
 
-_registry = ParserRegistry()
+    def parser_version(self, path: Path) -> str:
+        """Версия парсера, который разберёт файл, например "pdfparser-v1".
+        Вместе с хэшем содержимого - ключ сохранённого текста"""
+        parser = self.get_parser(path)
+        return f"{type(parser).__name__.lower()}-v{parser.version}"
 
+    def stops_early(self, path: Path) -> bool:
+        """Быстрее ли разбор файла в режиме превью (max_chars), чем полный"""
+        return self.get_parser(path).stops_early
 
-# -------------------- parse_file --------------------
+    def parse(self, path: Path, max_chars: Optional[int] = None) -> ParsedDocument:
+        return self.get_parser(path).parse(path, max_chars)
 
-def parse_file(path: str | Path) -> ParsedDocument:
-    p = Path(path)
-    if not p.exists():
-        raise FileNotFoundError(p)
-    return _registry.parse(p)
+    async def parse_async(self, path: Path, max_chars: Optional[int] = None) -> ParsedDocument:
+        """
+        Разбирает файл, не блокируя event loop. max_chars - режим превью (см. BaseParser.parse).
+
+        :raises TimeoutError: если разбор дольше timeout секунд. Процесс пула при этом
+                              доделывает задачу, но результат уже никому не нужен.
+        """
+        if self._pool_size <= 0:
+            task = asyncio.to_thread(self.parse, path, max_chars)
+        else:
+            loop = asyncio.get_running_loop()
+            task = loop.run_in_executor(self.start(), _parse_in_worker, str(path), max_chars)
+        return await asyncio.wait_for(task, timeout=self._timeout)
+
+    def start(self) -> ProcessPoolExecutor | None:
+        """Запускает пул процессов и сразу поднимает все процессы, чтобы первая загрузка
+        не ждала их старта и импорта тяжёлых библиотек"""
+        if self._pool_size <= 0 or self._executor is not None:
+            return self._executor
 
+        self._executor = ProcessPoolExecutor(
+            max_workers=self._pool_size,
+            # fork небезопасен в процессе с потоками и event loop
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self._parsers,),
+            max_tasks_per_child=self._max_tasks_per_child,
+        )
+        for _ in range(self._pool_size):
+            self._executor.submit(os.getpid)
+        return self._executor
 
-# -------------------- parse_upload_file --------------------
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
-async def _copy_upload_to_temp(upload: UploadFile) -> Path:
-    suffix = Path(upload.filename).suffix if upload.filename else ""
-    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-        while True:
-            chunk = await upload.read(1024 * 1024)
-            if not chunk:
-                break
-            tmp.write(chunk)
-        temp_path = Path(tmp.name)
-    await upload.seek(0)
-    return temp_path
 
+# -------------------- пул процессов --------------------
 
-async def parse_upload_file(upload: UploadFile) -> ParsedDocument:
-    tmp_path = await _copy_upload_to_temp(upload)
+_worker_registry: ParserRegistry | None = None
 
-    try:
-        doc = _registry.parse(tmp_path)
 
-        if upload.filename:
-            doc.metadata.setdefault("original_filename", upload.filename)
+def _init_worker(parsers: Sequence[BaseParser]) -> None:
+    """Инициализация процесса пула: те же парсеры, что в родительском реестре.
+    Библиотеки разбора (pypdf, python-docx, striprtf) к этому моменту уже импортированы
+    вместе с модулями парсеров"""
+    global _worker_registry
+    _worker_registry = ParserRegistry(parsers)
 
-        content_type = getattr(upload, "content_type", None)
-        if content_type:
-            doc.metadata.setdefault("upload_content_type", content_type)
 
-        size = getattr(upload, "size", None)
-        if size is not None:
-            doc.metadata.setdefault("upload_size_bytes", str(size))
+def _parse_in_worker(path: str, max_chars: Optional[int] = None) -> ParsedDocument:
+    return _worker_registry.parse(Path(path), max_chars)
 
-        return doc
 
-    finally:
-        try:
-            tmp_path.unlink(missing_ok=True)
-        except Exception:
-            pass
+_registry = ParserRegistry()
+
+
+# -------------------- parse_file --------------------
+
+def parse_file(path: str | Path) -> ParsedDocument:
+    p = Path(path)
+    if not p.exists():
+        raise FileNotFoundError(p)
+    return _registry.parse(p)
+
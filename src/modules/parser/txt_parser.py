@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from datetime import datetime
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 
 from .base import BaseParser
 from .models import ParsedDocument
@@ -17,11 +17,14 @@ class TxtParser(BaseParser):
     def supports(self, path: Path) -> bool:
         return path.suffix.lower() == ".txt"
 
-    def parse(self, path: Path) -> ParsedDocument:
+    def parse(self, path: Path, max_chars: Optional[int] = None) -> ParsedDocument:
         if not path.exists():
             raise FileNotFoundError(path)
 
-        text = path.read_text(encoding="utf-8", errors="ignore")
+        with open(path, "r", encoding="utf-8", errors="ignore") as f:
+            # для превью читается только начало файла
+            text = f.read(max_chars if max_chars is not None else -1)
+            truncated = max_chars is not None and bool(f.read(1))
 
         stat = path.stat()
         metadata: Dict[str, str] = {
@@ -32,6 +35,8 @@ class TxtParser(BaseParser):
             "content_type": "text/plain",
             "source_format": "txt",
         }
+        if truncated:
+            metadata["truncated"] = "true"
 
         return ParsedDocument(
             id=str(path.resolve()),
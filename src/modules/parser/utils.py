@@ -8,3 +8,20 @@ def normalize_text(text: str) -> str:
     text = text.replace("\r\n", "\n").replace("\r", "\n")
     lines = [line.rstrip() for line in text.split("\n")]
     return "\n".join(lines).strip()
+
+
+def make_preview(text: str, max_chars: int, max_lines: int) -> str:
+    """
+    Превью документа для списка файлов:
+    - первые max_lines непустых строк
+    - не длиннее max_chars символов
+    """
+    lines = []
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        lines.append(line)
+        if len(lines) >= max_lines:
+            break
+    return "\n".join(lines)[:max_chars]
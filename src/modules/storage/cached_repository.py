@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+from enum import Enum
+from typing import Annotated, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, BeforeValidator, ConfigDict, TypeAdapter
+
+from src.modules.cache import CacheBackend
+from src.modules.storage.repository import AsyncStorageRepository
+
+# в кэше enum хранится значением, как его отдаёт API
+EnumValue = Annotated[Optional[str], BeforeValidator(lambda value: value.value if isinstance(value, Enum) else value)]
+
+
+class CategoryRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    category_name: str
+    document_type: str
+    priority_level: EnumValue = None
+    confidentiality: EnumValue = None
+    description: Optional[str] = None
+
+
+class SourceRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    source_name: str
+    source_type: EnumValue = None
+
+
+class TagRef(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    tag_name: str
+    tag_type: Optional[str] = None
+    description: Optional[str] = None
+
+
+_categories_adapter = TypeAdapter(List[CategoryRef])
+_sources_adapter = TypeAdapter(List[SourceRef])
+_tags_adapter = TypeAdapter(List[TagRef])
+
+
+class ReferenceDataCache:
+    """
+    Кэш справочников (категории, источники, теги): таблицы целиком, с временем жизни ttl.
+    После создания записей соответствующий справочник сбрасывается (write-through),
+    с Redis-бэкендом - сразу для всех воркеров
+    """
+
+    CATEGORIES_KEY = "ref:categories"
+    SOURCES_KEY = "ref:sources"
+    TAGS_KEY = "ref:tags"
+
+    def __init__(self, backend: CacheBackend, ttl: float = 60):
+        self.__backend = backend
+        self.__ttl = ttl
+        self.__hits = 0
+        self.__misses = 0
+
+    async def categories(self, load: Callable[[], Awaitable[Sequence]]) -> List[CategoryRef]:
+        return await self.__get(self.CATEGORIES_KEY, _categories_adapter, load)
+
+    async def sources(self, load: Callable[[], Awaitable[Sequence]]) -> List[SourceRef]:
+        return await self.__get(self.SOURCES_KEY, _sources_adapter, load)
+
+    async def tags(self, load: Callable[[], Awaitable[Sequence]]) -> List[TagRef]:
+        return await self.__get(self.TAGS_KEY, _tags_adapter, load)
+
+    async def invalidate(self, *keys: str) -> None:
+        await self.__backend.delete(*keys)
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.__hits, "misses": self.__misses}
+
+    async def __get(self, key: str, adapter: TypeAdapter, load: Callable[[], Awaitable[Sequence]]) -> list:
+        raw = await self.__backend.get(key)
+        if raw is not None:
+            self.__hits += 1
+            return adapter.validate_json(raw)
+        self.__misses += 1
+        items = adapter.validate_python(list(await load()))
+        await self.__backend.set(key, adapter.dump_json(items), self.__ttl)
+        return items
+
+
+class CachedStorageRepository:
+    """
+    AsyncStorageRepository со справочниками из ReferenceDataCache: проверки и поиск
+    категорий, источников и тегов по имени/id не ходят в БД. Остальные методы
+    передаются репозиторию как есть
+    """
+
+    def __init__(self, repository: AsyncStorageRepository, cache: ReferenceDataCache):
+        self.__repository = repository
+        self.__cache = cache
+
+    def __getattr__(self, name: str):
+        return getattr(self.__repository, name)
+
+    # категории
+
+    async def get_all_types(self) -> List[CategoryRef]:
+        return await self.__cache.categories(self.__repository.get_all_types)
+
+    async def check_category_exists(self, category_name: str) -> bool:
+        return category_name.lower() in await self.__categories_by_name()
+
+    async def get_category_id_by_name(self, category_name: str) -> Optional[int]:
+        category = (await self.__categories_by_name()).get(category_name.lower())
+        return category.id if category else None
+
+    async def ensure_categories(self, category_names: List[str]) -> Dict[str, int]:
+        known = await self.__categories_by_name()
+        category_ids = {name: known[name.lower()].id for name in category_names if name.lower() in known}
+        missing = [name for name in category_names if name not in category_ids]
+        if missing:
+            category_ids.update(await self.__repository.ensure_categories(missing))
+            await self.__cache.invalidate(ReferenceDataCache.CATEGORIES_KEY)
+        return category_ids
+
+    async def create_category(self, category_name, document_type):
+        category = await self.__repository.create_category(category_name, document_type)
+        await self.__cache.invalidate(ReferenceDataCache.CATEGORIES_KEY)
+        return category
+
+    # источники
+
+    async def check_source_id_exists(self, source_id: int) -> bool:
+        sources = await self.__cache.sources(self.__repository.get_all_sources)
+        return any(source.id == source_id for source in sources)
+
+    async def create_source(self, source_name, source_type):
+        await self.__repository.create_source(source_name, source_type)
+        await self.__cache.invalidate(ReferenceDataCache.SOURCES_KEY)
+
+    # теги
+
+    async def get_all_tags(self) -> List[TagRef]:
+        return await self.__all_tags()
+
+    async def check_tag_exists(self, tag_name: str) -> bool:
+        return tag_name.lower() in await self.__tags_by_name()
+
+    async def get_tag_by_name(self, tag_name: str) -> Optional[TagRef]:
+        return (await self.__tags_by_name()).get(tag_name.lower())
+
+    async def create_tag(self, tag_name: str, tag_type: str = 'manual', description: Optional[str] = None):
+        tag = await self.__repository.create_tag(tag_name, tag_type, description)
+        await self.__cache.invalidate(ReferenceDataCache.TAGS_KEY)
+        return tag
+
+    async def assign_tags_bulk(self, file_ids: List[int], tag_names: List[str], *args, **kwargs) -> List[int]:
+        has_new_tags = await self.__has_new_tags(tag_names)
+        tag_ids = await self.__repository.assign_tags_bulk(file_ids, tag_names, *args, **kwargs)
+        if has_new_tags:
+            await self.__cache.invalidate(ReferenceDataCache.TAGS_KEY)
+        return tag_ids
+
+    async def create_files_batch(self, user_id: int, files: List[dict], tag_names: Optional[List[str]] = None):
+        has_new_tags = await self.__has_new_tags(tag_names or [])
+        stored = await self.__repository.create_files_batch(user_id, files, tag_names)
+        if has_new_tags:
+            await self.__cache.invalidate(ReferenceDataCache.TAGS_KEY)
+        return stored
+
+    async def __categories_by_name(self) -> Dict[str, CategoryRef]:
+        # в MySQL имена сравниваются без учёта регистра, в индексе - так же
+        categories = await self.__cache.categories(self.__repository.get_all_types)
+        return {category.category_name.lower(): category for category in categories}
+
+    async def __all_tags(self) -> List[TagRef]:
+        return await self.__cache.tags(self.__repository.get_all_tags)
+
+    async def __tags_by_name(self) -> Dict[str, TagRef]:
+        return {tag.tag_name.lower(): tag for tag in await self.__all_tags()}
+
+    async def __has_new_tags(self, tag_names: List[str]) -> bool:
+        names = [name.strip().lower() for name in tag_names if name and name.strip()]
+        if not names:
+            return False
+        known = await self.__tags_by_name()
+        return any(name not in known for name in names)
@@ -0,0 +1,82 @@
+# условные запросы при скачивании файлов: ETag по хэшу содержимого и Last-Modified,
+# выбор кодирования ответа по Accept-Encoding
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from starlette.datastructures import Headers
+
+from src.modules.storage.models import File
+
+
+def file_etag(file: File) -> Optional[str]:
+    """ETag файла - хэш содержимого: одинаковое содержимое даёт одинаковый тег у любого пользователя"""
+    return f'"{file.file_hash}"' if file.file_hash else None
+
+
+def file_last_modified(file: File) -> Optional[datetime]:
+    """Содержимое строки files не меняется после загрузки, поэтому это дата загрузки"""
+    if file.upload_date is None:
+        return None
+    upload_date = file.upload_date
+    if upload_date.tzinfo is None:
+        # MySQL отдаёт время без часового пояса, сервер БД работает в UTC
+        upload_date = upload_date.replace(tzinfo=timezone.utc)
+    return upload_date.replace(microsecond=0)
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(headers: Headers, etag: Optional[str], last_modified: Optional[datetime]) -> bool:
+    """
+    Нужно ли ответить 304 (RFC 9110, 13.2.2): If-None-Match проверяется первым
+    (слабое сравнение), If-Modified-Since - только если If-None-Match нет
+    """
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        if if_none_match.strip() == "*":
+            return True
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in candidates
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since is None or last_modified is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return last_modified <= since
+
+
+def accepts_encoding(headers: Headers, coding: str) -> bool:
+    """
+    Принимает ли клиент кодирование coding (RFC 9110, 12.5.3): "gzip;q=0" - отказ,
+    "*" относится к кодированиям, не названным явно. Нет заголовка - не принимает
+    """
+    accept_encoding = headers.get("accept-encoding")
+    if not accept_encoding:
+        return False
+    wildcard_quality = None
+    for item in accept_encoding.split(","):
+        name, *params = item.split(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        if name == coding:
+            return quality > 0
+        if name == "*":
+            wildcard_quality = quality
+    return wildcard_quality is not None and wildcard_quality > 0
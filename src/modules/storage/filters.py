@@ -0,0 +1,23 @@
+# фильтры списка файлов по полям, извлечённым анализом текста
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class AnalysisFieldFilters(BaseModel):
+    """
+    Диапазоны суммы и даты договора включают границы, номер договора сравнивается
+    целиком, организация - по началу названия контрагента (с формой - только эта форма).
+    Регистр не учитывается
+    """
+
+    amount_min: Optional[float] = None
+    amount_max: Optional[float] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    number: Optional[str] = None
+    organization: Optional[str] = None
+
+    def is_empty(self) -> bool:
+        return not self.model_dump(exclude_none=True)
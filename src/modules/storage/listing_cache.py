@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from src.modules.cache import CacheBackend
+
+
+class ListingCache:
+    """
+    Кэш готовых JSON-ответов списка файлов пользователя.
+
+    Ключ - (user_id, версия пользователя, параметры запроса). Загрузка, удаление и смена тегов
+    увеличивают версию пользователя, и все его прежние записи перестают находиться
+    (их вытеснит LRU или ttl), без перебора ключей
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float = 300):
+        self.__backend = backend
+        self.__ttl = ttl
+        self.__hits = 0
+        self.__misses = 0
+
+    async def version(self, user_id: int) -> int:
+        raw = await self.__backend.get(self.__version_key(user_id))
+        return int(raw) if raw is not None else 0
+
+    async def get(self, user_id: int, version: int, params: list) -> Optional[bytes]:
+        raw = await self.__backend.get(self.__key(user_id, version, params))
+        if raw is None:
+            self.__misses += 1
+        else:
+            self.__hits += 1
+        return raw
+
+    async def set(self, user_id: int, version: int, params: list, value: bytes) -> None:
+        # версия прочитана до запроса в БД: если файлы успели измениться, запись
+        # ляжет под старой версией и читать её уже никто не будет
+        await self.__backend.set(self.__key(user_id, version, params), value, self.__ttl)
+
+    async def invalidate(self, user_id: int) -> None:
+        await self.__backend.incr(self.__version_key(user_id))
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.__hits, "misses": self.__misses}
+
+    @staticmethod
+    def __version_key(user_id: int) -> str:
+        return f"files:version:{user_id}"
+
+    @staticmethod
+    def __key(user_id: int, version: int, params: List) -> str:
+        digest = hashlib.sha1(json.dumps(params, ensure_ascii=False).encode("utf-8")).hexdigest()
+        return f"files:{user_id}:{version}:{digest}"
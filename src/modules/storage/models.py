@@ -1,7 +1,8 @@
 # ORM модели для взаимодействия с БД
 import enum
 
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func, Enum, Index
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, func, Enum, Index, Date, Numeric
+from sqlalchemy.dialects.mysql import LONGTEXT
 from sqlalchemy.orm import relationship
 
 from src.core.database import Base
@@ -17,6 +18,8 @@ class File(Base):
     file_size = Column(Integer)
     file_type = Column(String(50))
     file_hash = Column(String(64), nullable=True)
+    # метка запроса загрузки: по ней пакетная вставка находит именно свои строки
+    upload_token = Column(String(32), nullable=True)
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
     last_modified = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -30,9 +33,92 @@ class File(Base):
     category = relationship("Category", back_populates="files")
     source = relationship("Source", back_populates="files")
     tags = relationship("Tag", secondary="file_tags_users", back_populates="files")
+    counterparties = relationship("Counterparty", secondary="file_counterparties", back_populates="files")
 
 
 Index('idx_file_hash', File.file_hash)
+# один файл с одинаковым содержимым на пользователя: дубликаты отсеивает сам INSERT
+Index('uq_files_user_hash', File.user_id, File.file_hash, unique=True)
+# список файлов пользователя от новых к старым с курсором по (last_modified, id)
+Index('idx_files_user_modified', File.user_id, File.last_modified, File.id)
+# фильтр по типу файла внутри файлов пользователя
+Index('idx_files_user_type', File.user_id, File.file_type)
+
+
+# ORM для содержимого файлов: один файл на диске на уникальный хэш содержимого,
+# ref_count - сколько строк files ссылаются на него
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    digest = Column(String(64), primary_key=True)
+    file_path = Column(String(500), nullable=False)
+    file_size = Column(Integer)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ORM для полнотекстового поиска: извлечённый текст одной записи на хэш содержимого,
+# файлы пользователя находятся через files.file_hash
+class DocumentText(Base):
+    __tablename__ = "document_texts"
+
+    digest = Column(String(64), primary_key=True)
+    content = Column(Text().with_variant(LONGTEXT, "mysql"), nullable=False)
+    indexed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+Index('idx_document_texts_content', DocumentText.content, mysql_prefix='FULLTEXT')
+
+
+# ORM для полей договора, извлечённых анализом текста: одна строка на файл.
+# user_id повторяет files.user_id, чтобы фильтры списка файлов пользователя
+# шли диапазоном по составным индексам (user_id, поле)
+class FileAnalysisFields(Base):
+    __tablename__ = "file_analysis_fields"
+
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    contract_date = Column(Date, nullable=True)
+    contract_number = Column(String(100), nullable=True)
+    total_amount = Column(Numeric(18, 2), nullable=True)
+    analyzed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+
+Index('idx_analysis_user_amount', FileAnalysisFields.user_id, FileAnalysisFields.total_amount)
+Index('idx_analysis_user_date', FileAnalysisFields.user_id, FileAnalysisFields.contract_date)
+Index('idx_analysis_user_number', FileAnalysisFields.user_id, FileAnalysisFields.contract_number)
+
+
+# ORM для контрагентов - организаций, найденных в тексте документов при анализе.
+# Одна запись на форму (ООО, АО...) и нормализованное название (normalize_counterparty_name):
+# «Ромашка», "РОМАШКА" и Ромашка - один контрагент. name - название в том виде,
+# в каком встретилось первым
+class Counterparty(Base):
+    __tablename__ = "counterparties"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    org_form = Column(String(10), nullable=False, default="")
+    name = Column(String(255), nullable=False)
+    normalized_name = Column(String(255), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    files = relationship("File", secondary="file_counterparties", back_populates="counterparties")
+
+
+# поиск по точному названию и автодополнение по префиксу - по одному индексу
+Index('uq_counterparties_name_form', Counterparty.normalized_name, Counterparty.org_form, unique=True)
+
+
+class FileCounterparty(Base):
+    __tablename__ = "file_counterparties"
+
+    file_id = Column(Integer, ForeignKey("files.id", ondelete="CASCADE"), primary_key=True)
+    counterparty_id = Column(Integer, ForeignKey("counterparties.id", ondelete="CASCADE"), primary_key=True)
+    # повторяет files.user_id: файлы пользователя с контрагентом - по индексу без чтения files
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+
+
+Index('idx_file_counterparties_user', FileCounterparty.user_id, FileCounterparty.counterparty_id)
 
 
 # Enum для типа откуда отправлены файлы, уровень конфидициальности, уровень приоритета
@@ -105,3 +191,7 @@ class FileTag(Base):
 
     # Связи для удобства
     assigned_by_user = relationship("User", back_populates="assigned_tags")
+
+
+# поиск файлов по тегу: первичный ключ (file_id, tag_id) для этого не подходит
+Index('idx_file_tags_tag_file', FileTag.tag_id, FileTag.file_id)
@@ -0,0 +1,29 @@
+# курсоры для постраничной выдачи по ключу (last_modified, id)
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+FileCursor = Tuple[datetime, int]
+
+
+def encode_cursor(last_modified: datetime, file_id: int) -> str:
+    """Непрозрачный для клиента токен: позиция последнего файла на странице"""
+    raw = json.dumps([last_modified.isoformat(), file_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token: Optional[str]) -> Optional[FileCursor]:
+    """
+    Разбирает токен из encode_cursor.
+
+    :raises ValueError: если токен повреждён.
+    """
+    if not token:
+        return None
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        last_modified, file_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(last_modified), int(file_id)
+    except (ValueError, TypeError) as error:
+        raise ValueError("Некорректный курсор") from error
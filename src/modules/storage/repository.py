@@ -1,10 +1,21 @@
-from typing import List, Optional, Type, reveal_type
-
-from sqlalchemy import select, func, exists
-from sqlalchemy.orm import Session, joinedload
-
+import math
+import uuid
+from decimal import Decimal
+from typing import List, Optional, Type, reveal_type, Tuple, Dict, Any
+
+from sqlalchemy import select, func, exists, delete, or_, and_, Select, update, tuple_
+from sqlalchemy.dialects.mysql import insert as mysql_insert, match
+from sqlalchemy.orm import Session, selectinload
+
+from src.core.async_repository import AsyncRepository
+from src.modules.analysis.content_rules import parse_contract_date, split_organization, normalize_counterparty_name
+from src.modules.storage.filters import AnalysisFieldFilters
+from src.modules.storage.pagination import FileCursor
 from src.modules.storage.models import File, Tag, FileTag, Category, PriorityLevel, ConfidentialityLevel, Source, \
-    SourceType
+    SourceType, Blob, DocumentText, FileAnalysisFields, Counterparty, FileCounterparty
+
+# Numeric(18, 2): большие суммы - почти наверняка не суммы, а номера счетов и т.п.
+_MAX_AMOUNT = Decimal("9999999999999999.99")
 
 
 class StorageRepository:
@@ -49,6 +60,92 @@ class StorageRepository:
         self.__session.refresh(db_category)
         return db_category
 
+    def ensure_categories(self, category_names: List[str]) -> Dict[str, int]:
+        """
+        Создаёт недостающие категории (название = тип документа) одним многострочным
+        INSERT ... ON DUPLICATE KEY и возвращает id всех категорий по названию
+        """
+        unique_names = sorted(set(category_names))
+        if not unique_names:
+            return {}
+        stmt = mysql_insert(Category).values([
+            {"category_name": name, "document_type": name, "priority_level": PriorityLevel.normal,
+             "confidentiality": ConfidentialityLevel.internal}
+            for name in unique_names
+        ])
+        self.__session.execute(stmt.on_duplicate_key_update(category_name=Category.category_name))
+        rows = self.__session.execute(
+            select(Category.category_name, Category.id).where(Category.category_name.in_(unique_names))
+        ).all()
+        self.__session.commit()
+        return {name: category_id for name, category_id in rows}
+
+    def create_files_batch(self,
+                           user_id: int,
+                           files: List[dict],
+                           tag_names: Optional[List[str]] = None
+                           ) -> Dict[str, Tuple[int, str]]:
+        """
+        Добавляет файлы пользователя одной транзакцией.
+
+        files - словари с колонками File (title, file_path, file_size, file_type, file_hash,
+        category_id, source_id), file_path - предлагаемый путь содержимого. Дубликаты отсеивает
+        уникальный индекс (user_id, file_hash) прямо в INSERT IGNORE, без отдельной проверки.
+        Для вставленных файлов берутся ссылки на содержимое (blobs) и назначаются ручные теги.
+
+        Возвращает {хэш: (id файла, путь к содержимому)} только для вставленных файлов
+        """
+        if not files:
+            return {}
+        upload_token = uuid.uuid4().hex
+        result = self.__session.execute(
+            mysql_insert(File).prefix_with("IGNORE").values([
+                {**file, "user_id": user_id, "upload_token": upload_token} for file in files
+            ])
+        )
+        if not result.rowcount:
+            self.__session.commit()
+            return {}
+
+        # id вставленных строк не обязаны идти подряд (innodb_autoinc_lock_mode=2), поэтому
+        # свои строки ищутся по метке запроса: у дубликатов, отсеянных индексом, она чужая
+        inserted = self.__session.execute(
+            select(File.id, File.file_hash).where(
+                File.user_id == user_id,
+                File.file_hash.in_([file["file_hash"] for file in files]),
+                File.upload_token == upload_token
+            )
+        ).all()
+        file_ids = {file_hash: file_id for file_id, file_hash in inserted}
+
+        # вставлена первая строка с каждым хэшем, её путь и предлагаем для содержимого
+        proposed = {}
+        for file in files:
+            if file["file_hash"] in file_ids:
+                proposed.setdefault(file["file_hash"], file)
+        # блокировки строк blobs всегда в одном порядке, чтобы параллельные загрузки не ловили deadlock
+        blobs_stmt = mysql_insert(Blob).values([
+            {"digest": digest, "file_path": file["file_path"], "file_size": file["file_size"], "ref_count": 1}
+            for digest, file in sorted(proposed.items())
+        ])
+        self.__session.execute(blobs_stmt.on_duplicate_key_update(ref_count=Blob.ref_count + 1))
+        stored_paths = dict(self.__session.execute(
+            select(Blob.digest, Blob.file_path).where(Blob.digest.in_(list(file_ids)))
+        ).all())
+
+        # содержимое уже хранилось (в том числе с другим расширением) - файл ссылается на прежний путь
+        moved = [
+            {"id": file_ids[digest], "file_path": stored_path}
+            for digest, stored_path in stored_paths.items() if stored_path != proposed[digest]["file_path"]
+        ]
+        if moved:
+            self.__session.execute(update(File), moved)
+
+        if tag_names:
+            self.assign_tags_bulk(list(file_ids.values()), tag_names, "manual", assigned_by=user_id, commit=False)
+        self.__session.commit()
+        return {digest: (file_ids[digest], stored_paths[digest]) for digest in file_ids}
+
     def get_all_files(self) -> List[File]:
         stmt = select(File).order_by(File.last_modified)
         res = self.__session.execute(stmt)
@@ -59,11 +156,40 @@ class StorageRepository:
         res = self.__session.execute(stmt)
         return res.scalars().all()
 
+    def get_all_files_keyset(self, after: Optional[FileCursor] = None, limit: int = 100) -> List[File]:
+        stmt = self.__keyset(select(File), after, limit, descending=False)
+        res = self.__session.execute(stmt)
+        return res.scalars().all()
+
     def get_file_by_id(self, file_id: int) -> Optional[File]:
         stmt = select(File).where(File.id == file_id)
         res = self.__session.execute(stmt)
         return res.scalar_one_or_none()
 
+    def get_file_for_analysis(self, file_id: int) -> Optional[File]:
+        """Файл вместе с категорией, источником и тегами - всё, что нужно анализатору"""
+        stmt = select(File).where(File.id == file_id).options(
+            selectinload(File.category),
+            selectinload(File.source),
+            selectinload(File.tags)
+        )
+        res = self.__session.execute(stmt)
+        return res.scalar_one_or_none()
+
+    def get_files_for_analysis_after(self, after_id: int, limit: int) -> List[File]:
+        """
+        Следующие limit файлов с id > after_id по возрастанию id вместе с категорией,
+        источником и тегами: три запроса selectinload на всю пачку вместо ленивой
+        загрузки связей по каждому файлу
+        """
+        stmt = select(File).where(File.id > after_id).order_by(File.id).limit(limit).options(
+            selectinload(File.category),
+            selectinload(File.source),
+            selectinload(File.tags)
+        )
+        res = self.__session.execute(stmt)
+        return res.scalars().all()
+
     def get_files_by_user(self, user_id: int) -> List[File]:
         stmt = select(File).where(File.user_id == user_id).order_by(File.last_modified.desc())
         res = self.__session.execute(stmt)
@@ -74,6 +200,12 @@ class StorageRepository:
         res = self.__session.execute(stmt)
         return res.scalars().all()
 
+    def get_files_by_user_keyset(self, user_id: int, after: Optional[FileCursor] = None,
+                                 limit: int = 100) -> List[File]:
+        stmt = self.__keyset(select(File).where(File.user_id == user_id), after, limit)
+        res = self.__session.execute(stmt)
+        return res.scalars().all()
+
     def get_files_by_category(self, category_id: int) -> List[File]:
         stmt = select(File).where(File.category_id == category_id).order_by(File.last_modified.desc())
         res = self.__session.execute(stmt)
@@ -85,6 +217,12 @@ class StorageRepository:
         res = self.__session.execute(stmt)
         return res.scalars().all()
 
+    def get_files_by_category_keyset(self, category_id: int, after: Optional[FileCursor] = None,
+                                     limit: int = 100) -> List[File]:
+        stmt = self.__keyset(select(File).where(File.category_id == category_id), after, limit)
+        res = self.__session.execute(stmt)
+        return res.scalars().all()
+
     def get_files_by_tag_id(self, tag_id: int) -> List[File]:
         stmt = select(File).join(FileTag, File.id == FileTag.file_id).where(FileTag.tag_id == tag_id).order_by(
             File.last_modified.desc())
@@ -97,6 +235,12 @@ class StorageRepository:
         res = self.__session.execute(stmt)
         return res.scalars().all()
 
+    def get_files_by_tag_id_keyset(self, tag_id: int, after: Optional[FileCursor] = None,
+                                   limit: int = 100) -> List[File]:
+        stmt = select(File).join(FileTag, File.id == FileTag.file_id).where(FileTag.tag_id == tag_id)
+        res = self.__session.execute(self.__keyset(stmt, after, limit))
+        return res.scalars().all()
+
     def get_files_by_tag_id_list(self, tag_id_list: List[int]) -> List[File]:
         stmt = select(File).join(FileTag, File.id == FileTag.file_id).where(FileTag.tag_id.in_(tag_id_list)).order_by(
             File.last_modified.desc())
@@ -109,6 +253,15 @@ class StorageRepository:
         res = self.__session.execute(stmt)
         return res.scalars().all()
 
+    def get_files_by_tag_id_list_keyset(self, tag_id_list: List[int], after: Optional[FileCursor] = None,
+                                        limit: int = 100) -> List[File]:
+        # файл с несколькими тегами из списка должен попасть на страницу один раз
+        stmt = select(File).where(
+            exists().where(FileTag.file_id == File.id, FileTag.tag_id.in_(tag_id_list))
+        )
+        res = self.__session.execute(self.__keyset(stmt, after, limit))
+        return res.scalars().all()
+
     def get_files_by_source(self, source_id: int) -> List[File]:
         stmt = select(File).where(File.source_id == source_id).order_by(File.last_modified.desc())
         res = self.__session.execute(stmt)
@@ -120,6 +273,52 @@ class StorageRepository:
         res = self.__session.execute(stmt)
         return res.scalars().all()
 
+    def get_files_by_source_keyset(self, source_id: int, after: Optional[FileCursor] = None,
+                                   limit: int = 100) -> List[File]:
+        stmt = self.__keyset(select(File).where(File.source_id == source_id), after, limit)
+        res = self.__session.execute(stmt)
+        return res.scalars().all()
+
+    @staticmethod
+    def __files_with_tags(tag_names: List[str], match_all: bool) -> Select:
+        """
+        id файлов с тегами из списка одним запросом по индексу file_tags_users(tag_id, file_id):
+        match_all - GROUP BY file_id HAVING COUNT(DISTINCT tag_id) = число тегов,
+        иначе файлы хотя бы с одним тегом
+        """
+        # сравнение имён тегов в БД без учёта регистра: "Архив" и "архив" - один тег
+        unique_names = list({name.lower(): name for name in tag_names}.values())
+        stmt = select(FileTag.file_id).join(Tag, Tag.id == FileTag.tag_id).where(Tag.tag_name.in_(unique_names))
+        if match_all and len(unique_names) > 1:
+            stmt = stmt.group_by(FileTag.file_id).having(func.count(FileTag.tag_id.distinct()) == len(unique_names))
+        return stmt
+
+    @staticmethod
+    def __keyset(stmt: Select, after: Optional[FileCursor], limit: int, descending: bool = True) -> Select:
+        """
+        Постраничная выдача по ключу (last_modified, id): следующая страница начинается
+        строго после курсора, поэтому глубина страницы не влияет на стоимость запроса
+        в отличие от OFFSET. Условие раскрыто через OR, а не сравнение кортежей -
+        так MySQL использует индекс по (..., last_modified, id)
+        """
+        if after is not None:
+            last_modified, file_id = after
+            if descending:
+                stmt = stmt.where(or_(
+                    File.last_modified < last_modified,
+                    and_(File.last_modified == last_modified, File.id < file_id)
+                ))
+            else:
+                stmt = stmt.where(or_(
+                    File.last_modified > last_modified,
+                    and_(File.last_modified == last_modified, File.id > file_id)
+                ))
+        if descending:
+            stmt = stmt.order_by(File.last_modified.desc(), File.id.desc())
+        else:
+            stmt = stmt.order_by(File.last_modified, File.id)
+        return stmt.limit(limit)
+
     def full_duplicate_files(self, file_hash: str) -> List[File]:
         stmt = select(File).where(File.file_hash == file_hash).order_by(File.last_modified.desc())
         res = self.__session.execute(stmt)
@@ -134,6 +333,131 @@ class StorageRepository:
         self.__session.commit()
         return True
 
+    def acquire_blob(self, digest: str, file_path: str, file_size: int) -> str:
+        """
+        Добавляет ссылку на содержимое (ref_count + 1), при первой загрузке создаёт запись.
+        Возвращает путь, по которому содержимое хранится: у существующей записи - прежний
+        """
+        stmt = mysql_insert(Blob).values(digest=digest, file_path=file_path, file_size=file_size, ref_count=1)
+        stmt = stmt.on_duplicate_key_update(ref_count=Blob.ref_count + 1)
+        self.__session.execute(stmt)
+        stored_path = self.__session.execute(select(Blob.file_path).where(Blob.digest == digest)).scalar_one()
+        self.__session.commit()
+        return stored_path
+
+    def release_blob(self, digest: str) -> Optional[str]:
+        """
+        Снимает ссылку на содержимое. Если ссылка была последней, удаляет запись
+        и возвращает путь к файлу на диске, который пора удалить, иначе None
+        """
+        blob = self.__lock_blob(digest)
+        orphan_path = self.__drop_blob_reference(blob) if blob else None
+        self.__session.commit()
+        return orphan_path
+
+    def delete_file_and_release_blob(self, file_id: int, commit: bool = True) -> Optional[str]:
+        """
+        Удаляет строку files и снимает её ссылку на содержимое в одной транзакции.
+        Возвращает путь к файлу на диске, на который больше никто не ссылается, иначе None.
+        commit=False - строка blobs остаётся заблокированной до commit(): файл можно убрать
+        с диска до того, как параллельная загрузка того же содержимого создаст запись заново
+        """
+        file = self.get_file_by_id(file_id)
+        if not file:
+            return None
+
+        blob = self.__lock_blob(file.file_hash) if file.file_hash else None
+        if blob:
+            orphan_path = self.__drop_blob_reference(blob)
+        else:
+            # файл сохранён до появления хранилища по содержимому и ни с кем не разделяется
+            orphan_path = file.file_path
+
+        self.__session.delete(file)
+        if commit:
+            self.__session.commit()
+        return orphan_path
+
+    def commit(self) -> None:
+        self.__session.commit()
+
+    def rollback(self) -> None:
+        self.__session.rollback()
+
+    def __lock_blob(self, digest: str) -> Optional[Blob]:
+        # блокировка строки: параллельный acquire_blob того же содержимого дождётся конца транзакции
+        stmt = select(Blob).where(Blob.digest == digest).with_for_update().execution_options(populate_existing=True)
+        return self.__session.execute(stmt).scalar_one_or_none()
+
+    def __drop_blob_reference(self, blob: Blob) -> Optional[str]:
+        blob.ref_count -= 1
+        if blob.ref_count > 0:
+            return None
+        self.__session.delete(blob)
+        # содержимое больше никому не принадлежит - убираем его из поискового индекса
+        self.__session.execute(delete(DocumentText).where(DocumentText.digest == blob.digest))
+        return blob.file_path
+
+    def set_file_preview(self, file_id: int, preview: str) -> None:
+        """
+        Сохраняет превью текста файла (first_lines). last_modified не меняется:
+        превью - результат обработки, а не правка файла, порядок списка остаётся прежним
+        """
+        self.__session.execute(
+            update(File).where(File.id == file_id).values(first_lines=preview, last_modified=File.last_modified)
+        )
+        self.__session.commit()
+
+    def index_document_text(self, digest: str, content: str, replace: bool = False) -> None:
+        """
+        Добавляет текст содержимого в полнотекстовый индекс. Уже проиндексированный текст
+        перезаписывается только при replace=True (после нового разбора файла)
+        """
+        stmt = mysql_insert(DocumentText).values(digest=digest, content=content)
+        if replace:
+            stmt = stmt.on_duplicate_key_update(content=stmt.inserted.content)
+        else:
+            stmt = stmt.prefix_with("IGNORE")
+        self.__session.execute(stmt)
+        self.__session.commit()
+
+    def search_files(self,
+                     user_id: int,
+                     query: str,
+                     skip: int = 0,
+                     limit: int = 20,
+                     snippet_length: int = 240
+                     ) -> Tuple[int, List[Tuple[File, float, str]]]:
+        """
+        Полнотекстовый поиск по тексту файлов пользователя (MySQL FULLTEXT, natural language mode).
+        Возвращает общее число совпадений и страницу (файл, релевантность, фрагмент текста),
+        отсортированную по релевантности. Фрагмент вырезается в БД вокруг первого слова запроса,
+        чтобы не тянуть весь текст документа
+        """
+        score = match(DocumentText.content, against=query).in_natural_language_mode()
+        conditions = (File.user_id == user_id, score > 0)
+
+        total_stmt = select(func.count(File.id)).join(
+            DocumentText, DocumentText.digest == File.file_hash
+        ).where(*conditions)
+        total = self.__session.execute(total_stmt).scalar()
+        if not total:
+            return 0, []
+
+        first_term = query.split()[0]
+        snippet_start = func.greatest(func.locate(first_term, DocumentText.content) - snippet_length // 3, 1)
+        snippet = func.substring(DocumentText.content, snippet_start, snippet_length)
+
+        stmt = select(File, score.label("score"), snippet.label("snippet")).join(
+            DocumentText, DocumentText.digest == File.file_hash
+        ).where(*conditions).order_by(score.desc(), File.id.desc()).offset(skip).limit(limit).options(
+            selectinload(File.category),
+            selectinload(File.source),
+            selectinload(File.tags)
+        )
+        rows = self.__session.execute(stmt).all()
+        return total, [(row.File, float(row.score), row.snippet) for row in rows]
+
     def create_tag(self,
                    tag_name: str,
                    tag_type: str = 'manual',
@@ -162,6 +486,182 @@ class StorageRepository:
         self.__session.refresh(file_tag)
         return file_tag
 
+    def assign_tags_bulk(self,
+                         file_ids: List[int],
+                         tag_names: List[str],
+                         tag_type: str = 'manual',
+                         assigned_by: Optional[int] = None,
+                         descriptions: Optional[Dict[str, Optional[str]]] = None,
+                         commit: bool = True
+                         ) -> List[int]:
+        """
+        Назначает теги всем файлам из списка за три запроса в одной транзакции:
+        многострочный INSERT ... ON DUPLICATE KEY недостающих тегов, выборка их id
+        и многострочный INSERT ... ON DUPLICATE KEY связей. Уже существующие теги
+        и связи не меняются. Возвращает id тегов
+        """
+        # в БД имена тегов сравниваются без учёта регистра, дубликаты убираем заранее
+        unique_names = list({name.strip().lower(): name.strip() for name in tag_names if name and name.strip()}.values())
+        if not unique_names:
+            return []
+        descriptions = descriptions or {}
+
+        tags_stmt = mysql_insert(Tag).values([
+            {"tag_name": name, "tag_type": tag_type, "description": descriptions.get(name)} for name in unique_names
+        ])
+        self.__session.execute(tags_stmt.on_duplicate_key_update(tag_name=Tag.tag_name))
+        tag_ids = self.__session.execute(select(Tag.id).where(Tag.tag_name.in_(unique_names))).scalars().all()
+
+        if file_ids:
+            links_stmt = mysql_insert(FileTag).values([
+                {"file_id": file_id, "tag_id": tag_id, "assigned_by": assigned_by}
+                for file_id in file_ids for tag_id in tag_ids
+            ])
+            self.__session.execute(links_stmt.on_duplicate_key_update(file_id=FileTag.file_id))
+        if commit:
+            self.__session.commit()
+        return tag_ids
+
+    def replace_auto_tags_bulk(self,
+                               file_tags: Dict[int, Dict[str, Optional[str]]],
+                               remove_stale: bool = True,
+                               commit: bool = True
+                               ) -> Tuple[int, int]:
+        """
+        Записывает результат анализа пачки файлов: file_id -> {название авто-тега: описание}.
+        Недостающие теги и связи добавляются многострочными INSERT, при remove_stale
+        связи файлов пачки, назначенные системой (assigned_by IS NULL) и отсутствующие
+        в результате, удаляются, ручные не трогаются.
+        Возвращает (добавлено связей, удалено связей)
+        """
+        if not file_tags:
+            return 0, 0
+
+        names: Dict[str, str] = {}
+        descriptions: Dict[str, Optional[str]] = {}
+        for tags in file_tags.values():
+            for name, description in tags.items():
+                if name and name.strip():
+                    names.setdefault(name.strip().lower(), name.strip())
+                    descriptions.setdefault(name.strip(), description)
+
+        tag_ids: Dict[str, int] = {}
+        if names:
+            tags_stmt = mysql_insert(Tag).values([
+                {"tag_name": name, "tag_type": "auto", "description": descriptions.get(name)}
+                for name in names.values()
+            ])
+            self.__session.execute(tags_stmt.on_duplicate_key_update(tag_name=Tag.tag_name))
+            rows = self.__session.execute(select(Tag.id, Tag.tag_name).where(Tag.tag_name.in_(list(names.values()))))
+            tag_ids = {tag_name.lower(): tag_id for tag_id, tag_name in rows}
+
+        wanted = {
+            (file_id, tag_ids[name.strip().lower()])
+            for file_id, tags in file_tags.items() for name in tags
+            if name and name.strip() and name.strip().lower() in tag_ids
+        }
+        existing = self.__session.execute(
+            select(FileTag.file_id, FileTag.tag_id, FileTag.assigned_by)
+            .where(FileTag.file_id.in_(list(file_tags)))
+        ).all()
+
+        to_add = wanted - {(file_id, tag_id) for file_id, tag_id, _ in existing}
+        to_remove = set()
+        if remove_stale:
+            # системную связь отличает только assigned_by IS NULL: тип тега здесь не важен,
+            # тег мог быть создан пользователем и позже выставлен правилами
+            to_remove = {
+                (file_id, tag_id) for file_id, tag_id, assigned_by in existing if assigned_by is None
+            } - wanted
+
+        if to_remove:
+            self.__session.execute(
+                delete(FileTag).where(tuple_(FileTag.file_id, FileTag.tag_id).in_(sorted(to_remove))),
+                # объекты связей в сессию не загружались, синхронизировать нечего
+                execution_options={"synchronize_session": False}
+            )
+        if to_add:
+            self.__session.execute(mysql_insert(FileTag).prefix_with("IGNORE").values([
+                {"file_id": file_id, "tag_id": tag_id, "assigned_by": None} for file_id, tag_id in sorted(to_add)
+            ]))
+        if commit:
+            self.__session.commit()
+        return len(to_add), len(to_remove)
+
+    def save_analysis_fields(self,
+                             results: List[Tuple[int, int, Dict[str, Any]]],
+                             commit: bool = True
+                             ) -> None:
+        """
+        Сохраняет поля анализа файлов: (file_id, user_id, AnalysisResult.fields) на каждый файл.
+        Строка file_analysis_fields перезаписывается целиком. Организации из fields становятся
+        контрагентами (новые добавляются в counterparties), связи файлов с контрагентами
+        заменяются новым списком. Поля и связи - по одному многострочному запросу на всю пачку,
+        контрагенты - по запросу на каждого разного в пачке
+        """
+        if not results:
+            return
+        rows = []
+        # (форма, нормализованное название) -> название, как встретилось первым
+        counterparties: Dict[Tuple[str, str], str] = {}
+        links: List[Tuple[int, int, Tuple[str, str]]] = []
+        for file_id, user_id, fields in results:
+            rows.append({"file_id": file_id, "user_id": user_id, **self.__analysis_field_columns(fields)})
+            for value in fields.get("organizations") or []:
+                org_form, name = split_organization(value)
+                normalized = normalize_counterparty_name(name)[:255].rstrip()
+                if not normalized:
+                    continue
+                key = ((org_form or "")[:10], normalized)
+                counterparties.setdefault(key, name[:255])
+                links.append((file_id, user_id, key))
+
+        stmt = mysql_insert(FileAnalysisFields).values(rows)
+        self.__session.execute(stmt.on_duplicate_key_update(
+            contract_date=stmt.inserted.contract_date,
+            contract_number=stmt.inserted.contract_number,
+            total_amount=stmt.inserted.total_amount,
+            analyzed_at=func.now()
+        ))
+        self.__session.execute(
+            delete(FileCounterparty).where(FileCounterparty.file_id.in_([file_id for file_id, _, _ in results])),
+            execution_options={"synchronize_session": False}
+        )
+        if counterparties:
+            # id берётся у той строки, с которой совпал уникальный индекс: база сравнивает названия
+            # по своей collation (без регистра и диакритики), и два разных ключа Python могут
+            # оказаться одним контрагентом. Строки вставляются в порядке ключей, как и в blobs
+            counterparty_ids = {}
+            for (org_form, normalized), name in sorted(counterparties.items()):
+                counterparty_stmt = mysql_insert(Counterparty).values(
+                    org_form=org_form, normalized_name=normalized, name=name)
+                counterparty_ids[(org_form, normalized)] = self.__session.execute(
+                    counterparty_stmt.on_duplicate_key_update(id=func.last_insert_id(Counterparty.id))
+                ).lastrowid
+            link_rows = {
+                (file_id, counterparty_ids[key]): {"file_id": file_id, "counterparty_id": counterparty_ids[key],
+                                                   "user_id": user_id}
+                for file_id, user_id, key in links
+            }
+            self.__session.execute(mysql_insert(FileCounterparty).prefix_with("IGNORE").values(list(link_rows.values())))
+        if commit:
+            self.__session.commit()
+
+    @staticmethod
+    def __analysis_field_columns(fields: Dict[str, Any]) -> Dict[str, Any]:
+        """Поля extract_fields_from_text -> значения колонок file_analysis_fields"""
+        raw_date = fields.get("date")
+        number = fields.get("number")
+        amount = fields.get("total_amount")
+        total_amount = None
+        if amount is not None and math.isfinite(amount) and 0 < amount <= _MAX_AMOUNT:
+            total_amount = Decimal(repr(float(amount))).quantize(Decimal("0.01"))
+        return {
+            "contract_date": parse_contract_date(raw_date) if raw_date else None,
+            "contract_number": number[:100] if number else None,
+            "total_amount": total_amount,
+        }
+
     def remove_tag_from_file(self, file_id: int, tag_id: int) -> bool:
         stmt = select(FileTag).where(FileTag.file_id == file_id, FileTag.tag_id == tag_id)
         result = self.__session.execute(stmt)
@@ -189,35 +689,116 @@ class StorageRepository:
             user_id: int,
             file_type: Optional[str] = None,
             tags: Optional[List[str]] = None,
-            counterparty: Optional[str] = None
+            counterparty: Optional[str] = None,
+            after: Optional[FileCursor] = None,
+            limit: int = 100,
+            tag_mode: str = "all",
+            field_filters: Optional[AnalysisFieldFilters] = None
     ) -> list[Type[File]]:
-        query = self.__session.query(File).options(
-            joinedload(File.category),
-            joinedload(File.source),
-            joinedload(File.tags)
+        """
+        Страница файлов по фильтрам, от новых к старым. Следующая страница - after=(last_modified, id)
+        последнего файла. Связи грузятся отдельными SELECT ... IN (selectinload), без
+        размножения строк файла на каждый тег.
+
+        tag_mode="all" - у файла есть все теги из tags, "any" - хотя бы один.
+        counterparty - точное название контрагента ("ООО «Ромашка»" или без формы - любая форма),
+        поиск по уникальному индексу counterparties и индексу (user_id, counterparty_id) связей.
+        field_filters - по полям анализа текста, подзапросы по индексам (user_id, поле)
+        """
+        stmt = select(File).options(
+            selectinload(File.category),
+            selectinload(File.source),
+            selectinload(File.tags)
         )
         if user_id:
-            query = query.filter(File.user_id == user_id)
+            stmt = stmt.where(File.user_id == user_id)
         if file_type:
-            query = query.filter(File.file_type == file_type)
-        if tags:
-            for tag in tags:
-                query = query.filter(File.tags.any(tag_name=tag))
+            stmt = stmt.where(File.file_type == file_type)
+        if tags and tag_mode == "all":
+            stmt = stmt.where(File.id.in_(self.__files_with_tags(tags, match_all=True)))
+        if tags and tag_mode == "any":
+            stmt = stmt.where(File.id.in_(self.__files_with_tags(tags, match_all=False)))
         if counterparty:
-            query = query.filter(File.tags.any(tag_name=counterparty))
-        return query.all()
+            stmt = stmt.where(File.id.in_(
+                self.__files_with_counterparty(user_id, self.__counterparty_conditions(counterparty, prefix=False))
+            ))
+        if field_filters is not None:
+            stmt = self.__with_field_filters(stmt, user_id, field_filters)
+        res = self.__session.execute(self.__keyset(stmt, after, limit))
+        return res.scalars().all()
+
+    @staticmethod
+    def __with_field_filters(stmt: Select, user_id: int, filters: AnalysisFieldFilters) -> Select:
+        conditions = []
+        if filters.amount_min is not None:
+            conditions.append(FileAnalysisFields.total_amount >= filters.amount_min)
+        if filters.amount_max is not None:
+            conditions.append(FileAnalysisFields.total_amount <= filters.amount_max)
+        if filters.date_from is not None:
+            conditions.append(FileAnalysisFields.contract_date >= filters.date_from)
+        if filters.date_to is not None:
+            conditions.append(FileAnalysisFields.contract_date <= filters.date_to)
+        if filters.number:
+            conditions.append(FileAnalysisFields.contract_number == filters.number)
+        if conditions:
+            if user_id:
+                conditions.append(FileAnalysisFields.user_id == user_id)
+            stmt = stmt.where(File.id.in_(select(FileAnalysisFields.file_id).where(*conditions)))
+
+        if filters.organization:
+            stmt = stmt.where(File.id.in_(StorageRepository.__files_with_counterparty(
+                user_id, StorageRepository.__counterparty_conditions(filters.organization, prefix=True)
+            )))
+        return stmt
+
+    @staticmethod
+    def __counterparty_conditions(value: str, prefix: bool) -> list:
+        """
+        Условия на counterparties по названию от пользователя. С формой ("ООО Ромашка") -
+        только эта форма. prefix - по началу названия: LIKE 'префикс%' идёт диапазоном
+        по индексу (normalized_name, org_form)
+        """
+        org_form, name = split_organization(value)
+        normalized = normalize_counterparty_name(name)
+        if prefix:
+            escaped = normalized.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions = [Counterparty.normalized_name.like(f"{escaped}%", escape="\\")]
+        else:
+            conditions = [Counterparty.normalized_name == normalized]
+        if org_form:
+            conditions.append(Counterparty.org_form == org_form)
+        return conditions
+
+    @staticmethod
+    def __files_with_counterparty(user_id: int, conditions: list) -> Select:
+        stmt = select(FileCounterparty.file_id).join(
+            Counterparty, Counterparty.id == FileCounterparty.counterparty_id
+        ).where(*conditions)
+        if user_id:
+            stmt = stmt.where(FileCounterparty.user_id == user_id)
+        return stmt
+
+    def search_counterparties(self, user_id: int, query: str = "", limit: int = 20) -> List[Counterparty]:
+        """
+        Автодополнение: контрагенты из файлов пользователя, название которых начинается
+        с query (без учёта формы, регистра и кавычек), по алфавиту
+        """
+        stmt = select(Counterparty).where(
+            *self.__counterparty_conditions(query, prefix=True),
+            exists().where(FileCounterparty.counterparty_id == Counterparty.id, FileCounterparty.user_id == user_id)
+        ).order_by(Counterparty.normalized_name, Counterparty.org_form).limit(limit)
+        res = self.__session.execute(stmt)
+        return res.scalars().all()
 
     def get_all_types(self):
         query = self.__session.query(Category)
         return query.all()
 
-    def get_all_tags(self):
-        query = self.__session.query(Tag).where(Tag.tag_name != "контрагент")
-        return query.all()
+    def get_all_tags(self) -> List[Tag]:
+        return self.__session.query(Tag).all()
 
-    def get_all_counterparty(self):
-        query = self.__session.query(Tag).where(Tag.tag_name == "контрагент")
-        return query.all()
+    def get_all_sources(self) -> List[Source]:
+        return self.__session.query(Source).all()
 
     def check_hash_exists_for_user(self, file_hash: str, user_id: int) -> bool:
         exists_hash = self.__session.query(
@@ -261,3 +842,10 @@ class StorageRepository:
         if tag:
             return tag
         return None
+
+
+class AsyncStorageRepository(AsyncRepository):
+    """
+    StorageRepository для асинхронной сессии: те же методы, но их нужно await-ить
+    """
+    sync_repository_class = StorageRepository
@@ -1,90 +1,142 @@
+import asyncio
+import gzip
 import os
-from typing import Optional
+from datetime import date
+from typing import Optional, Literal
+from urllib.parse import quote
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi import Query
 from fastapi.params import Depends
-from starlette.responses import FileResponse
+from starlette.responses import FileResponse, PlainTextResponse, Response
 
-from src.core.dependencies import get_jwt_service, get_storage_service, \
-    get_authentication_header
-from src.modules.jwt.services import JWTService
-from src.modules.storage.schemas import FileResponseDTO, TagResponseDTO, CategoryResponseDTO
+from src.core.config import FILES_PAGE_SIZE, MAX_PAGE_SIZE, DOWNLOAD_ACCEL_REDIRECT, DOWNLOAD_ACCEL_PREFIX, \
+    FILE_SAVE_BASE_PATH
+from src.core.dependencies import get_storage_service, current_user
+from src.core.exceptions import UploadTooLargeError
+from src.modules.ingestion import IngestionJob
+from src.modules.jwt.schemas import TokenClaims
+from src.modules.storage.schemas import FileResponseDTO, TagResponseDTO, CategoryResponseDTO, SearchResponseDTO, \
+    SearchHitDTO, FilePageDTO, UploadResponseDTO, CounterpartyResponseDTO
+from src.modules.storage.filters import AnalysisFieldFilters
+from src.modules.storage.downloads import file_etag, file_last_modified, http_date, is_not_modified, \
+    accepts_encoding
 from src.modules.storage.services import StorageService
 
 storage_router = APIRouter(prefix="/api/storage")
 
 
-@storage_router.get("")
+@storage_router.get("", response_model=FilePageDTO)
 async def get_files(
         file_type: Optional[str] = Query(None),
         tags: Optional[list[str]] = Query(None),
-        counterparty: Optional[str] = Query(None),
-        user_jwt: str = Depends(get_authentication_header),
-        jwt_service: JWTService = Depends(get_jwt_service),
+        tag_mode: Literal["all", "any"] = Query("all", description="all - все теги, any - хотя бы один"),
+        counterparty: Optional[str] = Query(None, max_length=255,
+                                            description="контрагент целиком: ООО «Ромашка» (без формы - любая)"),
+        amount_min: Optional[float] = Query(None, ge=0, description="сумма договора не меньше"),
+        amount_max: Optional[float] = Query(None, ge=0, description="сумма договора не больше"),
+        date_from: Optional[date] = Query(None, description="дата договора не раньше"),
+        date_to: Optional[date] = Query(None, description="дата договора не позже"),
+        number: Optional[str] = Query(None, min_length=1, max_length=100, description="номер договора"),
+        organization: Optional[str] = Query(None, min_length=1, max_length=255,
+                                            description="начало названия контрагента"),
+        cursor: Optional[str] = Query(None, description="next_cursor из предыдущей страницы"),
+        page_size: int = Query(FILES_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        user: TokenClaims = Depends(current_user),
         storage_service: StorageService = Depends(get_storage_service)
-) -> list[FileResponseDTO]:
-    payload = jwt_service.decode_token(token=user_jwt)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if not payload.get("type"):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if payload.get("type") != "access":
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    files = storage_service.get_list_of_user_files(int(user_id), file_type, tags, counterparty)
-    files_answer_dto = [FileResponseDTO.model_validate(file) for file in files]
-    return files_answer_dto
-
-
-@storage_router.post("/upload")
+) -> Response:
+    field_filters = AnalysisFieldFilters(amount_min=amount_min, amount_max=amount_max, date_from=date_from,
+                                         date_to=date_to, number=number, organization=organization)
+    try:
+        # готовый JSON страницы: из кэша он отдаётся без повторной сериализации
+        content = await storage_service.get_files_page_json(user.user_id, file_type, tags, counterparty, cursor,
+                                                            page_size, tag_mode, field_filters)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return Response(content=content, media_type="application/json")
+
+
+@storage_router.get("/search")
+async def search_files(
+        q: str = Query(..., min_length=1, max_length=255, description="Поисковый запрос"),
+        page: int = Query(1, ge=1),
+        page_size: int = Query(20, ge=1, le=100),
+        user: TokenClaims = Depends(current_user),
+        storage_service: StorageService = Depends(get_storage_service)
+) -> SearchResponseDTO:
+    if not q.strip():
+        raise HTTPException(status_code=422, detail="Empty search query")
+    total, hits = await storage_service.search_files(user.user_id, q.strip(), page, page_size)
+    return SearchResponseDTO(
+        total=total,
+        page=page,
+        page_size=page_size,
+        items=[SearchHitDTO(file=FileResponseDTO.model_validate(file), score=score, snippet=snippet)
+               for file, score, snippet in hits]
+    )
+
+
+# тело читается потоком в сервисе, а не через File(...): так Starlette не копирует каждый файл
+# во временный SpooledTemporaryFile, поэтому форма описана для документации вручную
+_UPLOAD_FORM_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {"type": "array", "items": {"type": "string", "format": "binary"}},
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+@storage_router.post("/upload", openapi_extra=_UPLOAD_FORM_SCHEMA)
 async def upload_file(
+        request: Request,
         tags: list[str] = Query(None, description="Список тегов"),
-        jwt_service: JWTService = Depends(get_jwt_service),
-        user_jwt: str = Depends(get_authentication_header),
-        files: list[UploadFile] = File(...),
+        user: TokenClaims = Depends(current_user),
         storage_service: StorageService = Depends(get_storage_service)
-) -> None:
-    payload = jwt_service.decode_token(token=user_jwt)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if not payload.get("type"):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if payload.get("type") != "access":
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    user_id = payload.get("sub")
-    # if not user_id:
-    #     raise HTTPException(status_code=401, detail="Unauthorized")
-    await storage_service.create_files(user_id, files, tags)
-    return None
+) -> UploadResponseDTO:
+    # результат по каждому файлу сразу, разбор и анализ идут в фоне, статус - GET /api/storage/jobs/{job_id}
+    try:
+        return await storage_service.create_files(user.user_id, request.headers.get("content-type"),
+                                                  request.headers.get("content-length"), request.stream(), tags)
+    except UploadTooLargeError:
+        raise HTTPException(status_code=413, detail="Request entity too large")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid multipart body")
+
+
+@storage_router.get("/jobs/{job_id}")
+async def get_upload_job(
+        job_id: str,
+        user: TokenClaims = Depends(current_user),
+        storage_service: StorageService = Depends(get_storage_service)
+) -> IngestionJob:
+    job = storage_service.get_ingestion_job(job_id)
+    if not job or job.user_id != user.user_id:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 @storage_router.delete("/{file_id}")
 async def delete_file(
         file_id: int,
-        jwt_service: JWTService = Depends(get_jwt_service),
-        user_jwt: str = Depends(get_authentication_header),
+        user: TokenClaims = Depends(current_user),
         storage_service: StorageService = Depends(get_storage_service)
 ) -> None:
-    payload = jwt_service.decode_token(token=user_jwt)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if not payload.get("type"):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if payload.get("type") != "access":
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    user_id = int(user_id)
-    file = storage_service.get_file_by_id(file_id)
+    file = await storage_service.get_file_by_id(file_id)
     if not file:
         raise HTTPException(status_code=404, detail="Not found")
-    if file.user_id != user_id:
+    if file.user_id != user.user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
-    storage_service.delete_file(file_id, storage_service.get_file_path(file_id))
+    await storage_service.delete_file(file_id)
     return None
 
 
@@ -95,7 +147,7 @@ type_controller = APIRouter(prefix="/api/type")
 async def get_all_types(
         storage_service: StorageService = Depends(get_storage_service)
 ) -> list[CategoryResponseDTO]:
-    types = storage_service.get_all_types()
+    types = await storage_service.get_all_types()
     return [CategoryResponseDTO.model_validate(cat) for cat in types]
 
 
@@ -106,7 +158,7 @@ tag_controller = APIRouter(prefix="/api/tag")
 async def get_all_tags(
         storage_service: StorageService = Depends(get_storage_service)
 ) -> list[TagResponseDTO]:
-    tags = storage_service.get_all_tags()
+    tags = await storage_service.get_all_tags()
     return [TagResponseDTO.model_validate(tag) for tag in tags]
 
 
@@ -114,11 +166,14 @@ counterparty_controller = APIRouter(prefix="/api/counterparty")
 
 
 @counterparty_controller.get("")
-async def get_all_counterparty(
+async def search_counterparties(
+        q: str = Query("", max_length=255, description="начало названия, можно с формой: ООО Ром"),
+        limit: int = Query(20, ge=1, le=100),
+        user: TokenClaims = Depends(current_user),
         storage_service: StorageService = Depends(get_storage_service)
-) -> list[TagResponseDTO]:
-    counterparties = storage_service.get_all_counterparty()
-    return [TagResponseDTO.model_validate(tag) for tag in counterparties]
+) -> list[CounterpartyResponseDTO]:
+    counterparties = await storage_service.search_counterparties(user.user_id, q, limit)
+    return [CounterpartyResponseDTO.model_validate(counterparty) for counterparty in counterparties]
 
 
 save_file_controller = APIRouter(prefix="/api/file-save")
@@ -127,27 +182,15 @@ save_file_controller = APIRouter(prefix="/api/file-save")
 @save_file_controller.get("/{file_id}")
 async def get_file(
         file_id: int,
-        jwt_service: JWTService = Depends(get_jwt_service),
-        user_jwt: str = Depends(get_authentication_header),
+        request: Request,
+        user: TokenClaims = Depends(current_user),
         storage_service: StorageService = Depends(get_storage_service)
 ) -> FileResponse:
-    payload = jwt_service.decode_token(token=user_jwt)
-    if not payload:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if not payload.get("type"):
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    if payload.get("type") != "access":
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    user_id = payload.get("sub")
-    if not user_id:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-    file = storage_service.get_file_by_id(file_id)
+    file = await storage_service.get_file_by_id(file_id)
     if not file:
         raise HTTPException(status_code=404, detail="File not found on disk")
-    if file.user_id != int(user_id):
+    if file.user_id != user.user_id:
         raise HTTPException(status_code=403, detail="Forbidden")
-    if not os.path.exists(file.file_path):
-        raise HTTPException(status_code=404, detail="File not found on disk")
 
     file_extension = os.path.splitext(file.file_path)[1].lower()
 
@@ -168,8 +211,70 @@ async def get_file(
 
     media_type = mime_types.get(file_extension, 'application/octet-stream')
 
+    if DOWNLOAD_ACCEL_REDIRECT:
+        # файл (и Range) отдаёт nginx, воркер Python не читает ни байта. ETag и Last-Modified
+        # ответа приложения nginx при X-Accel-Redirect не передаёт, а ставит свои (время изменения
+        # и размер файла) и сам отвечает 304 - условные запросы здесь не проверяются
+        relative_path = os.path.relpath(file.file_path, FILE_SAVE_BASE_PATH)
+        if relative_path.startswith(".."):
+            raise HTTPException(status_code=404, detail="File not found on disk")
+        return Response(
+            media_type=media_type,
+            headers={
+                "Cache-Control": "private, no-cache",
+                "X-Accel-Redirect": DOWNLOAD_ACCEL_PREFIX.rstrip("/") + "/" + quote(relative_path),
+                "Content-Disposition": "inline",
+            }
+        )
+
+    # ETag - хэш содержимого, поэтому повторная проверка кэша не трогает диск
+    etag = file_etag(file)
+    last_modified = file_last_modified(file)
+    cache_headers = {"Cache-Control": "private, no-cache"}
+    if etag:
+        cache_headers["ETag"] = etag
+    if last_modified:
+        cache_headers["Last-Modified"] = http_date(last_modified)
+    if is_not_modified(request.headers, etag, last_modified):
+        return Response(status_code=304, headers=cache_headers)
+
+    if not os.path.exists(file.file_path):
+        raise HTTPException(status_code=404, detail="File not found on disk")
+    # Range и If-Range обрабатывает FileResponse, сравнивая с нашими ETag/Last-Modified
     return FileResponse(
         path=file.file_path,
         media_type=media_type,
+        headers=cache_headers,
         content_disposition_type="inline"
     )
+
+
+@save_file_controller.get("/{file_id}/text")
+async def get_file_text(
+        file_id: int,
+        request: Request,
+        user: TokenClaims = Depends(current_user),
+        storage_service: StorageService = Depends(get_storage_service)
+) -> Response:
+    """
+    Извлечённый текст документа из хранилища текстов, без разбора исходного файла.
+    404 - файла нет или текст ещё не извлечён фоновой обработкой
+    """
+    file = await storage_service.get_file_by_id(file_id)
+    if not file:
+        raise HTTPException(status_code=404, detail="Not found")
+    if file.user_id != user.user_id:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    text_path = storage_service.get_text_path(file)
+    if text_path is None:
+        raise HTTPException(status_code=404, detail="Text is not extracted yet")
+
+    # текст хранится в gzip: клиенту, который его принимает, отдаём файл как есть
+    if accepts_encoding(request.headers, "gzip"):
+        return FileResponse(
+            path=text_path,
+            media_type="text/plain; charset=utf-8",
+            headers={"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+        )
+    text = await asyncio.to_thread(lambda: gzip.decompress(text_path.read_bytes()))
+    return PlainTextResponse(text, headers={"Vary": "Accept-Encoding"})
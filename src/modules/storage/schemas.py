@@ -1,8 +1,10 @@
 from datetime import datetime
+from enum import Enum
 from typing import Optional, List
 
 from pydantic import BaseModel, ConfigDict
 
+from src.modules.ingestion.models import IngestionJob
 from src.modules.storage.models import PriorityLevel, ConfidentialityLevel
 
 
@@ -10,6 +12,25 @@ class FileUploadDTO(BaseModel):
     title: str
 
 
+class UploadStatus(str, Enum):
+    STORED = "stored"
+    DUPLICATE = "duplicate"
+    TOO_LARGE = "too_large"
+    FAILED = "failed"
+
+
+class UploadedFileResultDTO(BaseModel):
+    filename: str
+    status: UploadStatus
+    file_id: Optional[int] = None
+    detail: Optional[str] = None
+
+
+class UploadResponseDTO(BaseModel):
+    job: IngestionJob
+    files: List[UploadedFileResultDTO] = []
+
+
 class FileResponseDTO(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
@@ -28,6 +49,24 @@ class FileResponseDTO(BaseModel):
     tags: List['TagResponseDTO'] = []
 
 
+class FilePageDTO(BaseModel):
+    items: List[FileResponseDTO] = []
+    next_cursor: Optional[str] = None
+
+
+class SearchHitDTO(BaseModel):
+    file: FileResponseDTO
+    score: float
+    snippet: str
+
+
+class SearchResponseDTO(BaseModel):
+    total: int
+    page: int
+    page_size: int
+    items: List[SearchHitDTO] = []
+
+
 class CategoryResponseDTO(BaseModel):
     model_config = ConfigDict(from_attributes=True)
     category_name: str
@@ -45,6 +84,13 @@ class TagResponseDTO(BaseModel):
     tag_name: str
 
 
+class CounterpartyResponseDTO(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    org_form: str
+    name: str
+
+
 class CategoryCreateDTO(BaseModel):
     file_id: int
     priority_level: Optional[PriorityLevel] = None
@@ -1,132 +1,333 @@
-from typing import Type, Optional
+import asyncio
+import logging
+from pathlib import Path
+from typing import Type, Optional, AsyncIterator
 
-from fastapi import UploadFile
+from src.core.config import MAX_FILE_SIZE, MAX_UPLOAD_SIZE
+from src.modules.file_save_service.file_save_service import FileSaveService, SavedFile
+from src.modules.ingestion import IngestionQueue, IngestionJob
+from src.modules.parser import ParserRegistry
+from src.modules.storage.filters import AnalysisFieldFilters
+from src.modules.storage.models import File, SourceType
+from src.modules.storage.listing_cache import ListingCache
+from src.modules.storage.pagination import encode_cursor, decode_cursor, FileCursor
+from src.modules.storage.repository import AsyncStorageRepository
+from src.modules.storage.schemas import UploadResponseDTO, UploadedFileResultDTO, UploadStatus, FilePageDTO, \
+    FileResponseDTO
+from src.modules.storage.streaming_upload import MultipartUploadReader, ReceivedFile
+from src.modules.text_store import TextStore
 
-from src.core.config import MAX_FILE_SIZE
-from src.modules.file_save_service.file_save_service import FileSaveService
-from src.modules.storage.models import File, SourceType, Tag
-from src.modules.storage.repository import StorageRepository
+logger = logging.getLogger(__name__)
 
 
 class StorageService:
     def __init__(self,
-                 file_repository: StorageRepository,
+                 file_repository: AsyncStorageRepository,
                  file_save_service: FileSaveService,
-                 parser_registry: callable,
-                 file_analyzer: callable,
-                 hasher: callable
+                 ingestion_queue: IngestionQueue,
+                 hasher: callable,
+                 text_store: TextStore,
+                 parser_registry: ParserRegistry,
+                 listing_cache: ListingCache,
+                 upload_concurrency: int = 4
                  ):
-        self.__storage_repository: StorageRepository = file_repository
+        self.__storage_repository: AsyncStorageRepository = file_repository
         self.__file_save_service: FileSaveService = file_save_service
-        self.__parser_registry = parser_registry
-        self.__file_analyzer = file_analyzer
+        self.__ingestion_queue: IngestionQueue = ingestion_queue
         self.__hasher = hasher
+        self.__text_store: TextStore = text_store
+        self.__parser_registry: ParserRegistry = parser_registry
+        self.__listing_cache: ListingCache = listing_cache
+        self.__upload_concurrency: int = upload_concurrency
+        self.__upload_reader = MultipartUploadReader(file_save_service, hasher, MAX_FILE_SIZE, MAX_UPLOAD_SIZE)
 
-    async def create_files(self, user_id: int, files_upload: list[UploadFile], tags: list[str]):
+    async def create_files(self,
+                           user_id: int,
+                           content_type: Optional[str],
+                           content_length: Optional[str],
+                           body: AsyncIterator[bytes],
+                           tags: list[str]
+                           ) -> UploadResponseDTO:
         """
-        Функция для создания нового файла. Идея в том, что именно она будет отсеивать дубликаты,
-        так же она будет не только принимать параметры и теги от пользователя, но и через анализатор
-        находить новые
+        Функция для создания новых файлов из тела multipart-запроса. Дубликаты (то же содержимое
+        у того же пользователя) отсеиваются, файлы получают ручные теги, а анализатор в фоне находит новые.
+
+        Файлы читаются из запроса потоком и пишутся во временную папку один раз (хэш в том же проходе),
+        строки files всего запроса вставляются одной транзакцией, после коммита временные файлы
+        переименовываются на место - разбор потом читает этот же файл.
+        Возвращает задачу фоновой обработки и результат по каждому файлу
+
+        :raises UploadTooLargeError: если запрос больше MAX_UPLOAD_SIZE.
+        :raises ValueError: если тело не multipart/form-data.
         """
-        for file in files_upload:
-            await self.create_file(user_id, file, tags)
+        received = await self.__upload_reader.read(content_type, content_length, body)
 
-    async def create_file(self, user_id, file_upload: UploadFile, tags: list[str]):
-        if file_upload.size > MAX_FILE_SIZE:
-            return
+        results = [UploadedFileResultDTO(filename=received_file.filename, status=UploadStatus.FAILED)
+                   for received_file in received]
+        staged_files = []
+        for index, received_file in enumerate(received):
+            if received_file.saved is None:
+                results[index].status = UploadStatus.TOO_LARGE
+            else:
+                staged_files.append((index, received_file))
 
-        file_hash = self.__hasher(file_upload)
+        try:
+            file_ids = await self.__store_staged_files(user_id, staged_files, tags)
+        except Exception:
+            logger.exception("Не удалось сохранить загрузку пользователя %s", user_id)
+            for index, _ in staged_files:
+                results[index].detail = "Ошибка сохранения в базу данных"
+            file_ids = {}
+        else:
+            for index, _ in staged_files:
+                if index not in file_ids:
+                    results[index].detail = "Ошибка сохранения файла"
 
-        if self.__check_hash_exists_for_user(file_hash, user_id):
-            return
+        for index, file_id in file_ids.items():
+            results[index].file_id = file_id
+            results[index].status = UploadStatus.STORED if file_id else UploadStatus.DUPLICATE
 
-        # пробую сохранять на диске и в бд
-        if not self.__check_category_exists(file_upload.content_type):
-            self.create_category(file_upload.content_type, file_upload.content_type)
+        stored_ids = [file_id for file_id in file_ids.values() if file_id]
+        if stored_ids:
+            await self.__listing_cache.invalidate(user_id)
+        job = self.__ingestion_queue.submit(user_id, stored_ids)
+        return UploadResponseDTO(job=job, files=results)
 
-        if not self.__check_source_id_exists(1):
-            self.create_source("base", SourceType.website)
+    def get_ingestion_job(self, job_id: str) -> Optional[IngestionJob]:
+        return self.__ingestion_queue.get_job(job_id)
 
-        file_path = self.__file_save_service.save_user_file(file_upload.file, file_upload.filename, user_id)
-        file = self.__storage_repository.create_file(file_upload.filename, file_path, file_upload.size,
-                                                     file_upload.content_type, file_hash, user_id,
-                                                     self.get_category_id_by_name(file_upload.content_type), 1, None)
+    async def __store_staged_files(self,
+                                   user_id: int,
+                                   staged_files: list[tuple[int, ReceivedFile]],
+                                   tags: list[str]
+                                   ) -> dict[int, Optional[int]]:
+        """
+        Сохраняет записанные во временную папку файлы: категории и источник проверяются один раз
+        на запрос, строки files, ссылки на содержимое и теги - одной транзакцией. Временные файлы
+        переносятся на место уже после коммита, дубликаты удаляются. Если файл не удалось
+        перенести, его строка и ссылка на содержимое удаляются.
+        Возвращает {номер файла в запросе: id нового файла или None для дубликата},
+        файлов, которые не удалось сохранить, в нём нет
+        """
+        if not staged_files:
+            return {}
+        try:
+            category_ids = await self.__storage_repository.ensure_categories(
+                [received_file.content_type for _, received_file in staged_files])
+            if not await self.__check_source_id_exists(1):
+                await self.create_source("base", SourceType.website)
 
-        # parsed_document: ParsedDocument = await self.__parser_registry(file_upload)
-        # analyze_result: AnalysisResult = self.__file_analyzer(FileMetadata(
-        #     file_id=file.id,
-        #     title=file.title,
-        #     category_document_type=file.file_type,
-        #     priority_level=PriorityLevel.normal,
-        #     confidentiality=ConfidentialityLevel.internal
-        # ), parsed_document.raw_text, tags)
-        # print(analyze_result)
-        self.__add_all_tags_to_file(file.id, tags, user_id)
+            stored = await self.__storage_repository.create_files_batch(user_id, [
+                {
+                    "title": received_file.filename,
+                    "file_path": str(self.__file_save_service.blob_path(received_file.saved.digest,
+                                                                        received_file.filename)),
+                    "file_size": received_file.saved.size,
+                    "file_type": received_file.content_type,
+                    "file_hash": received_file.saved.digest,
+                    "category_id": category_ids[received_file.content_type],
+                    "source_id": 1,
+                }
+                for _, received_file in staged_files
+            ], tags)
+        except Exception:
+            for _, received_file in staged_files:
+                self.__file_save_service.delete_file(received_file.saved.path)
+            raise
 
-    def __add_all_tags_to_file(self, file_id: int, tags: list[str], user_id: int):
-        if not tags: return
-        for tag in tags:
-            if not tag: continue
-            if not self.__check_tag_exists(tag):
-                self.create_tag(tag, "manual", "")
-            tag_model: Tag = self.__get_tag_id_by_name(tag)
-            if tag_model:
-                self.add_tag_to_file(file_id, tag_model.id, user_id)
+        semaphore = asyncio.Semaphore(self.__upload_concurrency)
 
-    def __check_hash_exists_for_user(self, file_hash: str, user_id: int):
-        return self.__storage_repository.check_hash_exists_for_user(file_hash, user_id)
+        async def commit(staged_file: SavedFile, blob_path: str) -> bool:
+            async with semaphore:
+                try:
+                    await asyncio.to_thread(self.__file_save_service.commit_staged, staged_file.path, blob_path)
+                    return True
+                except Exception:
+                    logger.exception("Не удалось перенести %s в %s", staged_file.path, blob_path)
+                    self.__file_save_service.delete_file(staged_file.path)
+                    return False
 
-    def __get_tag_id_by_name(self, tag_name: str):
-        return self.__storage_repository.get_tag_by_name(tag_name)
+        file_ids = {}
+        committing = []
+        # номера копий содержимого, уже встреченного в этом запросе
+        duplicates: dict[str, list[int]] = {}
+        for index, received_file in staged_files:
+            staged_file = received_file.saved
+            # одинаковое содержимое в одном запросе: сохраняется только первая копия
+            stored_file = stored.pop(staged_file.digest, None)
+            if stored_file is None:
+                self.__file_save_service.delete_file(staged_file.path)
+                file_ids[index] = None
+                duplicates.setdefault(staged_file.digest, []).append(index)
+                continue
+            file_id, blob_path = stored_file
+            committing.append((index, staged_file.digest, file_id, commit(staged_file, blob_path)))
+            file_ids[index] = file_id
+        committed = await asyncio.gather(*(coroutine for _, _, _, coroutine in committing))
 
-    def add_tag_to_file(self, file_id: int, tag_id: int, assigned_by: Optional[int]):
-        self.__storage_repository.add_tag_to_file(file_id, tag_id, assigned_by=assigned_by)
+        failed = sorted((digest, file_id) for (_, digest, file_id, _), ok in zip(committing, committed) if not ok)
+        if failed:
+            # без содержимого на диске строки не нужны: удаляем их вместе со ссылками на blobs
+            # (в порядке хэшей, как и при вставке), копии этого содержимого тоже не сохранены
+            try:
+                await self.__delete_file_rows([file_id for _, file_id in failed])
+            except Exception:
+                logger.exception("Не удалось удалить строки несохранённых файлов %s",
+                                 [file_id for _, file_id in failed])
+            failed_digests = {digest for digest, _ in failed}
+            for index, digest, _, _ in committing:
+                if digest in failed_digests:
+                    del file_ids[index]
+                    for duplicate_index in duplicates.get(digest, []):
+                        del file_ids[duplicate_index]
+        return file_ids
 
-    def __check_source_id_exists(self, source_id: int):
-        return self.__storage_repository.check_source_id_exists(source_id)
+    async def add_tag_to_file(self, file_id: int, tag_id: int, assigned_by: Optional[int]):
+        await self.__storage_repository.add_tag_to_file(file_id, tag_id, assigned_by=assigned_by)
+        file = await self.__storage_repository.get_file_by_id(file_id)
+        if file is not None:
+            await self.__listing_cache.invalidate(file.user_id)
 
-    def __check_tag_exists(self, tag_name: str):
-        return self.__storage_repository.check_tag_exists(tag_name)
+    async def __check_source_id_exists(self, source_id: int):
+        return await self.__storage_repository.check_source_id_exists(source_id)
 
-    def create_tag(self, tag_name, tag_type: str, description: str):
-        return self.__storage_repository.create_tag(tag_name, tag_type, description)
+    async def create_tag(self, tag_name, tag_type: str, description: str):
+        return await self.__storage_repository.create_tag(tag_name, tag_type, description)
 
-    def __check_category_exists(self, file_category: str):
-        return self.__storage_repository.check_category_exists(file_category)
+    async def get_category_id_by_name(self, category_name: str):
+        return await self.__storage_repository.get_category_id_by_name(category_name)
 
-    def get_category_id_by_name(self, category_name: str):
-        return self.__storage_repository.get_category_id_by_name(category_name)
+    async def create_category(self, category_name, document_type):
+        await self.__storage_repository.create_category(category_name, document_type)
 
-    def create_category(self, category_name, document_type):
-        self.__storage_repository.create_category(category_name, document_type)
+    async def create_source(self, source_name, source_type: SourceType):
+        await self.__storage_repository.create_source(source_name, source_type)
 
-    def create_source(self, source_name, source_type: SourceType):
-        self.__storage_repository.create_source(source_name, source_type)
+    async def get_list_of_user_files(self,
+                                     user_id: int,
+                                     file_type: str,
+                                     tags: list[str],
+                                     counterparty: str,
+                                     after: Optional[FileCursor],
+                                     page_size: int,
+                                     tag_mode: str = "all",
+                                     field_filters: Optional[AnalysisFieldFilters] = None
+                                     ) -> tuple[list[Type[File]], Optional[str]]:
+        """
+        Функция для получения страницы файлов пользователя с фильтрами.
+        Возвращает файлы и курсор следующей страницы (None - страница последняя)
+        """
+        # на одну строку больше: так без COUNT понятно, есть ли следующая страница
+        files = await self.__storage_repository.get_files_by_filters(user_id, file_type, tags, counterparty,
+                                                                     after=after, limit=page_size + 1,
+                                                                     tag_mode=tag_mode, field_filters=field_filters)
+        if len(files) <= page_size:
+            return files, None
+        files = files[:page_size]
+        return files, encode_cursor(files[-1].last_modified, files[-1].id)
 
-    def get_list_of_user_files(self, user_id: int, file_type: str, tags: list[str], counterparty: str) -> list[
-        Type[File]]:
+    async def get_files_page_json(self,
+                                  user_id: int,
+                                  file_type: Optional[str],
+                                  tags: Optional[list[str]],
+                                  counterparty: Optional[str],
+                                  cursor: Optional[str],
+                                  page_size: int,
+                                  tag_mode: str = "all",
+                                  field_filters: Optional[AnalysisFieldFilters] = None
+                                  ) -> bytes:
         """
-        Функция для получения списка файлов пользователя. Здесь должна быть поддержка фильтров.
-        Должна возвращать список dto_response_file
+        Страница файлов пользователя в виде готового JSON (FilePageDTO). Повторный запрос
+        с теми же параметрами отдаётся из кэша, пока файлы пользователя не менялись.
+
+        :raises ValueError: если курсор повреждён.
         """
-        files = self.__storage_repository.get_files_by_filters(user_id, file_type, tags, counterparty)
-        return files
+        after = decode_cursor(cursor)
+        params = [file_type, sorted(tags or []), tag_mode, counterparty, cursor, page_size]
+        if field_filters is not None and not field_filters.is_empty():
+            params.append(field_filters.model_dump(mode="json", exclude_none=True))
+        version = await self.__listing_cache.version(user_id)
+        cached = await self.__listing_cache.get(user_id, version, params)
+        if cached is not None:
+            return cached
+
+        files, next_cursor = await self.get_list_of_user_files(user_id, file_type, tags, counterparty, after,
+                                                               page_size, tag_mode, field_filters)
+        page = FilePageDTO(items=[FileResponseDTO.model_validate(file) for file in files], next_cursor=next_cursor)
+        content = page.model_dump_json().encode("utf-8")
+        await self.__listing_cache.set(user_id, version, params, content)
+        return content
 
-    def delete_file(self, file_id: int, file_path: str) -> None:
-        self.__file_save_service.delete_file(file_path)
-        self.__storage_repository.delete_file(file_id)
+    async def search_files(self, user_id: int, query: str, page: int, page_size: int):
+        """
+        Поиск по содержимому файлов пользователя. Возвращает общее число найденных
+        и страницу (файл, релевантность, фрагмент)
+        """
+        return await self.__storage_repository.search_files(user_id, query, (page - 1) * page_size, page_size)
 
-    def get_file_by_id(self, file_id: int):
-        return self.__storage_repository.get_file_by_id(file_id)
+    async def delete_file(self, file_id: int) -> None:
+        """
+        Удаляет файл пользователя. Содержимое на диске удаляется,
+        только когда на него не осталось ссылок
+        """
+        file = await self.__storage_repository.get_file_by_id(file_id)
+        orphan_paths = await self.__delete_file_rows([file_id])
+        if file is not None:
+            await self.__listing_cache.invalidate(file.user_id)
+        if orphan_paths[0] and file is not None and file.file_hash:
+            self.__text_store.delete(file.file_hash)
+
+    async def __delete_file_rows(self, file_ids: list[int]) -> list[Optional[str]]:
+        """
+        Удаляет строки files и снимает их ссылки на содержимое одной транзакцией, содержимое
+        без ссылок удаляется с диска. Возвращает для каждого файла путь удалённого содержимого или None
+        """
+        orphan_paths = []
+        detached = []
+        try:
+            for file_id in file_ids:
+                orphan_path = await self.__storage_repository.delete_file_and_release_blob(file_id, commit=False)
+                orphan_paths.append(orphan_path)
+                if orphan_path:
+                    # пока строка blobs заблокирована, загрузка того же содержимого ждёт: файл
+                    # уходит с пути blobs до commit, и её новая копия уже не будет удалена
+                    detached_path = await asyncio.to_thread(self.__file_save_service.detach_file, orphan_path)
+                    if detached_path:
+                        detached.append((detached_path, orphan_path))
+            await self.__storage_repository.commit()
+        except BaseException:
+            for detached_path, orphan_path in reversed(detached):
+                await asyncio.to_thread(self.__file_save_service.restore_file, detached_path, orphan_path)
+            await self.__storage_repository.rollback()
+            raise
+        for detached_path, _ in detached:
+            await asyncio.to_thread(self.__file_save_service.delete_file, detached_path)
+        return orphan_paths
+
+    async def get_file_by_id(self, file_id: int):
+        return await self.__storage_repository.get_file_by_id(file_id)
+
+    def get_text_path(self, file: File) -> Optional[Path]:
+        """
+        Путь к сжатому (gzip) извлечённому тексту файла для текущей версии парсера.
+        None - текст ещё не извлечён или формат не поддерживается парсерами
+        """
+        if not file.file_hash:
+            return None
+        try:
+            parser_version = self.__parser_registry.parser_version(Path(file.file_path))
+        except ValueError:
+            return None
+        return self.__text_store.get_path(file.file_hash, parser_version)
 
-    def get_file_path(self, file_id: int):
-        return self.__storage_repository.get_file_path(file_id)
+    async def get_file_path(self, file_id: int):
+        return await self.__storage_repository.get_file_path(file_id)
 
-    def get_all_types(self):
-        return self.__storage_repository.get_all_types()
+    async def get_all_types(self):
+        return await self.__storage_repository.get_all_types()
 
-    def get_all_tags(self):
-        return self.__storage_repository.get_all_tags()
+    async def get_all_tags(self):
+        return await self.__storage_repository.get_all_tags()
 
-    def get_all_counterparty(self):
-        return self.__storage_repository.get_all_counterparty()
+    async def search_counterparties(self, user_id: int, query: str, limit: int):
+        return await self.__storage_repository.search_counterparties(user_id, query, limit)
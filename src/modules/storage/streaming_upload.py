@@ -0,0 +1,191 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Optional
+
+from pydantic import BaseModel
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from src.core.exceptions import UploadTooLargeError
+from src.modules.file_save_service.file_save_service import FileSaveService, SavedFile, StagedWriter
+from src.modules.get_hash import Hasher, CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class ReceivedFile(BaseModel):
+    """
+    Файл из multipart-запроса, записанный во временную папку.
+    saved = None - файл больше max_file_size, на диске его нет
+    """
+    filename: str
+    content_type: str
+    saved: Optional[SavedFile] = None
+
+
+class _Upload:
+    """Файл, который сейчас читается из запроса, и его временный файл"""
+
+    def __init__(self, file: ReceivedFile, writer: StagedWriter) -> None:
+        self.file: ReceivedFile = file
+        self.writer: StagedWriter = writer
+        self.size: int = 0
+        self.too_large: bool = False
+        # часть дочитана до границы: без неё тело запроса оборвано
+        self.ended: bool = False
+
+
+class MultipartUploadReader:
+    """
+    Потоковый разбор multipart/form-data прямо из request.stream().
+
+    Starlette сначала целиком складывает каждый файл формы в SpooledTemporaryFile
+    (выше 1 МБ - временный файл на диске), и только потом его можно переписать
+    в хранилище. Здесь части файла сразу пишутся во временный файл FileSaveService
+    (хэш считается в том же проходе), после коммита он переименовывается на место blob:
+    содержимое попадает на диск один раз, в памяти - не больше flush_size на запрос.
+
+    Лимиты: весь запрос - max_upload_size (проверяется по Content-Length до чтения
+    и по факту во время чтения, превышение - UploadTooLargeError), каждый файл -
+    max_file_size (файл пропускается, остальные сохраняются).
+    Поля формы, кроме field_name, и файлы в других полях игнорируются
+    """
+
+    def __init__(self,
+                 file_save_service: FileSaveService,
+                 hasher_factory: Callable[[], Hasher],
+                 max_file_size: int,
+                 max_upload_size: int,
+                 field_name: str = "files",
+                 flush_size: int = CHUNK_SIZE
+                 ):
+        self.__file_save_service: FileSaveService = file_save_service
+        self.__hasher_factory = hasher_factory
+        self.__max_file_size: int = max_file_size
+        self.__max_upload_size: int = max_upload_size
+        self.__field_name: bytes = field_name.encode()
+        self.__flush_size: int = flush_size
+
+    async def read(self,
+                   content_type: Optional[str],
+                   content_length: Optional[str],
+                   stream: AsyncIterator[bytes]
+                   ) -> list[ReceivedFile]:
+        """
+        Читает тело запроса и записывает файлы во временную папку.
+        Возвращает файлы в порядке следования в запросе.
+
+        :raises UploadTooLargeError: если тело больше max_upload_size.
+        :raises ValueError: если это не multipart/form-data или тело повреждено.
+        """
+        if content_length is not None and content_length.isdigit() \
+                and int(content_length) > self.__max_upload_size:
+            raise UploadTooLargeError(f"Запрос больше {self.__max_upload_size} байт")
+
+        media_type, options = parse_options_header(content_type or "")
+        boundary = options.get(b"boundary")
+        if media_type != b"multipart/form-data" or not boundary:
+            raise ValueError("Ожидается multipart/form-data")
+
+        uploads: list[_Upload] = []
+        # (файл, данные) - пишется в потоке пачками не меньше flush_size,
+        # None вместо данных - файл дочитан из запроса и его пора закрыть
+        pending: list[tuple[_Upload, Optional[bytes]]] = []
+        pending_size = 0
+        headers: dict[bytes, bytes] = {}
+        header_field = bytearray()
+        header_value = bytearray()
+        current: Optional[_Upload] = None
+
+        def on_part_begin() -> None:
+            nonlocal current
+            current = None
+            headers.clear()
+
+        def on_header_field(data: bytes, start: int, end: int) -> None:
+            header_field.extend(data[start:end])
+
+        def on_header_value(data: bytes, start: int, end: int) -> None:
+            header_value.extend(data[start:end])
+
+        def on_header_end() -> None:
+            headers[bytes(header_field).lower()] = bytes(header_value)
+            header_field.clear()
+            header_value.clear()
+
+        def on_headers_finished() -> None:
+            nonlocal current
+            _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+            if disposition.get(b"name") != self.__field_name or b"filename" not in disposition:
+                return
+            filename = disposition[b"filename"].decode("utf-8", errors="replace")
+            part_type = headers.get(b"content-type", b"").decode("latin-1") or "application/octet-stream"
+            current = _Upload(ReceivedFile(filename=filename, content_type=part_type),
+                              self.__file_save_service.open_staged(filename, self.__hasher_factory()))
+            uploads.append(current)
+
+        def on_part_data(data: bytes, start: int, end: int) -> None:
+            nonlocal pending_size
+            if current is None or current.too_large:
+                return
+            current.size += end - start
+            if current.size > self.__max_file_size:
+                # остаток файла читается из сети, но уже никуда не пишется
+                current.too_large = True
+                return
+            pending.append((current, data[start:end]))
+            pending_size += end - start
+
+        def on_part_end() -> None:
+            if current is not None:
+                current.ended = True
+                pending.append((current, None))
+
+        parser = MultipartParser(boundary, {
+            "on_part_begin": on_part_begin,
+            "on_part_data": on_part_data,
+            "on_part_end": on_part_end,
+            "on_header_field": on_header_field,
+            "on_header_value": on_header_value,
+            "on_header_end": on_header_end,
+            "on_headers_finished": on_headers_finished,
+        })
+
+        received = 0
+        try:
+            async for chunk in stream:
+                received += len(chunk)
+                if received > self.__max_upload_size:
+                    raise UploadTooLargeError(f"Запрос больше {self.__max_upload_size} байт")
+                parser.write(chunk)
+                if pending_size >= self.__flush_size:
+                    await asyncio.to_thread(self.__write, pending[:])
+                    pending.clear()
+                    pending_size = 0
+            parser.finalize()
+            await asyncio.to_thread(self.__write, pending[:])
+            # finalize не проверяет, что тело закончилось границей
+            if any(not upload.ended for upload in uploads):
+                raise ValueError("Тело запроса оборвано")
+        except BaseException:
+            await asyncio.to_thread(self.__abort, uploads)
+            raise
+        return [upload.file for upload in uploads]
+
+    @staticmethod
+    def __write(batch: list[tuple[_Upload, Optional[bytes]]]) -> None:
+        for upload, data in batch:
+            if data is not None:
+                upload.writer.write(data)
+            elif upload.too_large:
+                upload.writer.abort()
+            else:
+                upload.file.saved = upload.writer.close()
+
+    @staticmethod
+    def __abort(uploads: list[_Upload]) -> None:
+        # запрос не дочитан: удаляются и недописанные, и уже закрытые временные файлы
+        for upload in uploads:
+            try:
+                upload.writer.abort()
+            except OSError:
+                logger.warning("Не удалось удалить временный файл загрузки", exc_info=True)
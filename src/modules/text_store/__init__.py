@@ -0,0 +1,3 @@
+from .text_store import TextStore
+
+__all__ = ["TextStore"]
@@ -0,0 +1,50 @@
+import gzip
+import os
+import uuid
+from pathlib import Path
+from typing import Optional
+
+
+class TextStore:
+    """
+    Сжатое хранилище извлечённого текста документов.
+
+    Ключ - хэш содержимого файла и версия парсера: одинаковые загрузки разбираются
+    один раз, а после изменения парсера текст извлекается заново.
+    Текст лежит в gzip: base/ab/cd/<digest>.<parser_version>.txt.gz
+    """
+
+    def __init__(self, base_path: str):
+        self.base_path = Path(base_path)
+        self.base_path.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, digest: str, parser_version: str) -> Path:
+        return self.base_path / digest[:2] / digest[2:4] / f"{digest}.{parser_version}.txt.gz"
+
+    def get_path(self, digest: str, parser_version: str) -> Optional[Path]:
+        """Путь к сжатому тексту, если он уже сохранён"""
+        path = self.path_for(digest, parser_version)
+        return path if path.exists() else None
+
+    def get(self, digest: str, parser_version: str) -> Optional[str]:
+        path = self.get_path(digest, parser_version)
+        if path is None:
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as source:
+            return source.read()
+
+    def put(self, digest: str, parser_version: str, text: str) -> Path:
+        """Сохраняет текст. Запись через временный файл: читатель не увидит недописанный gzip"""
+        path = self.path_for(digest, parser_version)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as destination:
+            destination.write(text)
+        os.replace(tmp_path, path)
+        return path
+
+    def delete(self, digest: str) -> None:
+        """Удаляет текст всех версий парсеров для содержимого"""
+        folder = self.base_path / digest[:2] / digest[2:4]
+        for path in folder.glob(f"{digest}.*.txt.gz"):
+            path.unlink(missing_ok=True)
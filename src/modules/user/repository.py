@@ -1,5 +1,6 @@
 from typing import List, Optional
 
+from src.core.async_repository import AsyncRepository
 from src.modules.user.models import User
 from sqlalchemy import select
 
@@ -148,4 +149,6 @@ class UserRepository:
         return result.scalars().all()
 
 
-
+class AsyncUserRepository(AsyncRepository):
+    """UserRepository для асинхронной сессии: те же методы, но их нужно await-ить"""
+    sync_repository_class = UserRepository